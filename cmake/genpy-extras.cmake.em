@@ -9,6 +9,42 @@ set(GENPY_BIN_DIR "${genpy_DIR}/../../../@(CATKIN_PACKAGE_BIN_DESTINATION)")
 set(GENMSG_PY_BIN ${GENPY_BIN_DIR}/genmsg_py.py)
 set(GENSRV_PY_BIN ${GENPY_BIN_DIR}/gensrv_py.py)
 
+# Generate all .msg/.srv files of a package with one command each,
+# instead of one command per file, using GENPY_JOBS processes.
+# GENPY_JOBS defaults to 1, since the build tool usually runs the
+# commands of several packages in parallel already: make -jN runs up to
+# N commands at a time, each with GENPY_JOBS processes. Raise it only
+# when few packages are built at a time.
+option(GENPY_BATCH_GENERATION "Generate the Python code of a package with one command" ON)
+set(GENPY_JOBS 1 CACHE STRING "Number of processes to generate the Python code of a package with")
+
+# Cache parsed .msg files across generator invocations, set
+# GENPY_SPEC_CACHE_DIR to an empty string to disable the cache
+if(NOT DEFINED GENPY_SPEC_CACHE_DIR)
+  set(GENPY_SPEC_CACHE_DIR "${CMAKE_BINARY_DIR}/genpy_spec_cache")
+endif()
+if(GENPY_SPEC_CACHE_DIR)
+  set(GENPY_SPEC_CACHE_ARGS --spec-cache ${GENPY_SPEC_CACHE_DIR})
+else()
+  set(GENPY_SPEC_CACHE_ARGS)
+endif()
+
+# The generator leaves outputs that would not change untouched, so
+# they can be older than the inputs of their command. The commands
+# therefore produce stamp files in the build directory, which is what
+# the targets depend on, and list the generated files as byproducts.
+# The generator keeps the stamps of the generated files there as well,
+# so that they are not installed with the generated code.
+set(GENPY_STAMP_DIR "${CMAKE_BINARY_DIR}/genpy_stamps")
+file(MAKE_DIRECTORY ${GENPY_STAMP_DIR})
+macro(_genpy_byproducts VAR)
+  if(CMAKE_VERSION VERSION_LESS 3.2)
+    set(${VAR})
+  else()
+    set(${VAR} BYPRODUCTS ${ARGN})
+  endif()
+endmacro()
+
 # Generate .msg->.h for py
 # The generated .h files should be added ALL_GEN_OUTPUT_FILES_py
 macro(_generate_msg_py ARG_PKG ARG_MSG ARG_IFLAGS ARG_MSG_DEPS ARG_GEN_OUTPUT_DIR)
@@ -22,16 +58,34 @@ macro(_generate_msg_py ARG_PKG ARG_MSG ARG_IFLAGS ARG_MSG_DEPS ARG_GEN_OUTPUT_DI
   set(MSG_GENERATED_NAME _${MSG_SHORT_NAME}.py)
   set(GEN_OUTPUT_FILE ${GEN_OUTPUT_DIR}/${MSG_GENERATED_NAME})
 
-  add_custom_command(OUTPUT ${GEN_OUTPUT_FILE}
-    DEPENDS ${GENMSG_PY_BIN} ${ARG_MSG} ${ARG_MSG_DEPS}
-    COMMAND ${CATKIN_ENV} ${PYTHON_EXECUTABLE} ${GENMSG_PY_BIN} ${ARG_MSG}
-    ${ARG_IFLAGS}
-    -p ${ARG_PKG}
-    -o ${GEN_OUTPUT_DIR}
-    COMMENT "Generating Python from MSG ${ARG_PKG}/${MSG_SHORT_NAME}"
-    )
+  if(GENPY_BATCH_GENERATION)
+    # the command is added by _generate_module_py
+    list(APPEND _GENPY_msg_FILES_${ARG_PKG} ${ARG_MSG})
+    list(APPEND _GENPY_msg_DEPS_${ARG_PKG} ${ARG_MSG_DEPS})
+    list(APPEND _GENPY_msg_OUTPUTS_${ARG_PKG} ${GEN_OUTPUT_FILE})
+    set(_GENPY_IFLAGS_${ARG_PKG} ${ARG_IFLAGS})
+    set(GEN_STAMP_FILE ${GENPY_STAMP_DIR}/${ARG_PKG}_msg.stamp)
+  else()
+    set(GEN_STAMP_FILE ${GENPY_STAMP_DIR}/${ARG_PKG}_msg_${MSG_SHORT_NAME}.stamp)
+    _genpy_byproducts(GEN_BYPRODUCTS ${GEN_OUTPUT_FILE})
+    add_custom_command(OUTPUT ${GEN_STAMP_FILE}
+      ${GEN_BYPRODUCTS}
+      DEPENDS ${GENMSG_PY_BIN} ${ARG_MSG} ${ARG_MSG_DEPS}
+      COMMAND ${CATKIN_ENV} ${PYTHON_EXECUTABLE} ${GENMSG_PY_BIN} ${ARG_MSG}
+      ${ARG_IFLAGS}
+      -p ${ARG_PKG}
+      -o ${GEN_OUTPUT_DIR}
+      ${GENPY_SPEC_CACHE_ARGS}
+      --stamp-dir ${GENPY_STAMP_DIR}
+      COMMAND ${CMAKE_COMMAND} -E touch ${GEN_STAMP_FILE}
+      COMMENT "Generating Python from MSG ${ARG_PKG}/${MSG_SHORT_NAME}"
+      )
+  endif()
 
-  list(APPEND ALL_GEN_OUTPUT_FILES_py ${GEN_OUTPUT_FILE})
+  list(FIND ALL_GEN_OUTPUT_FILES_py ${GEN_STAMP_FILE} _GENPY_STAMP_INDEX)
+  if(_GENPY_STAMP_INDEX EQUAL -1)
+    list(APPEND ALL_GEN_OUTPUT_FILES_py ${GEN_STAMP_FILE})
+  endif()
 
 endmacro()
 
@@ -48,21 +102,77 @@ macro(_generate_srv_py ARG_PKG ARG_SRV ARG_IFLAGS ARG_MSG_DEPS ARG_GEN_OUTPUT_DI
   set(SRV_GENERATED_NAME _${SRV_SHORT_NAME}.py)
   set(GEN_OUTPUT_FILE ${GEN_OUTPUT_DIR}/${SRV_GENERATED_NAME})
 
-  add_custom_command(OUTPUT ${GEN_OUTPUT_FILE}
-    DEPENDS ${GENSRV_PY_BIN} ${ARG_SRV} ${ARG_MSG_DEPS}
-    COMMAND ${CATKIN_ENV} ${PYTHON_EXECUTABLE} ${GENSRV_PY_BIN} ${ARG_SRV}
-    ${ARG_IFLAGS}
-    -p ${ARG_PKG}
-    -o ${GEN_OUTPUT_DIR}
-    COMMENT "Generating Python code from SRV ${ARG_PKG}/${SRV_SHORT_NAME}"
-    )
+  if(GENPY_BATCH_GENERATION)
+    # the command is added by _generate_module_py
+    list(APPEND _GENPY_srv_FILES_${ARG_PKG} ${ARG_SRV})
+    list(APPEND _GENPY_srv_DEPS_${ARG_PKG} ${ARG_MSG_DEPS})
+    list(APPEND _GENPY_srv_OUTPUTS_${ARG_PKG} ${GEN_OUTPUT_FILE})
+    set(_GENPY_IFLAGS_${ARG_PKG} ${ARG_IFLAGS})
+    set(GEN_STAMP_FILE ${GENPY_STAMP_DIR}/${ARG_PKG}_srv.stamp)
+  else()
+    set(GEN_STAMP_FILE ${GENPY_STAMP_DIR}/${ARG_PKG}_srv_${SRV_SHORT_NAME}.stamp)
+    _genpy_byproducts(GEN_BYPRODUCTS ${GEN_OUTPUT_FILE})
+    add_custom_command(OUTPUT ${GEN_STAMP_FILE}
+      ${GEN_BYPRODUCTS}
+      DEPENDS ${GENSRV_PY_BIN} ${ARG_SRV} ${ARG_MSG_DEPS}
+      COMMAND ${CATKIN_ENV} ${PYTHON_EXECUTABLE} ${GENSRV_PY_BIN} ${ARG_SRV}
+      ${ARG_IFLAGS}
+      -p ${ARG_PKG}
+      -o ${GEN_OUTPUT_DIR}
+      ${GENPY_SPEC_CACHE_ARGS}
+      --stamp-dir ${GENPY_STAMP_DIR}
+      COMMAND ${CMAKE_COMMAND} -E touch ${GEN_STAMP_FILE}
+      COMMENT "Generating Python code from SRV ${ARG_PKG}/${SRV_SHORT_NAME}"
+      )
+  endif()
 
-  list(APPEND ALL_GEN_OUTPUT_FILES_py ${GEN_OUTPUT_FILE})
+  list(FIND ALL_GEN_OUTPUT_FILES_py ${GEN_STAMP_FILE} _GENPY_STAMP_INDEX)
+  if(_GENPY_STAMP_INDEX EQUAL -1)
+    list(APPEND ALL_GEN_OUTPUT_FILES_py ${GEN_STAMP_FILE})
+  endif()
 
 endmacro()
 
 macro(_generate_module_py ARG_PKG ARG_GEN_OUTPUT_DIR ARG_GENERATED_FILES)
 
+  if(GENPY_BATCH_GENERATION)
+    # one command for all files of each type collected by
+    # _generate_msg_py and _generate_srv_py
+    foreach(type "msg" "srv")
+      if(_GENPY_${type}_FILES_${ARG_PKG})
+        if(type STREQUAL "msg")
+          set(GEN_BIN ${GENMSG_PY_BIN})
+        else()
+          set(GEN_BIN ${GENSRV_PY_BIN})
+        endif()
+        set(GEN_DEPS ${_GENPY_${type}_DEPS_${ARG_PKG}})
+        if(GEN_DEPS)
+          list(REMOVE_DUPLICATES GEN_DEPS)
+        endif()
+        list(LENGTH _GENPY_${type}_FILES_${ARG_PKG} GEN_COUNT)
+        set(GEN_STAMP_FILE ${GENPY_STAMP_DIR}/${ARG_PKG}_${type}.stamp)
+        _genpy_byproducts(GEN_BYPRODUCTS ${_GENPY_${type}_OUTPUTS_${ARG_PKG}})
+        add_custom_command(OUTPUT ${GEN_STAMP_FILE}
+          ${GEN_BYPRODUCTS}
+          DEPENDS ${GEN_BIN} ${_GENPY_${type}_FILES_${ARG_PKG}} ${GEN_DEPS}
+          COMMAND ${CATKIN_ENV} ${PYTHON_EXECUTABLE} ${GEN_BIN} ${_GENPY_${type}_FILES_${ARG_PKG}}
+          ${_GENPY_IFLAGS_${ARG_PKG}}
+          -p ${ARG_PKG}
+          -o ${ARG_GEN_OUTPUT_DIR}/${type}
+          -j ${GENPY_JOBS}
+          ${GENPY_SPEC_CACHE_ARGS}
+          --stamp-dir ${GENPY_STAMP_DIR}
+          COMMAND ${CMAKE_COMMAND} -E touch ${GEN_STAMP_FILE}
+          COMMENT "Generating Python code from ${GEN_COUNT} ${type} files of ${ARG_PKG}"
+          )
+      endif()
+      unset(_GENPY_${type}_FILES_${ARG_PKG})
+      unset(_GENPY_${type}_DEPS_${ARG_PKG})
+      unset(_GENPY_${type}_OUTPUTS_${ARG_PKG})
+    endforeach()
+    unset(_GENPY_IFLAGS_${ARG_PKG})
+  endif()
+
   # generate empty __init__ to make parent folder of msg/srv a python module
   if(NOT EXISTS ${ARG_GEN_OUTPUT_DIR}/__init__.py)
     file(WRITE ${ARG_GEN_OUTPUT_DIR}/__init__.py "")
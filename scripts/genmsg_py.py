@@ -40,8 +40,8 @@ Converts ROS .msg files in a package into Python source code implementations.
 """
 import sys
 
-import genpy.generator
-import genpy.genpy_main
+import genpy.server
 
 if __name__ == '__main__':
-    genpy.genpy_main.genmain(sys.argv, 'genmsg_py.py', genpy.generator.MsgGenerator())
+    # uses a generation server if $GENPY_SERVER_SOCKET is set, see genpy.server
+    genpy.server.client_main(sys.argv, 'genmsg_py.py', 'msg')
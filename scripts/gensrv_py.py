@@ -37,11 +37,10 @@ ROS service source code generation for Python.
 Converts ROS .srv files into Python source code implementations.
 """
 
-import os
 import sys
 
-import genpy.generator
-import genpy.genpy_main
+import genpy.server
 
 if __name__ == "__main__":
-    genpy.genpy_main.genmain(sys.argv, 'gensrv_py.py', genpy.generator.SrvGenerator())
+    # uses a generation server if $GENPY_SERVER_SOCKET is set, see genpy.server
+    genpy.server.client_main(sys.argv, 'gensrv_py.py', 'srv')
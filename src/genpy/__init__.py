@@ -30,9 +30,29 @@
 # ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
 # POSSIBILITY OF SUCH DAMAGE.
 
-from . rostime import Time, Duration, TVal
-from . message import Message, SerializationError, DeserializationError, MessageException, struct_I
+import sys
 
 __all__ = [
     'Time', 'Duration', 'TVal',
-    'Message', 'SerializationError', 'DeserializationError', 'MessageException', 'struct_I']
+    'Message', 'RawMessage', 'SerializationError', 'DeserializationError', 'MessageException', 'struct_I']
+
+if sys.version_info >= (3, 7):
+    # import the classes on first use (PEP 562), so that importing a
+    # submodule such as genpy.server does not import genmsg
+    import importlib
+
+    def __getattr__(name):
+        if name in ('message', 'rostime'):
+            return importlib.import_module('.' + name, __name__)
+        if name not in __all__:
+            raise AttributeError("module '%s' has no attribute '%s'" % (__name__, name))
+        module = 'rostime' if name in ('Time', 'Duration', 'TVal') else 'message'
+        value = getattr(importlib.import_module('.' + module, __name__), name)
+        globals()[name] = value
+        return value
+
+    def __dir__():
+        return sorted(set(globals()) | set(__all__))
+else:
+    from . rostime import Time, Duration, TVal
+    from . message import Message, RawMessage, SerializationError, DeserializationError, MessageException, struct_I
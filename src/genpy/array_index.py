@@ -0,0 +1,160 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Offset index of serialized arrays.
+
+An :class:`ArrayIndex` records where each element of an array field
+starts in a serialized message, in a single pass that only reads the
+length prefixes of the elements. Elements are then decoded on demand,
+so paging through a few elements of a huge array, e.g. the markers of
+a ``MarkerArray``, does not require decoding the whole message.
+"""
+
+import struct
+
+import genmsg.msgs
+
+from .layout import field_offset
+from .layout import get_field_class
+from .layout import is_primitive
+from .layout import skip_field
+from .layout import type_size
+from .message import DeserializationError
+from .message import MessageException
+from .projection import decode_value
+
+_length_struct = struct.Struct('<I')
+
+
+class ArrayIndex(object):
+    """
+    Lazily decoded view of an array field of a serialized message.
+
+    Supports ``len()``, iteration and indexing by position or slice.
+    The serialized buffer is referenced, not copied, and must not be
+    modified while the index is in use.
+    """
+
+    def __init__(self, msg_class, buff, path):
+        """
+        Index the elements of an array field.
+
+        :param msg_class: message class of the serialized message, ``Message class``
+        :param buff: serialized message, ``bytes`` or other buffer
+        :param path: path of the array field, see
+          :func:`genpy.layout.field_offset`, ``str``
+        :raises: :exc:`MessageException` If *path* is not an array field
+        :raises: :exc:`DeserializationError` If *buff* is truncated
+        """
+        try:
+            cls, type_, offset = field_offset(msg_class, buff, path)
+            base_type, is_array, array_len = genmsg.msgs.parse_type(type_)
+            if not is_array:
+                raise MessageException('[%s] is not an array field of %s' % (path, msg_class._type))
+            if array_len is None:
+                (array_len,) = _length_struct.unpack_from(buff, offset)
+                offset += 4
+            self._msg_class = cls
+            self._base_type = base_type
+            self._buff = buff
+            self._length = array_len
+            self._element_size = type_size(cls, base_type)
+            if self._element_size is not None:
+                # elements are located arithmetically
+                self._offsets = None
+                self._start = offset
+                self.end = offset + array_len * self._element_size
+            else:
+                offsets = []
+                for _ in range(array_len):
+                    offsets.append(offset)
+                    offset = skip_field(cls, base_type, buff, offset)
+                offsets.append(offset)
+                self._offsets = offsets
+                self.end = offset
+            if self.end > len(buff):
+                raise DeserializationError('array [%s] extends past the end of the buffer' % path)
+        except struct.error as e:
+            raise DeserializationError(e)
+
+    def __len__(self):
+        return self._length
+
+    def offset(self, i):
+        """
+        Get the location of an element in the serialized message.
+
+        :param i: position of the element, ``int``
+        :returns: start and end offset of the element, ``(int, int)``
+        """
+        if i < 0:
+            i += self._length
+        if not 0 <= i < self._length:
+            raise IndexError('array index out of range')
+        if self._offsets is None:
+            start = self._start + i * self._element_size
+            return start, start + self._element_size
+        return self._offsets[i], self._offsets[i + 1]
+
+    def raw(self, i):
+        """
+        Get the serialized data of an element without decoding it.
+
+        :param i: position of the element, ``int``
+        :returns: serialized element, ``bytes``
+        """
+        start, end = self.offset(i)
+        return bytes(self._buff[start:end])
+
+    def _decode(self, i):
+        start, _ = self.offset(i)
+        return decode_value(self._msg_class, self._base_type, self._buff, start)[0]
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return [self._decode(i) for i in range(*key.indices(self._length))]
+        return self._decode(key)
+
+    def __iter__(self):
+        for i in range(self._length):
+            yield self._decode(i)
+
+    def element_class(self):
+        """
+        Get the class of the elements.
+
+        :returns: message class, or ``None`` for arrays of builtin types, ``Message class``
+        """
+        if is_primitive(self._base_type) or self._base_type in ['string', 'time', 'duration']:
+            return None
+        return get_field_class(self._msg_class, self._base_type)
@@ -0,0 +1,304 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Batch decoding of serialized messages into NumPy columns.
+
+:func:`get_batch_decoder` creates a decoder for a message class that
+turns a buffer of many serialized messages into columns without
+creating message objects. The fields of the class are flattened as for
+:mod:`genpy.columns` and grouped into blocks: runs of fixed-size fields
+that follow each other in the serialized layout. For each class a walk
+function is generated that only records where every block starts and
+reads the length prefixes of strings and variable-length arrays. The
+values themselves are then gathered with NumPy, using strided views of
+the buffer when the blocks are evenly spaced, e.g. for fixed-size
+messages.
+
+Strings and variable-length arrays of primitives or of fixed-size
+messages are returned as :class:`RaggedColumn` (offsets and values);
+string values are the undecoded UTF-8 bytes. Arrays of strings and
+arrays of variable-size messages are skipped and listed in
+:attr:`BatchDecoder.skipped`.
+
+NumPy is required to use this module.
+"""
+
+from array import array
+import collections
+import struct
+
+import genmsg.msgs
+
+from .layout import get_field_class
+from .layout import is_primitive
+from .layout import iter_fields
+from .layout import skip_field
+from .layout import type_size
+from .message import DeserializationError
+from .message import MessageException
+
+RaggedColumn = collections.namedtuple('RaggedColumn', ['offsets', 'values'])
+RaggedColumn.__doc__ = """
+Column of a variable-length field.
+
+The values of message *i* are ``values[offsets[i]:offsets[i + 1]]``.
+"""
+
+# little-endian numpy types of the primitives
+_DTYPES = {
+    'float32': '<f4',
+    'float64': '<f8',
+    'bool': '?',
+    'int8': 'i1',
+    'int16': '<i2',
+    'int32': '<i4',
+    'int64': '<i8',
+    'uint8': 'u1',
+    'uint16': '<u2',
+    'uint32': '<u4',
+    'uint64': '<u8',
+    'char': 'u1',
+    'byte': 'i1',
+}
+# time and duration are flattened into secs and nsecs of these types
+_TIME_TYPES = {'time': 'uint32', 'duration': 'int32'}
+
+_length_struct = struct.Struct('<I')
+
+# cache for get_batch_decoder
+_decoder_cache = {}
+
+
+def _fixed_dtype(msg_class, type_):
+    """
+    Get the NumPy dtype description of a fixed-size type.
+
+    :returns: dtype description, ``str``, ``tuple`` or ``[(str, object)]``
+    """
+    base_type, is_array, array_len = genmsg.msgs.parse_type(type_)
+    if is_primitive(base_type):
+        dtype = _DTYPES[base_type]
+    elif base_type in _TIME_TYPES:
+        dtype = [('secs', _DTYPES[_TIME_TYPES[base_type]]), ('nsecs', _DTYPES[_TIME_TYPES[base_type]])]
+    else:
+        field_class = get_field_class(msg_class, base_type)
+        dtype = [(name, _fixed_dtype(field_class, t)) for name, t, _, _, _ in iter_fields(field_class)]
+    if is_array:
+        return (dtype, (array_len,))
+    return dtype
+
+
+def _leaves(msg_class, prefix=''):
+    """
+    Flatten the fields of a message class.
+
+    :returns: iterator of path, class that has the field and field
+      type, ``iter((str, Message class, str))``
+    """
+    for name, type_, base_type, is_array, array_len in iter_fields(msg_class):
+        path = prefix + name
+        if is_array or is_primitive(base_type) or base_type == 'string':
+            yield path, msg_class, type_
+        elif base_type in _TIME_TYPES:
+            yield path + '.secs', msg_class, _TIME_TYPES[base_type]
+            yield path + '.nsecs', msg_class, _TIME_TYPES[base_type]
+        else:
+            for leaf in _leaves(get_field_class(msg_class, base_type), path + '.'):
+                yield leaf
+
+
+class BatchDecoder(object):
+    """Decoder of buffers of serialized messages of one class into columns."""
+
+    def __init__(self, msg_class):
+        """
+        Create the decoder for a message class.
+
+        :param msg_class: message class, ``Message class``
+        """
+        import numpy
+        self.msg_class = msg_class
+        self.skipped = []
+        # walk plan of ['block', fields, size], ['ragged', path, element dtype]
+        # and ['skip', class that has the field, type] steps
+        plan = []
+        for path, owner, type_ in _leaves(msg_class):
+            size = type_size(owner, type_)
+            if size is not None:
+                if plan and plan[-1][0] == 'block':
+                    plan[-1][1].append((path, _fixed_dtype(owner, type_)))
+                    plan[-1][2] += size
+                else:
+                    plan.append(['block', [(path, _fixed_dtype(owner, type_))], size])
+                continue
+            base_type, is_array, array_len = genmsg.msgs.parse_type(type_)
+            if base_type == 'string' and not is_array:
+                plan.append(['ragged', path, numpy.dtype('u1')])
+            elif is_array and array_len is None and type_size(owner, base_type) is not None:
+                plan.append(['ragged', path, numpy.dtype(_fixed_dtype(owner, base_type))])
+            else:
+                self.skipped.append(path)
+                plan.append(['skip', owner, type_])
+        self._plan = plan
+        self._blocks = [(fields, numpy.dtype(fields)) for kind, fields, _ in plan if kind == 'block']
+        self._ragged = [(path, dtype) for kind, path, dtype in plan if kind == 'ragged']
+        self._empty = not plan
+        self._walk = self._generate_walk()
+
+    def _generate_walk(self):
+        """Generate the function that records block starts and the offsets of variable-length fields."""
+        params = ['buff', 'o', 'end', 'count', 'framed', 'unpack_I', 'skip']
+        body = []
+        block = ragged = skip = 0
+        for step in self._plan:
+            if step[0] == 'block':
+                params.append('b%d' % block)
+                body.append('b%d(o)' % block)
+                body.append('o += %d' % step[2])
+                block += 1
+            elif step[0] == 'ragged':
+                params.extend(['r%d_start' % ragged, 'r%d_count' % ragged])
+                body.append('(k,) = unpack_I(buff, o)')
+                body.append('r%d_start(o + 4)' % ragged)
+                body.append('r%d_count(k)' % ragged)
+                body.append('o += 4 + k * %d' % step[2].itemsize)
+                ragged += 1
+            else:
+                params.append('c%d' % skip)
+                body.append('o = skip(c%d, %r, buff, o)' % (skip, step[2]))
+                skip += 1
+        lines = ['def walk(%s):' % ', '.join(params),
+                 '    n = 0',
+                 '    while o < end and n != count:',
+                 '        if framed:',
+                 '            (length,) = unpack_I(buff, o)',
+                 '            o += 4',
+                 '            next_o = o + length']
+        lines.extend('        ' + line for line in body)
+        lines.extend(['        if framed and o != next_o:',
+                      "            raise ValueError('message length does not match its frame')",
+                      '        n += 1',
+                      '    return o, n'])
+        namespace = {}
+        exec(compile('\n'.join(lines), '<genpy.batch %s>' % self.msg_class._type, 'exec'), namespace)
+        return namespace['walk']
+
+    def decode(self, buff, count=None, offset=0, framed=False):
+        """
+        Decode serialized messages into columns.
+
+        :param buff: serialized messages, back to back or each preceded
+          by its uint32 length if *framed*, ``bytes`` or other buffer
+        :param count: maximum number of messages to decode, defaults to all, ``int``
+        :param offset: offset of the first message in *buff*, ``int``
+        :param framed: if True, messages are preceded by their length, ``bool``
+        :returns: column for each flattened field path; variable-length
+          fields are :class:`RaggedColumn`, ``{str: numpy.ndarray}``
+        :raises: :exc:`DeserializationError` If *buff* does not contain valid messages
+        """
+        import numpy
+        blocks = []
+        ragged = []
+        # walk arguments in the order of the plan
+        args = []
+        for step in self._plan:
+            if step[0] == 'block':
+                blocks.append(array('q'))
+                args.append(blocks[-1].append)
+            elif step[0] == 'ragged':
+                ragged.append((array('q'), array('q')))
+                args.extend([ragged[-1][0].append, ragged[-1][1].append])
+            else:
+                args.append(step[1])
+        if self._empty and not framed and count is None:
+            raise MessageException('%s messages are empty, they can only be decoded framed or counted' % self.msg_class._type)
+        end = len(buff)
+        try:
+            o, n = self._walk(buff, offset, end, -1 if count is None else count, framed,
+                              _length_struct.unpack_from, skip_field, *args)
+        except (struct.error, ValueError):
+            raise DeserializationError('buffer does not contain valid %s messages' % self.msg_class._type)
+        if o > end:
+            raise DeserializationError('buffer ends within a %s message' % self.msg_class._type)
+
+        u8 = numpy.frombuffer(buff, dtype=numpy.uint8)
+        columns = {}
+        for (fields, dtype), starts in zip(self._blocks, blocks):
+            values = _gather_block(numpy, buff, u8, numpy.frombuffer(starts, dtype=numpy.int64), dtype)
+            for path, _ in fields:
+                columns[path] = numpy.array(values[path])
+        for (path, dtype), (starts, counts) in zip(self._ragged, ragged):
+            columns[path] = _gather_ragged(
+                numpy, u8, numpy.frombuffer(starts, dtype=numpy.int64),
+                numpy.frombuffer(counts, dtype=numpy.int64), dtype)
+        return columns
+
+
+def _gather_block(numpy, buff, u8, starts, dtype):
+    """Gather the blocks starting at *starts* into a structured array."""
+    n = len(starts)
+    if n == 0:
+        return numpy.zeros(0, dtype=dtype)
+    stride = int(starts[1] - starts[0]) if n > 1 else dtype.itemsize
+    if stride >= dtype.itemsize and (n < 3 or (numpy.diff(starts) == stride).all()):
+        # evenly spaced, e.g. fixed-size messages: view the buffer in place
+        return numpy.ndarray((n,), dtype=dtype, buffer=buff, offset=int(starts[0]), strides=(stride,))
+    index = starts[:, None] + numpy.arange(dtype.itemsize)
+    return u8[index].reshape(-1).view(dtype)
+
+
+def _gather_ragged(numpy, u8, starts, counts, dtype):
+    """Gather the values of a variable-length field into a RaggedColumn."""
+    offsets = numpy.zeros(len(counts) + 1, dtype=numpy.int64)
+    numpy.cumsum(counts, out=offsets[1:])
+    lengths = counts * dtype.itemsize
+    total = int(lengths.sum())
+    if not total:
+        return RaggedColumn(offsets, numpy.zeros(0, dtype=dtype))
+    byte_offsets = offsets[:-1] * dtype.itemsize
+    index = numpy.arange(total) + numpy.repeat(starts - byte_offsets, lengths)
+    return RaggedColumn(offsets, u8[index].view(dtype))
+
+
+def get_batch_decoder(msg_class):
+    """
+    Get the batch decoder of a message class.
+
+    NOTE: this function maintains a local cache of results.
+    :param msg_class: message class, ``Message class``
+    :returns: decoder, ``BatchDecoder``
+    """
+    decoder = _decoder_cache.get(msg_class)
+    if decoder is None:
+        decoder = _decoder_cache[msg_class] = BatchDecoder(msg_class)
+    return decoder
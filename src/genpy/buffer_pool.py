@@ -0,0 +1,289 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Pool of reusable serialization buffers.
+
+Generated serialize() methods write into any file-like object, so a
+:class:`PooledBuffer` can be passed to them in place of a fresh
+``BytesIO``. The :class:`BufferPool` sizes the buffers it hands out
+from a running estimate of the serialized length of each message type,
+so that in steady state serializing a message does not allocate.
+
+:meth:`genpy.Message.serialize_pooled` is the entry point for
+publishers. It serializes into the pool set as ``_buffer_pool`` on the
+message class, or into the process-wide pool returned by
+:func:`get_default_pool`.
+"""
+
+import threading
+
+# smallest buffer handed out by a pool
+_MIN_CAPACITY = 256
+
+# fraction of the previous estimate that is kept when smaller messages
+# are serialized. The estimate follows increases immediately and
+# decays slowly, so occasional small messages don't shrink the buffers.
+_ESTIMATE_DECAY = 0.95
+
+
+def _round_capacity(size):
+    """
+    Round buffer size up to a power of two so buffers can be shared between types.
+
+    :param size: required size, ``int``
+    :returns: buffer capacity, ``int``
+    """
+    capacity = _MIN_CAPACITY
+    while capacity < size:
+        capacity *= 2
+    return capacity
+
+
+class PooledBuffer(object):
+    """
+    File-like write buffer backed by a reusable ``bytearray``.
+
+    Only the methods used by generated serialize() methods are
+    provided. The written data is available without copying from
+    :meth:`view`. Views must be released before the buffer is written
+    to again or returned to its pool. Pools reuse the buffer objects
+    themselves, so a buffer must not be used after it was released.
+    """
+
+    __slots__ = ['_data', '_size', '_pool']
+
+    def __init__(self, data, pool=None):
+        """
+        Create a buffer that writes into *data*.
+
+        :param data: backing storage, ``bytearray``
+        :param pool: pool the buffer is returned to by :meth:`release`, ``BufferPool``
+        """
+        self._data = data
+        self._size = 0
+        self._pool = pool
+
+    def write(self, data):
+        """
+        Append data to the buffer, growing the backing storage if necessary.
+
+        :param data: data to write, ``bytes`` or other bytes-like object
+        """
+        end = self._size + len(data)
+        if end > len(self._data):
+            self._grow(end)
+        self._data[self._size:end] = data
+        self._size = end
+
+    def _grow(self, size):
+        capacity = _round_capacity(max(size, 2 * len(self._data)))
+        self._data.extend(b'\0' * (capacity - len(self._data)))
+        if self._pool is not None:
+            self._pool._resized()
+
+    def tell(self):
+        return self._size
+
+    def seek(self, pos):
+        self._size = pos
+
+    def truncate(self, size=None):
+        """Discard data written after *size*, or all data by default."""
+        self._size = 0 if size is None else size
+
+    def view(self):
+        """
+        Get the written data without copying it.
+
+        :returns: view of the data written so far, ``memoryview``
+        """
+        return memoryview(self._data)[:self._size]
+
+    def getvalue(self):
+        """
+        Get a copy of the written data, as with ``BytesIO``.
+
+        :returns: data written so far, ``bytes``
+        """
+        return bytes(self._data[:self._size])
+
+    def capacity(self):
+        return len(self._data)
+
+    def release(self):
+        """Return the buffer to its pool."""
+        if self._pool is not None:
+            pool, self._pool = self._pool, None
+            pool.release(self)
+
+    def __len__(self):
+        return self._size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+
+class BufferPool(object):
+    """
+    Thread-safe pool of reusable serialization buffers.
+
+    Buffers are sized from a running estimate of the serialized length
+    of each message type. :meth:`stats` reports how often a pooled
+    buffer could be reused (hits), how often a new buffer had to be
+    allocated (misses) and how often a buffer had to grow while a
+    message was serialized into it (resizes).
+    """
+
+    def __init__(self, max_buffers=16):
+        """
+        Create an empty pool.
+
+        :param max_buffers: maximum number of idle buffers kept by the pool, ``int``
+        """
+        self.max_buffers = max_buffers
+        self._lock = threading.Lock()
+        self._free = []
+        self._estimates = {}
+        self._hits = 0
+        self._misses = 0
+        self._resizes = 0
+
+    def size_hint(self, msg_type):
+        """
+        Get the estimated serialized length of a message type.
+
+        :param msg_type: message type name, ``str``
+        :returns: estimated serialized length of messages of *msg_type*, ``int``
+        """
+        return self._estimates.get(msg_type, 0)
+
+    def acquire(self, size_hint=0):
+        """
+        Get an empty buffer with a capacity of at least *size_hint* bytes.
+
+        :param size_hint: expected number of bytes to write, ``int``
+        :returns: buffer, ``PooledBuffer``
+        """
+        with self._lock:
+            # best fit: use the smallest free buffer that is large enough
+            best = None
+            for i, buff in enumerate(self._free):
+                if len(buff._data) >= size_hint and (best is None or len(buff._data) < len(self._free[best]._data)):
+                    best = i
+            if best is not None:
+                self._hits += 1
+                buff = self._free.pop(best)
+                buff._pool = self
+                return buff
+            self._misses += 1
+        return PooledBuffer(bytearray(_round_capacity(size_hint)), self)
+
+    def release(self, buff):
+        """
+        Return a buffer to the pool.
+
+        :param buff: buffer returned by :meth:`acquire`, ``PooledBuffer``
+        """
+        buff._size = 0
+        buff._pool = None
+        with self._lock:
+            self._free.append(buff)
+            if len(self._free) > self.max_buffers:
+                # keep the largest buffers, which can serve any request
+                self._free.remove(min(self._free, key=PooledBuffer.capacity))
+
+    def _resized(self):
+        with self._lock:
+            self._resizes += 1
+
+    def serialize(self, msg):
+        """
+        Serialize a message into a pooled buffer.
+
+        The buffer should be released, e.g. by using it as a context
+        manager, once the data has been sent::
+
+          with pool.serialize(msg) as buff:
+              sock.sendall(buff.view())
+
+        :param msg: message to serialize, ``Message``
+        :returns: buffer containing the serialized message, ``PooledBuffer``
+        """
+        msg_type = msg._type
+        buff = self.acquire(self._estimates.get(msg_type, 0))
+        try:
+            msg.serialize(buff)
+        except Exception:
+            buff.release()
+            raise
+        size = buff._size
+        with self._lock:
+            estimate = int(self._estimates.get(msg_type, 0) * _ESTIMATE_DECAY)
+            self._estimates[msg_type] = max(size, estimate)
+        return buff
+
+    def stats(self):
+        """
+        Get pool statistics.
+
+        :returns: pool statistics with keys ``hits``, ``misses``,
+          ``resizes`` and ``free``, ``dict``
+        """
+        with self._lock:
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'resizes': self._resizes,
+                'free': len(self._free),
+            }
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def get_default_pool():
+    """
+    Get the process-wide buffer pool used by :meth:`genpy.Message.serialize_pooled`.
+
+    :returns: default pool, ``BufferPool``
+    """
+    global _default_pool
+    if _default_pool is None:
+        with _default_pool_lock:
+            if _default_pool is None:
+                _default_pool = BufferPool()
+    return _default_pool
@@ -0,0 +1,195 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Conversion between lists of messages and NumPy columns.
+
+Columns are keyed by the flattened field paths of the message class
+(see :func:`genpy.layout.flatten_fields`), e.g. ``pose.position.x``
+or ``header.stamp.secs``. The code that reads and writes the fields is
+compiled once per message class and set of paths: values are extracted
+with a single ``operator.attrgetter`` per message and messages are
+built by a generated function, instead of per-field ``getattr`` chains.
+
+Numeric fields and fixed-length numeric arrays become typed arrays
+(two-dimensional for arrays); strings, byte arrays, variable-length
+arrays and arrays of messages become object arrays.
+
+NumPy is required to use this module.
+"""
+
+import operator
+
+import genmsg.msgs
+
+from .generate_numpy import NUMPY_DTYPE
+from .layout import flatten_fields
+from .message import MessageException
+
+# caches for get_column_paths, _get_extractor and _get_builder
+_paths_cache = {}
+_extractor_cache = {}
+_builder_cache = {}
+
+
+def get_column_paths(msg_class, fields=None):
+    """
+    Get the column paths of a message class.
+
+    :param msg_class: message class, ``Message class``
+    :param fields: field paths or prefixes of field paths to select,
+      e.g. ``pose.position``. Defaults to all fields, ``[str]``
+    :returns: flattened field paths and types, ``[(str, str)]``
+    :raises: :exc:`MessageException` If a field does not match any path
+    """
+    key = (msg_class, None if fields is None else tuple(fields))
+    if key in _paths_cache:
+        return _paths_cache[key]
+    paths = flatten_fields(msg_class)
+    if fields is not None:
+        selected = []
+        for field in fields:
+            matches = [(p, t) for p, t in paths if p == field or p.startswith(field + '.')]
+            if not matches:
+                raise MessageException('%s has no field [%s]' % (msg_class._type, field))
+            selected.extend(m for m in matches if m not in selected)
+        paths = selected
+    _paths_cache[key] = paths
+    return paths
+
+
+def _get_dtype(numpy, type_):
+    """
+    Get the NumPy dtype of a column.
+
+    :returns: dtype, or ``None`` for object columns
+    """
+    base_type, is_array, array_len = genmsg.msgs.parse_type(type_)
+    if base_type in ['uint8', 'char'] and is_array:
+        # uint8 arrays are bytes
+        return None
+    if base_type not in NUMPY_DTYPE or (is_array and array_len is None):
+        return None
+    if base_type == 'bool':
+        return numpy.bool_
+    return getattr(numpy, NUMPY_DTYPE[base_type].split('.')[1])
+
+
+def _get_extractor(msg_class, paths):
+    key = (msg_class, paths)
+    if key not in _extractor_cache:
+        getter = operator.attrgetter(*paths)
+        if len(paths) == 1:
+            # attrgetter with a single path does not return a tuple
+            single = getter
+
+            def getter(msg):
+                return (single(msg),)
+        _extractor_cache[key] = getter
+    return _extractor_cache[key]
+
+
+def _get_builder(msg_class, paths):
+    key = (msg_class, paths)
+    if key not in _builder_cache:
+        args = ['c%d' % i for i in range(len(paths))]
+        lines = ['def build(msg_class, %s):' % ', '.join(args),
+                 '    msgs = []',
+                 '    for values in zip(%s):' % ', '.join(args),
+                 '        msg = msg_class()']
+        for i, path in enumerate(paths):
+            lines.append('        msg.%s = values[%d]' % (path, i))
+        lines.extend(['        msgs.append(msg)',
+                      '    return msgs'])
+        namespace = {}
+        exec(compile('\n'.join(lines), '<genpy.columns %s>' % msg_class._type, 'exec'), namespace)
+        _builder_cache[key] = namespace['build']
+    return _builder_cache[key]
+
+
+def to_columns(msg_class, messages, fields=None):
+    """
+    Convert messages to columns.
+
+    :param msg_class: class of the messages, ``Message class``
+    :param messages: messages to convert, ``[Message]``
+    :param fields: field paths or prefixes to convert, defaults to all fields, ``[str]``
+    :returns: column for each flattened field path, ``{str: numpy.ndarray}``
+    """
+    import numpy
+    paths = get_column_paths(msg_class, fields)
+    getter = _get_extractor(msg_class, tuple(p for p, _ in paths))
+    rows = [getter(msg) for msg in messages]
+    columns = {}
+    for i, (path, type_) in enumerate(paths):
+        values = [row[i] for row in rows]
+        dtype = _get_dtype(numpy, type_)
+        if dtype is not None:
+            columns[path] = numpy.array(values, dtype=dtype)
+        else:
+            # filled element-wise so that sequences are not turned into dimensions
+            column = numpy.empty(len(values), dtype=object)
+            for j, value in enumerate(values):
+                column[j] = value
+            columns[path] = column
+    return columns
+
+
+def from_columns(msg_class, columns):
+    """
+    Build messages from columns.
+
+    Fields without a column keep their default values.
+
+    :param msg_class: class of the messages, ``Message class``
+    :param columns: column for each flattened field path, as returned
+      by :func:`to_columns`, ``{str: numpy.ndarray}``
+    :returns: messages, ``[Message]``
+    :raises: :exc:`MessageException` If a column is not a field of *msg_class*
+    """
+    types = dict(flatten_fields(msg_class))
+    paths = tuple(sorted(columns))
+    for path in paths:
+        if path not in types:
+            raise MessageException('%s has no field [%s]' % (msg_class._type, path))
+    if len(set(len(columns[path]) for path in paths)) > 1:
+        raise MessageException('columns have different lengths')
+    values = []
+    for path in paths:
+        column = columns[path]
+        if getattr(column, 'dtype', None) is not None and column.dtype != object:
+            # convert to Python values that the generated serializers accept
+            column = column.tolist()
+        values.append(column)
+    if not paths:
+        return []
+    return _get_builder(msg_class, paths)(msg_class, *values)
@@ -0,0 +1,230 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+ctypes mapping of fixed-layout messages.
+
+Messages that only contain fixed-size fields (primitives, time,
+duration, fixed-length arrays of those and embedded messages made of
+them) have a serialized form with a constant layout. For these types,
+:func:`get_ctypes_struct` creates a packed little-endian
+``ctypes.Structure`` with the same layout, so that a received buffer
+can be viewed as a C struct in place with ``from_buffer()`` and handed
+to C libraries without serializing and copying.
+
+The structures are created on first use instead of being emitted into
+the generated message modules, so that importing messages does not
+require ctypes.
+"""
+
+import ctypes
+
+from .layout import get_field_class
+from .layout import is_primitive
+from .layout import iter_fields
+from .message import MessageException
+from .rostime import Duration
+from .rostime import Time
+
+_CTYPES = {
+    'int8': ctypes.c_int8,
+    'uint8': ctypes.c_uint8,
+    'bool': ctypes.c_uint8,
+    'int16': ctypes.c_int16,
+    'uint16': ctypes.c_uint16,
+    'int32': ctypes.c_int32,
+    'uint32': ctypes.c_uint32,
+    'int64': ctypes.c_int64,
+    'uint64': ctypes.c_uint64,
+    'float32': ctypes.c_float,
+    'float64': ctypes.c_double,
+    # deprecated
+    'char': ctypes.c_uint8,
+    'byte': ctypes.c_int8,
+}
+
+
+class MessageStructure(ctypes.LittleEndianStructure):
+    """
+    Base class of ctypes structures created by :func:`get_ctypes_struct`.
+
+    Instances can be created from a serialized message with the
+    ``from_buffer()`` (in place, requires a writable buffer) and
+    ``from_buffer_copy()`` class methods of ``ctypes.Structure``.
+    Serialized data is available with ``bytes(struct)``.
+    """
+
+    _pack_ = 1
+    # message class of the structure, or Time/Duration
+    _msg_class = None
+
+    @classmethod
+    def from_message(cls, msg):
+        """
+        Create a structure from a message instance.
+
+        :param msg: message to convert, ``Message``
+        :returns: structure with the field values of *msg*, ``MessageStructure``
+        """
+        struct = cls()
+        for name, converter in cls._converters:
+            value = getattr(msg, name)
+            if converter is None:
+                setattr(struct, name, value)
+            else:
+                setattr(struct, name, converter.from_value(value))
+        return struct
+
+    def to_message(self):
+        """
+        Convert the structure to a message instance.
+
+        :returns: message with the field values of this structure, ``Message``
+        """
+        msg = self._msg_class()
+        for name, converter in self._converters:
+            value = getattr(self, name)
+            if converter is None:
+                setattr(msg, name, value)
+            else:
+                setattr(msg, name, converter.to_value(value))
+        return msg
+
+
+class _Converter(object):
+    """Conversion of field values that are not stored as-is in a structure."""
+
+    def __init__(self, ctype, to_value, from_value):
+        self.ctype = ctype
+        self.to_value = to_value
+        self.from_value = from_value
+
+
+# cache for get_ctypes_struct
+_struct_cache = {}
+
+
+def _time_struct(cls, ctype):
+    if cls not in _struct_cache:
+        struct = type('%sStructure' % cls.__name__, (MessageStructure,), {
+            '_fields_': [('secs', ctype), ('nsecs', ctype)],
+            '_msg_class': cls,
+            '_converters': [('secs', None), ('nsecs', None)],
+        })
+        _struct_cache[cls] = struct
+    return _struct_cache[cls]
+
+
+def _field_converter(msg_class, name, base_type, is_array, array_len):
+    """
+    Compute the ctypes type of a field and how to convert its values.
+
+    :returns: ctypes type and converter, or ``None`` if values are
+      stored as-is, ``(type, _Converter)``
+    :raises: :exc:`MessageException` If the field is not fixed-size
+    """
+    if base_type == 'string' or (is_array and array_len is None):
+        raise MessageException('field %s of %s is not fixed-size' % (name, msg_class._type))
+
+    if is_primitive(base_type):
+        ctype = _CTYPES[base_type]
+        if base_type == 'bool':
+            element = _Converter(ctype, bool, int)
+        else:
+            element = None
+    else:
+        struct = get_ctypes_struct(get_field_class(msg_class, base_type))
+        ctype = struct
+        element = _Converter(struct, struct.to_message, struct.from_message)
+
+    if not is_array:
+        return ctype, element
+
+    array_type = ctype * array_len
+    if base_type in ['uint8', 'char']:
+        # uint8/char arrays are represented as bytes
+        return array_type, _Converter(
+            array_type,
+            lambda value: bytes(bytearray(value)),
+            lambda value: array_type(*bytearray(value)))
+    if element is None:
+        return array_type, _Converter(array_type, list, lambda value: array_type(*value))
+    return array_type, _Converter(
+        array_type,
+        lambda value: [element.to_value(v) for v in value],
+        lambda value: array_type(*[element.from_value(v) for v in value]))
+
+
+def get_ctypes_struct(msg_class):
+    """
+    Get the ctypes structure that matches the serialized layout of a message class.
+
+    NOTE: this function maintains a local cache of results.
+    :param msg_class: message class, ``Message class``
+    :returns: packed little-endian structure class, ``MessageStructure class``
+    :raises: :exc:`MessageException` If the message is not fixed-size
+    """
+    if msg_class in _struct_cache:
+        return _struct_cache[msg_class]
+    if msg_class is Time:
+        return _time_struct(Time, ctypes.c_uint32)
+    if msg_class is Duration:
+        return _time_struct(Duration, ctypes.c_int32)
+
+    fields = []
+    converters = []
+    for name, type_, base_type, is_array, array_len in iter_fields(msg_class):
+        ctype, converter = _field_converter(msg_class, name, base_type, is_array, array_len)
+        fields.append((name, ctype))
+        converters.append((name, converter))
+    struct = type('%sStructure' % msg_class.__name__, (MessageStructure,), {
+        '_fields_': fields,
+        '_msg_class': msg_class,
+        '_converters': converters,
+    })
+    _struct_cache[msg_class] = struct
+    return struct
+
+
+def is_fixed_layout(msg_class):
+    """
+    Check if a message class has a fixed serialized layout.
+
+    :param msg_class: message class, ``Message class``
+    :returns: ``True`` if :func:`get_ctypes_struct` can map *msg_class*, ``bool``
+    """
+    try:
+        get_ctypes_struct(msg_class)
+        return True
+    except MessageException:
+        return False
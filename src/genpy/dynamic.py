@@ -39,18 +39,103 @@ try:
 except ImportError:
     from io import StringIO  # Python 3.x
 
-import atexit
+try:
+    import copyreg  # Python 3.x
+except ImportError:
+    import copy_reg as copyreg  # Python 2.x
+
+import collections
+import errno
+import hashlib
+import itertools
+import marshal
 import os
-import re
-import shutil
 import sys
 import tempfile
+import types
+import weakref
 
 import genmsg
 import genmsg.msg_loader
 from genmsg import MsgContext, MsgGenerationException
 
+from . generator import generator_fingerprint
 from . generator import msg_generator
+from . generator import NameStrategy
+from . message import Message
+
+# counter for the names of the modules created by generate_dynamic
+_module_counter = itertools.count()
+
+DEFAULT_CACHE_SIZE = 4096
+
+# LRU cache of the classes returned by generate_dynamic, keyed by the
+# digest of the core type and message definition. Also used to resolve
+# pickled references to dynamic classes.
+_class_cache = collections.OrderedDict()
+_class_cache_size = DEFAULT_CACHE_SIZE
+
+# the classes of every definition that still has live classes, keyed
+# like _class_cache. Each class references the classes of the
+# definition it was generated from, so evicted classes are found here
+# as long as any of them (or an instance) is in use.
+_live_classes = weakref.WeakValueDictionary()
+
+# on-disk cache of generated code, see enable_disk_cache()
+_disk_cache_dir = None
+_disk_cache_max_size = 0
+# total size of the entries in the on-disk cache as of the last scan,
+# plus the entries stored since, or None before the first scan
+_disk_cache_used = None
+_fingerprint = None
+
+DEFAULT_DISK_CACHE_SIZE = 64 * 1024 * 1024
+
+
+class DynamicMessageMeta(type):
+    """
+    Metaclass of dynamically generated message classes.
+
+    Dynamic classes live in modules that other processes cannot import,
+    so they are pickled as a reference to the message definition they
+    were generated from instead of by name. Within a process, the
+    reference resolves to the same class while the class is in use,
+    see :func:`set_cache_size`.
+    """
+
+    pass
+
+
+def _reduce_dynamic_class(cls):
+    source = cls.__dict__.get('_dynamic_source')
+    if source is None:
+        # the DynamicMessage base class, which can be pickled by name
+        return cls.__name__
+    core_type, msg_cat = source
+    return _load_dynamic_class, (cls._type, core_type, msg_cat)
+
+
+copyreg.pickle(DynamicMessageMeta, _reduce_dynamic_class)
+
+
+def _load_dynamic_class(type_, core_type, msg_cat):
+    """
+    Resolve a pickled reference to a dynamic message class.
+
+    The classes come from the cache of generate_dynamic, so each
+    message definition is generated at most once per process.
+    """
+    return generate_dynamic(core_type, msg_cat)[type_]
+
+
+class _ClassMap(dict):
+    """Message classes of a definition, keyed by type. Can be weakly referenced."""
+
+    __slots__ = ['__weakref__']
+
+
+# base class of dynamically generated message classes
+DynamicMessage = DynamicMessageMeta('DynamicMessage', (Message,), {'__slots__': [], '__module__': __name__})
 
 
 def _generate_dynamic_specs(msg_context, specs, dep_msg):
@@ -81,47 +166,318 @@ def _gen_dyn_name(pkg, base_type):
     return '_%s__%s' % (pkg, base_type)
 
 
-def _gen_dyn_modify_references(py_text, current_type, types):
+class _DynamicNameStrategy(NameStrategy):
+    """
+    Naming strategy of dynamically generated message classes.
+
+    All classes generated together live in a single module and refer to
+    each other directly, so no imports are needed. The class names are
+    modified so that the classes can safely co-exist with statically
+    generated classes.
     """
-    Modify the generated code to rewrite names such that the code can safely co-exist with messages of the same name.
 
-    :param py_text: genmsg_py-generated Python source code, ``str``
-    :returns: updated text, ``str``
+    def __init__(self, class_names=None):
+        """
+        :param class_names: class name of each message type, defaults
+          to the names of _gen_dyn_name, ``{str: str}``
+        """  # noqa: D205, D400
+        self.class_names = class_names
+
+    def class_name(self, package, base_type):
+        if self.class_names is None:
+            return _gen_dyn_name(package, base_type)
+        return self.class_names['%s/%s' % (package, base_type)]
+
+    def base_class(self, package, base_type):
+        # the picklable base class
+        return 'genpy.dynamic.DynamicMessage'
+
+    def reference(self, package, base_type):
+        return self.class_name(package, base_type)
+
+    def header_reference(self):
+        return self.class_name('std_msgs', 'Header')
+
+    def import_str(self, package):
+        return None
+
+
+_dynamic_naming = _DynamicNameStrategy()
+
+
+def enable_disk_cache(path=None, max_size=DEFAULT_DISK_CACHE_SIZE):
+    """
+    Cache the code generated by generate_dynamic on disk.
+
+    Entries are keyed by the digest of the message definition and are
+    only used by the same Python version and genpy code generator that
+    created them. When the cache grows beyond *max_size*, the least
+    recently used entries are removed until it is at three quarters of
+    *max_size*. The cache can also be enabled with the
+    ``GENPY_DYNAMIC_CACHE_DIR`` environment variable.
+
+    :param path: cache directory, defaults to ``genpy/dynamic`` in the
+      user cache directory (``$XDG_CACHE_HOME`` or ``~/.cache``), ``str``
+    :param max_size: maximum total size of the cache in bytes, ``int``
     """
-    for t in types:
-        pkg, base_type = genmsg.package_resource_name(t)
-        gen_name = _gen_dyn_name(pkg, base_type)
+    global _disk_cache_dir, _disk_cache_max_size, _disk_cache_used
+    if path is None:
+        cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+        path = os.path.join(cache_home, 'genpy', 'dynamic')
+    _disk_cache_dir = path
+    _disk_cache_max_size = max_size
+    _disk_cache_used = None
 
-        # Several things we have to rewrite:
-        # - remove any import statements
-        py_text = py_text.replace('import %s.msg' % pkg, '')
-        # - rewrite any references to class
-        if '%s.msg.%s' % (pkg, base_type) in py_text:
-            # only call expensive re.sub if the class name is in the string
-            py_text = re.sub(r'(?<!\w)%s\.msg\.%s(?!\w)' % (pkg, base_type), gen_name, py_text)
 
-    pkg, base_type = genmsg.package_resource_name(current_type)
-    gen_name = _gen_dyn_name(pkg, base_type)
-    # - class declaration
-    py_text = py_text.replace('class %s(' % base_type, 'class %s(' % gen_name)
-    # - super() references for __init__
-    py_text = py_text.replace('super(%s,' % base_type, 'super(%s,' % gen_name)
-    # std_msgs/Header also has to be rewritten to be a local reference
-    py_text = py_text.replace('std_msgs.msg._Header.Header', _gen_dyn_name('std_msgs', 'Header'))
-    return py_text
+def disable_disk_cache():
+    """Stop using the on-disk cache of generate_dynamic."""
+    global _disk_cache_dir
+    _disk_cache_dir = None
+
+
+def set_cache_size(size=DEFAULT_CACHE_SIZE):
+    """
+    Set the number of definitions in the in-process cache of generate_dynamic.
+
+    The classes of definitions that are evicted from the cache are
+    still returned by later calls as long as any of them, or an
+    instance of them, is in use. Only after that, they are generated
+    again, and the new classes differ from the old ones: a message
+    pickled before and unpickled after that point has a new class and
+    does not compare equal to messages of the old class. Use ``None``
+    for an unbounded cache if that matters.
+
+    Cached classes are shared by all callers that generate the same
+    definition. Class-level settings, such as ``_raw_strings`` or
+    ``_string_interner``, made by one caller therefore apply to every
+    other user of the definition. Subclass the returned class to
+    change them for one use only.
+
+    :param size: maximum number of cached definitions, or ``None`` for no limit, ``int``
+    """
+    global _class_cache_size
+    _class_cache_size = size
+    if size is not None:
+        while len(_class_cache) > size:
+            _class_cache.popitem(last=False)
+
+
+def clear_cache():
+    """
+    Clear the in-process cache of classes returned by generate_dynamic.
+
+    Later calls generate new classes, even for definitions whose old
+    classes are still in use.
+    """
+    _class_cache.clear()
+    _live_classes.clear()
+
+
+def _get_fingerprint():
+    """
+    Get the digest of the Python version and the genpy code generator.
+
+    NOTE: this function maintains a local cache of results.
+    """
+    global _fingerprint
+    if _fingerprint is None:
+        h = hashlib.md5(sys.version.encode('utf-8'))
+        h.update(generator_fingerprint().encode('utf-8'))
+        try:
+            with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dynamic.py'), 'rb') as f:
+                h.update(f.read())
+        except IOError:
+            pass
+        _fingerprint = h.hexdigest()
+    return _fingerprint
+
+
+def _entry_path(key):
+    # entries of other Python versions or code generators have other names
+    name = hashlib.md5((_get_fingerprint() + key).encode('utf-8')).hexdigest()
+    return os.path.join(_disk_cache_dir, name + '.genpy')
+
+
+def _load_code(key, core_type):
+    """
+    Load generated code from the on-disk cache.
+
+    :returns: compiled code, or ``None`` if the cache has no valid entry, ``code``
+    """
+    path = _entry_path(key)
+    try:
+        with open(path, 'rb') as f:
+            if marshal.load(f) != (_get_fingerprint(), core_type):
+                return None
+            _, code = marshal.load(f)
+    except (IOError, OSError):
+        return None
+    except (EOFError, ValueError, TypeError):
+        # corrupt entry
+        _remove(path)
+        return None
+    try:
+        # mark the entry as recently used
+        os.utime(path, None)
+    except OSError:
+        pass
+    return code
+
+
+def _store_code(key, core_type, full_text, code):
+    """Store generated source and code in the on-disk cache."""
+    global _disk_cache_used
+    try:
+        os.makedirs(_disk_cache_dir)
+    except OSError as e:
+        if e.errno != errno.EEXIST:
+            return
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=_disk_cache_dir, suffix='.tmp')
+    except OSError:
+        return
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            marshal.dump((_get_fingerprint(), core_type), f)
+            marshal.dump((full_text, code), f)
+            size = f.tell()
+        # concurrent writers of the same entry write the same contents.
+        # os.rename does not replace existing files on Windows
+        getattr(os, 'replace', os.rename)(tmp_path, _entry_path(key))
+    except (IOError, OSError):
+        _remove(tmp_path)
+        return
+    # the cache directory is only scanned again once the entries stored
+    # since the last scan may exceed the maximum size. Entries stored by
+    # other processes are counted by that scan.
+    if _disk_cache_used is not None:
+        _disk_cache_used += size
+    if _disk_cache_used is None or _disk_cache_used > _disk_cache_max_size:
+        _evict()
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _evict():
+    """Remove the least recently used entries of the on-disk cache if it exceeds its maximum size."""
+    global _disk_cache_used
+    entries = []
+    total = 0
+    for name in os.listdir(_disk_cache_dir):
+        if not name.endswith('.genpy'):
+            continue
+        path = os.path.join(_disk_cache_dir, name)
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        entries.append((st.st_mtime, st.st_size, path))
+        total += st.st_size
+    entries.sort()
+    # leave room for later entries, so that a full cache is not scanned
+    # on every store
+    limit = _disk_cache_max_size if total <= _disk_cache_max_size else _disk_cache_max_size * 3 // 4
+    for _, size, path in entries:
+        if total <= limit:
+            break
+        _remove(path)
+        total -= size
+    _disk_cache_used = total
+
+
+def _cache_key(core_type, msg_cat):
+    h = hashlib.md5(core_type.encode('utf-8') + b'\n')
+    h.update(msg_cat if isinstance(msg_cat, bytes) else msg_cat.encode('utf-8'))
+    return h.hexdigest()
+
+
+def _cache_get(key):
+    messages = _class_cache.get(key)
+    if messages is None:
+        messages = _live_classes.get(key)
+    return messages
+
+
+def _cache_put(key, messages):
+    _class_cache.pop(key, None)
+    if _class_cache_size is not None:
+        while _class_cache and len(_class_cache) >= _class_cache_size:
+            _class_cache.popitem(last=False)
+    _class_cache[key] = messages
+    _live_classes[key] = messages
 
 
 def generate_dynamic(core_type, msg_cat):
     """
     Dynamically generate message classes from msg_cat .msg text gendeps dump.
 
-    This method modifies sys.path to include a temp file directory.
+    The generated code is compiled in memory, without temporary files
+    or changes to sys.path. Results are cached by the digest of
+    *core_type* and *msg_cat*, so repeated calls with the same
+    definition return the same classes, see :func:`set_cache_size`.
+
+    NOTE: this function maintains a local cache of results.
     :param core_type str: top-level ROS message type of concatenated .msg text
     :param msg_cat str: concatenation of full message text (output of gendeps --cat)
     :raises: MsgGenerationException If dep_msg is improperly formatted
     """
+    key = _cache_key(core_type, msg_cat)
+    messages = _cache_get(key)
+    if messages is None:
+        messages = _generate_dynamic(core_type, msg_cat, key)
+    _cache_put(key, messages)
+    return dict(messages)
+
+
+def generate_dynamic_batch(definitions):
+    """
+    Dynamically generate the message classes of many message definitions at once.
+
+    Message types that several definitions depend on, e.g.
+    std_msgs/Header, are generated once and shared by the results, and
+    all classes are compiled into a single module. A message type with
+    different definitions (md5sums) gets one class per definition.
+    Results are cached like those of :func:`generate_dynamic`.
+
+    NOTE: this function maintains a local cache of results.
+    :param definitions: top-level ROS message type and concatenated .msg text
+      (output of gendeps --cat) of each definition, ``[(str, str)]``
+    :returns: message classes of each definition, keyed by message type, ``[{str: Message class}]``
+    :raises: MsgGenerationException If a definition is improperly formatted
+    """
+    definitions = list(definitions)
+    keys = [_cache_key(core_type, msg_cat) for core_type, msg_cat in definitions]
+    found = {}
+    pending = collections.OrderedDict()
+    for key, definition in zip(keys, definitions):
+        if key in found or key in pending:
+            continue
+        messages = _cache_get(key)
+        if messages is None:
+            pending[key] = definition
+        else:
+            found[key] = messages
+    if pending:
+        found.update(_generate_dynamic_batch(pending))
+    for key in found:
+        _cache_put(key, found[key])
+    return [dict(found[key]) for key in keys]
+
+
+def _load_specs(core_type, msg_cat):
+    """
+    Parse the message definitions in msg_cat.
+
+    :returns: message specs keyed by type, and a context that has
+      them registered, ``({str: MsgSpec}, MsgContext)``
+    :raises: MsgGenerationException If dep_msg is improperly formatted
+    """
     msg_context = MsgContext.create_default()
-    core_pkg, core_base_type = genmsg.package_resource_name(core_type)
 
     # REP 100: pretty gross hack to deal with the fact that we moved
     # Header. Header is 'special' because it can be used w/o a package
@@ -146,54 +502,121 @@ def generate_dynamic(core_type, msg_cat):
     # types. The types have to be registered globally in order for
     # message generation of dependents to work correctly.
     msg_context = genmsg.msg_loader.MsgContext.create_default()
-    search_path = {}  # no ability to dynamically load
     for t, spec in specs.items():
         msg_context.register(t, spec)
+    return specs, msg_context
 
-    # process actual MsgSpecs: we accumulate them into a single file,
-    # rewriting the generated text as needed
-    buff = StringIO()
-    for t, spec in specs.items():
-        pkg, s_type = genmsg.package_resource_name(t)
-        # dynamically generate python message code
-        for line in msg_generator(msg_context, spec, search_path):
-            line = _gen_dyn_modify_references(line, t, list(specs.keys()))
-            buff.write(line + '\n')
-    full_text = buff.getvalue()
-
-    # Create a temporary directory
-    tmp_dir = tempfile.mkdtemp(prefix='genpy_')
 
-    # Afterwards, we are going to remove the directory so that the .pyc file gets cleaned up if it's still around
-    atexit.register(shutil.rmtree, tmp_dir)
+def _exec_module(code):
+    """
+    Execute generated code in a new module.
 
-    # write the entire text to a file and import it (it will get deleted when tmp_dir goes - above)
-    tmp_file = tempfile.NamedTemporaryFile(mode='w', suffix='.py', dir=tmp_dir, delete=False)
-    tmp_file.file.write(full_text)
-    tmp_file.file.close()
+    The module is not added to sys.modules and nothing is imported
+    from disk.
+    """
+    mod = types.ModuleType('genpy_dynamic_%d' % next(_module_counter))
+    exec(code, mod.__dict__)
+    return mod
 
-    # import our temporary file as a python module, which requires modifying sys.path
-    sys.path.append(os.path.dirname(tmp_file.name))
 
-    # - strip the prefix to turn it into the python module name
+def _get_class(mod, type_, class_name):
     try:
-        mod = __import__(os.path.basename(tmp_file.name)[:-3])
-    except Exception:
-        # TODOXXX:REMOVE
-        with open(tmp_file.name) as f:
-            text = f.read()
-            with open('/tmp/foo', 'w') as f2:
-                f2.write(text)
-        raise
+        return getattr(mod, class_name)
+    except AttributeError:
+        raise MsgGenerationException('cannot retrieve message class for %s: %s' % (type_, class_name))
+
+
+def _generate_dynamic(core_type, msg_cat, key):
+    """
+    Generate the message classes of generate_dynamic.
+
+    :param key: digest of *core_type* and *msg_cat*, ``str``
+    """
+    specs, msg_context = _load_specs(core_type, msg_cat)
+
+    code = _load_code(key, core_type) if _disk_cache_dir is not None else None
+    if code is None:
+        # process actual MsgSpecs: we accumulate them into a single file
+        search_path = {}  # no ability to dynamically load
+        buff = StringIO()
+        for t, spec in specs.items():
+            # dynamically generate python message code
+            for line in msg_generator(msg_context, spec, search_path, _dynamic_naming):
+                buff.write(line + '\n')
+        full_text = buff.getvalue()
+        code = compile(full_text, '<genpy dynamic %s>' % core_type, 'exec')
+        if _disk_cache_dir is not None:
+            _store_code(key, core_type, full_text, code)
+    mod = _exec_module(code)
 
     # finally, retrieve the message classes from the dynamic module
-    messages = {}
+    messages = _ClassMap()
     for t in specs.keys():
         pkg, s_type = genmsg.package_resource_name(t)
-        try:
-            messages[t] = getattr(mod, _gen_dyn_name(pkg, s_type))
-        except AttributeError:
-            raise MsgGenerationException('cannot retrieve message class for %s/%s: %s' % (pkg, s_type, _gen_dyn_name(pkg, s_type)))
+        messages[t] = _get_class(mod, t, _gen_dyn_name(pkg, s_type))
         messages[t]._spec = specs[t]
+        # make the classes picklable as a reference to msg_cat
+        messages[t]._dynamic_source = (core_type, msg_cat)
+        messages[t]._dynamic_classes = messages
 
     return messages
+
+
+def _generate_dynamic_batch(pending):
+    """
+    Generate the message classes of generate_dynamic_batch.
+
+    :param pending: core type and msg_cat of the definitions to
+      generate, keyed by their digest, ``{str: (str, str)}``
+    :returns: message classes of each definition, keyed by digest, ``{str: {str: Message class}}``
+    """
+    search_path = {}  # no ability to dynamically load
+    loaded = []
+    # context, spec and naming strategy of each distinct message type
+    # definition, keyed by type and md5sum
+    unique = collections.OrderedDict()
+    for key, (core_type, msg_cat) in pending.items():
+        specs, msg_context = _load_specs(core_type, msg_cat)
+        md5sums = {}
+        naming = _DynamicNameStrategy({})
+        for t, spec in specs.items():
+            genmsg.msg_loader.load_depends(msg_context, spec, search_path)
+            md5sums[t] = genmsg.compute_md5(msg_context, spec)
+            unique.setdefault((t, md5sums[t]), (msg_context, spec, naming))
+        loaded.append((key, core_type, msg_cat, specs, md5sums, naming))
+
+    # types with several definitions get one class per definition
+    counts = collections.defaultdict(int)
+    for t, _ in unique:
+        counts[t] += 1
+    for _, _, _, _, md5sums, naming in loaded:
+        for t, md5sum in md5sums.items():
+            pkg, s_type = genmsg.package_resource_name(t)
+            class_name = _gen_dyn_name(pkg, s_type)
+            if counts[t] > 1:
+                class_name = '%s_%s' % (class_name, md5sum)
+            naming.class_names[t] = class_name
+
+    buff = StringIO()
+    for msg_context, spec, naming in unique.values():
+        for line in msg_generator(msg_context, spec, search_path, naming):
+            buff.write(line + '\n')
+    mod = _exec_module(compile(buff.getvalue(), '<genpy dynamic batch>', 'exec'))
+
+    results = {}
+    for key, core_type, msg_cat, specs, md5sums, naming in loaded:
+        messages = _ClassMap()
+        for t in specs:
+            cls = messages[t] = _get_class(mod, t, naming.class_names[t])
+            if '_dynamic_source' not in cls.__dict__:
+                cls._spec = specs[t]
+                # make the class picklable as a reference to any
+                # definition that contains it
+                cls._dynamic_source = (core_type, msg_cat)
+                cls._dynamic_classes = messages
+        results[key] = messages
+    return results
+
+
+if os.environ.get('GENPY_DYNAMIC_CACHE_DIR'):
+    enable_disk_cache(os.environ['GENPY_DYNAMIC_CACHE_DIR'])
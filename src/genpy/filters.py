@@ -0,0 +1,179 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Message filters evaluated on the serialized wire format.
+
+:func:`compile_filter` turns simple conditions on field paths into a
+function that reads the fields straight from a serialized message,
+using the layout given by the ``_slot_types`` of the message class.
+Fields at constant offsets are read with a single ``unpack_from``,
+other fields are located by walking the length prefixes of the
+preceding fields. Strings are compared as encoded bytes, so messages
+that are rejected are never decoded.
+
+Conditions are ``(path, operator, value)`` tuples, e.g.::
+
+  accept = compile_filter(Odometry, [
+      ('header.stamp', '>=', genpy.Time(10)),
+      ('header.stamp', '<', genpy.Time(20)),
+      ('header.frame_id', '==', 'map'),
+      ('pose.pose.position.z', '>', 1.5),
+  ])
+"""
+
+import operator
+import struct
+
+import genmsg.msgs
+
+from .base import SIMPLE_TYPES_DICT
+from .layout import compile_field_offset
+from .layout import field_offset
+from .layout import is_primitive
+from .message import DeserializationError
+from .message import MessageException
+from .rostime import TVal
+
+_OPERATORS = {
+    '==': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+}
+
+_length_struct = struct.Struct('<I')
+_time_structs = {'time': struct.Struct('<2I'), 'duration': struct.Struct('<2i')}
+
+
+def _compile_condition(msg_class, path, op, value):
+    """
+    Compile a single condition.
+
+    :returns: ``True`` if the field has a constant offset and the test
+      function, ``(bool, fn(buff)->bool)``
+    """
+    if op not in _OPERATORS:
+        raise MessageException('unsupported operator [%s]' % op)
+    compare = _OPERATORS[op]
+    _, type_, offset = field_offset(msg_class, None, path)
+    base_type, is_array, _ = genmsg.msgs.parse_type(type_)
+    if is_array:
+        raise MessageException('cannot filter on array field [%s]' % path)
+
+    if is_primitive(base_type):
+        s = struct.Struct('<' + SIMPLE_TYPES_DICT[base_type])
+        if base_type == 'bool':
+            value = int(bool(value))
+
+        def read(buff, offset):
+            return s.unpack_from(buff, offset)[0]
+    elif base_type in _time_structs:
+        if not isinstance(value, TVal):
+            raise MessageException('[%s] must be compared with a time or duration' % path)
+        value = (value.secs, value.nsecs)
+        s = _time_structs[base_type]
+
+        def read(buff, offset):
+            return s.unpack_from(buff, offset)
+    elif base_type == 'string':
+        if op not in ['==', '!=']:
+            raise MessageException('string field [%s] only supports == and !=' % path)
+        if not isinstance(value, bytes):
+            value = value.encode('utf-8')
+        length = len(value)
+
+        def read(buff, offset):
+            # compare the length first to avoid copying strings that differ
+            if _length_struct.unpack_from(buff, offset)[0] != length:
+                return None
+            return bytes(buff[offset + 4:offset + 4 + length])
+    else:
+        raise MessageException('cannot filter on message field [%s]' % path)
+
+    if offset is not None:
+        def test(buff):
+            return compare(read(buff, offset), value)
+    else:
+        # the path is resolved once, only the offsets of the preceding
+        # variable-length fields are read from each message
+        locate = compile_field_offset(msg_class, path)[2]
+
+        def test(buff):
+            return compare(read(buff, locate(buff)), value)
+    return offset is not None, test
+
+
+def compile_filter(msg_class, conditions):
+    """
+    Compile conditions into a filter on serialized messages.
+
+    :param msg_class: message class of the serialized messages, ``Message class``
+    :param conditions: ``(path, operator, value)`` conditions that must
+      all hold. Supported operators are ``==``, ``!=``, ``<``, ``<=``,
+      ``>`` and ``>=``; strings only support ``==`` and ``!=``, time
+      and duration fields are compared with ``Time``/``Duration`` values,
+      ``[(str, str, object)]``
+    :returns: filter function that returns ``True`` for serialized
+      messages that match all conditions, ``fn(bytes)->bool``
+    :raises: :exc:`MessageException` If a condition cannot be evaluated on *msg_class*
+    """
+    compiled = [_compile_condition(msg_class, path, op, value) for path, op, value in conditions]
+    # evaluate conditions on fields at constant offsets first, they are cheapest
+    tests = [test for static, test in compiled if static] + [test for static, test in compiled if not static]
+
+    def accept(buff):
+        try:
+            for test in tests:
+                if not test(buff):
+                    return False
+            return True
+        except struct.error as e:
+            raise DeserializationError(e)
+    return accept
+
+
+def filter_messages(msg_class, buffers, conditions):
+    """
+    Decode the serialized messages that match all conditions.
+
+    :param msg_class: message class of the serialized messages, ``Message class``
+    :param buffers: serialized messages, ``iter(bytes)``
+    :param conditions: conditions, see :func:`compile_filter`
+    :returns: iterator of matching messages, ``iter(Message)``
+    """
+    accept = compile_filter(msg_class, conditions)
+    for buff in buffers:
+        if accept(buff):
+            yield msg_class().deserialize(buff)
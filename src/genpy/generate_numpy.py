@@ -56,9 +56,16 @@ NUMPY_DTYPE = {
 
 
 # TODO: this doesn't explicitly specify little-endian byte order on the numpy data instance
-def unpack_numpy(var, count, dtype, buff):
-    """Create numpy deserialization code."""
-    return var + ' = numpy.frombuffer(%s, dtype=%s, count=%s)' % (buff, dtype, count)
+def unpack_numpy(var, count, dtype, buff, offset=None):
+    """
+    Create numpy deserialization code.
+
+    :param offset: if not None, expression for the start of the data in
+      buff. The resulting array then references buff instead of a copy, ``str``
+    """
+    if offset is None:
+        return var + ' = numpy.frombuffer(%s, dtype=%s, count=%s)' % (buff, dtype, count)
+    return var + ' = numpy.frombuffer(%s, dtype=%s, count=%s, offset=%s)' % (buff, dtype, count, offset)
 
 
 def pack_numpy(var):
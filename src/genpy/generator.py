@@ -48,6 +48,7 @@ The structure of the serialization descends several levels of serializers:
 from __future__ import print_function
 
 import errno
+import hashlib
 import keyword
 import os
 import struct
@@ -77,6 +78,7 @@ from . generate_struct import int32_unpack
 from . generate_struct import pack
 from . generate_struct import pack2
 from . generate_struct import reduce_pattern
+from . generate_struct import serialize as serialize_expr
 from . generate_struct import unpack
 from . generate_struct import unpack2
 from . generate_struct import unpack3
@@ -147,16 +149,64 @@ def get_special(type_):  # noqa: D200, D400, D401
     return _SPECIAL_TYPES.get(type_, None)
 
 
+################################################################################
+# Naming of generated classes
+
+class NameStrategy(object):
+    """
+    Naming and import strategy of generated message classes.
+
+    The default strategy generates the classes of ``<pkg>.msg`` Python
+    packages, which import the packages of the message types they
+    depend on. Subclasses can generate classes that refer to each other
+    in other ways, e.g. within a single module.
+    """
+
+    def class_name(self, package, base_type):  # noqa: D200, D400
+        """
+        :returns: name of the generated class of *package*/*base_type*, ``str``
+        """
+        return base_type
+
+    def base_class(self, package, base_type):  # noqa: D200, D400
+        """
+        :returns: expression of the base class of the generated class of *package*/*base_type*, ``str``
+        """
+        return 'genpy.Message'
+
+    def reference(self, package, base_type):  # noqa: D200, D400
+        """
+        :returns: expression that refers to the class of *package*/*base_type* in generated code, ``str``
+        """
+        return '%s.msg.%s' % (package, base_type)
+
+    def header_reference(self):  # noqa: D200, D400
+        """
+        :returns: expression that refers to the class of the builtin Header type in generated code, ``str``
+        """
+        return 'std_msgs.msg._Header.Header'
+
+    def import_str(self, package):  # noqa: D200, D400
+        """
+        :returns: import statement required to refer to the classes of *package*, or ``None``, ``str``
+        """
+        return 'import %s.msg' % package
+
+
+_default_naming = NameStrategy()
+
+
 ################################################################################
 # utilities
 
 # #671
-def default_value(msg_context, field_type, default_package):
+def default_value(msg_context, field_type, default_package, naming=None):
     """
     Compute default value for field_type.
 
     :param default_package: default package, ``str``
     :param field_type: ROS .msg field type, ``str``
+    :param naming: naming strategy of generated classes, ``NameStrategy``
     :returns: default value encoded in Python string representation, ``str``
     """
     if field_type in [
@@ -182,17 +232,17 @@ def default_value(msg_context, field_type, default_package):
             return '[]'
         else:
             # fixed-length
-            def_val = default_value(msg_context, base_type, default_package)
+            def_val = default_value(msg_context, base_type, default_package, naming)
             if base_type in [
                 'byte', 'int8', 'int16', 'int32', 'int64', 'uint16', 'uint32',
                 'uint64', 'float32', 'float64', 'string', 'bool'
             ]:  # fill primitive values
                 return '[' + def_val + '] * ' + str(array_len)
             else:  # fill values with distinct instances
-                def_val = default_value(msg_context, base_type, default_package)
+                def_val = default_value(msg_context, base_type, default_package, naming)
                 return '[' + def_val + ' for _ in range(' + str(array_len) + ')]'
     else:
-        return compute_constructor(msg_context, default_package, field_type)
+        return compute_constructor(msg_context, default_package, field_type, naming)
 
 
 def flatten(msg_context, msg):
@@ -269,15 +319,19 @@ def compute_post_deserialize(type_, varname):
         return s.get_post_deserialize(varname)
 
 
-def compute_constructor(msg_context, package, type_):
+def compute_constructor(msg_context, package, type_, naming=None):
     """
     Compute python constructor expression for specified message type implementation.
 
     :param package str: package that type is being imported into. Used
         to resolve type_ if package is not specified. ``str``
     :param type_: message type, ``str``
+    :param naming: naming strategy of generated classes, ``NameStrategy``
     """
-    if is_special(type_):
+    naming = naming or _default_naming
+    if type_ == genmsg.HEADER:
+        return '%s()' % naming.header_reference()
+    elif is_special(type_):
         return get_special(type_).constructor
     elif genmsg.msgs.bare_msg_type(type_) != type_:
         # array or other weird type
@@ -287,7 +341,7 @@ def compute_constructor(msg_context, package, type_):
         if not msg_context.is_registered('%s/%s' % (base_pkg, base_type_)):
             return None
         else:
-            return '%s.msg.%s()' % (base_pkg, base_type_)
+            return '%s()' % naming.reference(base_pkg, base_type_)
 
 
 def compute_pkg_type(package, type_):  # noqa: D205, D400
@@ -305,14 +359,16 @@ def compute_pkg_type(package, type_):  # noqa: D205, D400
         raise MsgGenerationException('illegal message type: %s' % type_)
 
 
-def compute_import(msg_context, package, type_):
+def compute_import(msg_context, package, type_, naming=None):
     """
     Compute python import statement for specified message type implementation.
 
     :param package: package that type is being imported into, ``str``
     :param type_: message type (package resource name), ``str``
+    :param naming: naming strategy of generated classes, ``NameStrategy``
     :returns: list of import statements (no newline) required to use type_ from package, ``[str]``
     """
+    naming = naming or _default_naming
     # orig_base_type is the unresolved type
     orig_base_type = genmsg.msgs.bare_msg_type(type_)  # strip array-suffix
     # resolve orig_base_type based on the current package context.
@@ -329,20 +385,24 @@ def compute_import(msg_context, package, type_):
         # of the builtin types, only special types require import
         # handling. we switch to base_type as special types do not
         # include package names.
-        if is_special(base_type):
+        if base_type == genmsg.HEADER:
+            import_str = naming.import_str('std_msgs')
+            retval = [import_str] if import_str else []
+        elif is_special(base_type):
             retval = [get_special(base_type).import_str]
         else:
             retval = []
     elif not msg_context.is_registered(full_msg_type):
         retval = []
     else:
-        retval = ['import %s.msg' % pkg]
+        import_str = naming.import_str(pkg)
+        retval = [import_str] if import_str else []
         iter_types = get_registered_ex(msg_context, full_msg_type).types
         for t in iter_types:
             assert t != full_msg_type, 'msg [%s] has circular self-dependencies' % (full_msg_type)
             full_sub_type = '%s/%s' % (package, t)
             log('compute_import', full_msg_type, package, t)
-            sub = compute_import(msg_context, package, t)
+            sub = compute_import(msg_context, package, t, naming)
             retval.extend([x for x in sub if x not in retval])
     return retval
 
@@ -436,7 +496,7 @@ def len_serializer_generator(var, is_string, serialize):  # noqa: D401
         yield int32_unpack('length', 'str[start:end]')  # 4 = struct.calcsize('<i')
 
 
-def string_serializer_generator(package, type_, name, serialize):  # noqa: D401
+def string_serializer_generator(package, type_, name, serialize, is_numpy=False, field_name=None):  # noqa: D401
     """
     Generator for string types.
 
@@ -445,6 +505,11 @@ def string_serializer_generator(package, type_, name, serialize):  # noqa: D401
     :param name: spec field name, ``str``
     :param serialize: if ``True``, generate code for
       serialization. Other, generate code for deserialization, ``bool``
+    :param is_numpy: if True, generate code that borrows large
+      uint8/char arrays as numpy arrays instead of memoryviews, ``bool``
+    :param field_name: key of per-field string interning, the owning
+      message type and field name, e.g. ``std_msgs/Header.frame_id``.
+      Defaults to *name*, ``str``
     """
     # don't optimize in deserialization case as assignment doesn't
     # work
@@ -474,7 +539,10 @@ def string_serializer_generator(package, type_, name, serialize):  # noqa: D401
                 yield 'if type(%s) in [list, tuple]:' % var
                 yield INDENT+pack2("'<I%sB'%length", 'length, *%s' % var)
                 yield 'else:'
-                yield INDENT+pack2("'<I%ss'%length", 'length, %s' % var)
+                # write the data directly so that borrowed memoryviews
+                # and numpy arrays are not copied
+                yield INDENT+int32_pack('length')
+                yield INDENT+serialize_expr(var)
             else:
                 yield 'if type(%s) in [list, tuple]:' % var
                 yield INDENT+pack('%sB' % array_len, '*%s' % var)
@@ -482,7 +550,8 @@ def string_serializer_generator(package, type_, name, serialize):  # noqa: D401
                 yield INDENT+pack('%ss' % array_len, var)
         else:
             # FIXME: for py3k, this needs to be w/ encode(), but this interferes with actual byte data
-            yield 'if python3 or type(%s) == unicode:' % (var)
+            # bytes (e.g. from a raw_strings deserialization) are written as-is
+            yield 'if type(%s) != bytes and (python3 or type(%s) == unicode):' % (var, var)
             yield INDENT+"%s = %s.encode('utf-8')" % (var, var)  # For unicode-strings in Python2, encode using utf-8
             yield INDENT+'length = len(%s)' % (var)  # Update the length after utf-8 conversion
 
@@ -495,18 +564,31 @@ def string_serializer_generator(package, type_, name, serialize):  # noqa: D401
         else:
             yield 'end += length'
             if base_type in ['uint8', 'char']:
-                yield '%s = str[start:end]' % (var)
+                # large blobs can reference the input buffer instead of being copied
+                yield 'if self._blob_borrow_threshold is not None and length >= self._blob_borrow_threshold:'
+                if is_numpy:
+                    yield INDENT+unpack_numpy(var, 'length', NUMPY_DTYPE[base_type], 'str', offset='start')
+                else:
+                    yield INDENT+'%s = memoryview(str)[start:end]' % (var)
+                yield 'else:'
+                yield INDENT+'%s = str[start:end]' % (var)
             else:
-                yield 'if python3:'
-                yield INDENT+"%s = str[start:end].decode('utf-8', 'rosmsg')" % (var)  # If messages are python3-decode back to unicode
+                yield 'if python3 and not raw_strings:'
+                yield INDENT+'if interner is None:'
+                yield INDENT*2+"%s = str[start:end].decode('utf-8', 'rosmsg')" % (var)  # If messages are python3-decode back to unicode
+                yield INDENT+'else:'
+                yield INDENT*2+"%s = interner.decode(str[start:end], '%s')" % (var, field_name or name)
                 yield 'else:'
                 yield INDENT+'%s = str[start:end]' % (var)
 
 
-def array_serializer_generator(msg_context, package, type_, name, serialize, is_numpy):  # noqa: D401
+def array_serializer_generator(msg_context, package, type_, name, serialize, is_numpy, naming=None, field_name=None):  # noqa: D401
     """
     Generator for array types.
 
+    :param naming: naming strategy of generated classes, ``NameStrategy``
+    :param field_name: key of per-field string interning, see
+      :func:`string_serializer_generator`, ``str``
     :raises: :exc:`MsgGenerationException` If array spec is invalid
     """
     base_type, is_array, array_len = genmsg.msgs.parse_type(type_)
@@ -517,7 +599,7 @@ def array_serializer_generator(msg_context, package, type_, name, serialize, is_
     # handle fixed-size byte arrays could be slightly more efficient
     # as we recalculated the length in the generated code.
     if base_type in ['char', 'uint8']:  # treat unsigned int8 arrays as string type
-        for y in string_serializer_generator(package, type_, name, serialize):
+        for y in string_serializer_generator(package, type_, name, serialize, is_numpy):
             yield y
         return
 
@@ -579,10 +661,10 @@ def array_serializer_generator(msg_context, package, type_, name, serialize, is_
         # compute the variable context and factory to use
         if base_type == 'string':
             push_context('')
-            factory = string_serializer_generator(package, base_type, loop_var, serialize)
+            factory = string_serializer_generator(package, base_type, loop_var, serialize, field_name=field_name or name)
         else:
             push_context('%s.' % loop_var)
-            factory = serializer_generator(msg_context, make_python_safe(get_registered_ex(msg_context, base_type)), serialize, is_numpy)
+            factory = serializer_generator(msg_context, make_python_safe(get_registered_ex(msg_context, base_type)), serialize, is_numpy, naming)
 
         if serialize:
             if array_len is not None:
@@ -596,7 +678,7 @@ def array_serializer_generator(msg_context, package, type_, name, serialize, is_
             else:
                 yield 'for i in range(0, %s):' % length
             if base_type != 'string':
-                yield INDENT + '%s = %s' % (loop_var, compute_constructor(msg_context, package, base_type))
+                yield INDENT + '%s = %s' % (loop_var, compute_constructor(msg_context, package, base_type, naming))
         for y in factory:
             yield INDENT + y
         if not serialize:
@@ -604,7 +686,7 @@ def array_serializer_generator(msg_context, package, type_, name, serialize, is_
         pop_context()
 
 
-def complex_serializer_generator(msg_context, package, type_, name, serialize, is_numpy):  # noqa: D401
+def complex_serializer_generator(msg_context, package, type_, name, serialize, is_numpy, naming=None, field_name=None):  # noqa: D401
     """
     Generator for serializing complex type.
 
@@ -612,6 +694,9 @@ def complex_serializer_generator(msg_context, package, type_, name, serialize, i
       code. Otherwise, deserialization code. ``bool``
     :param is_numpy: if True, generate serializer code for numpy
       datatypes instead of Python lists, ``bool``
+    :param naming: naming strategy of generated classes, ``NameStrategy``
+    :param field_name: key of per-field string interning, see
+      :func:`string_serializer_generator`, ``str``
     :raises: MsgGenerationException If type is not a valid
     """
     # ordering of these statements is important as we mutate the type
@@ -623,11 +708,11 @@ def complex_serializer_generator(msg_context, package, type_, name, serialize, i
 
     # Array
     if is_array:
-        for y in array_serializer_generator(msg_context, package, type_, name, serialize, is_numpy):
+        for y in array_serializer_generator(msg_context, package, type_, name, serialize, is_numpy, naming, field_name):
             yield y
     # Embedded Message
     elif type_ == 'string':
-        for y in string_serializer_generator(package, type_, name, serialize):
+        for y in string_serializer_generator(package, type_, name, serialize, field_name=field_name):
             yield y
     else:
         if not is_special(type_):
@@ -641,7 +726,7 @@ def complex_serializer_generator(msg_context, package, type_, name, serialize, i
             push_context(ctx_var+'.')
             # unoptimized code
             # push_context(_serial_context+name+'.')
-            for y in serializer_generator(msg_context, make_python_safe(get_registered_ex(msg_context, type_)), serialize, is_numpy):
+            for y in serializer_generator(msg_context, make_python_safe(get_registered_ex(msg_context, type_)), serialize, is_numpy, naming):
                 yield y  # recurs on subtype
             pop_context()
         else:
@@ -686,7 +771,28 @@ def simple_serializer_generator(msg_context, spec, start, end, serialize):  # no
             yield '%s = bool(%s)' % (var, var)
 
 
-def serializer_generator(msg_context, spec, serialize, is_numpy):  # noqa: D401
+def field_keys(msg_context, spec):
+    """
+    Compute the string interning keys of the fields of a flattened spec.
+
+    A key is the type that declares a field and the field name, e.g.
+    ``std_msgs/Header.frame_id``, the same whether the field is
+    flattened into its parent or read from an array element.
+
+    :param spec: unflattened spec, ``MsgSpec``
+    :returns: key of each field of ``flatten(msg_context, spec)``, ``[str]``
+    """
+    keys = []
+    for t, n in zip(spec.types, spec.names):
+        _, is_array, _ = genmsg.msgs.parse_type(t)
+        if not is_array and msg_context.is_registered(t):
+            keys.extend(field_keys(msg_context, msg_context.get_registered(t)))
+        else:
+            keys.append('%s.%s' % (spec.full_name, _remap_reserved(n)))
+    return keys
+
+
+def serializer_generator(msg_context, spec, serialize, is_numpy, naming=None, keys=None):  # noqa: D401
     """
     Generator that yields un-indented python code for (de)serializing MsgSpec.
 
@@ -697,6 +803,9 @@ def serializer_generator(msg_context, spec, serialize, is_numpy):  # noqa: D401
     :param serialize: if True, yield serialization
       code. Otherwise, yield deserialization code. ``bool``
     :param is_numpy: if True, generate serializer code for numpy datatypes instead of Python lists. ``bool``
+    :param naming: naming strategy of generated classes, ``NameStrategy``
+    :param keys: string interning keys of the fields, see
+      :func:`field_keys`. Defaults to the fields of *spec*, ``[str]``
     """
     # Break spec into chunks of simple (primitives) vs. complex (arrays, etc...)
     # Simple types are batch serialized using the python struct module.
@@ -721,7 +830,10 @@ def serializer_generator(msg_context, spec, serialize, is_numpy):  # noqa: D401
                     for y in simple_serializer_generator(msg_context, spec, _start, _end, serialize):
                         yield y
             curr = i+1
-            for y in complex_serializer_generator(msg_context, spec.package, full_type, names[i], serialize, is_numpy):
+            # key interning by the declaring type, so that e.g. the data
+            # fields of unrelated types don't share a cache
+            field_name = keys[i] if keys is not None else '%s.%s' % (spec.full_name, names[i])
+            for y in complex_serializer_generator(msg_context, spec.package, full_type, names[i], serialize, is_numpy, naming, field_name):
                 yield y
     if curr < len(types):  # yield rest of simples
         for _start in range(curr, len(types), _max_chunk):
@@ -751,22 +863,26 @@ def serialize_fn_generator(msg_context, spec, is_numpy=False):  # noqa: D401
     # done w/ method-var context #
 
 
-def deserialize_fn_generator(msg_context, spec, is_numpy=False):  # noqa: D401
+def deserialize_fn_generator(msg_context, spec, is_numpy=False, naming=None):  # noqa: D401
     """
     Generator for body of deserialize() function.
 
     :param is_numpy: if True, generate serializer code for numpy
       datatypes instead of Python lists, ``bool``
+    :param naming: naming strategy of generated classes, ``NameStrategy``
     """
     yield 'if python3:'
     yield INDENT+'codecs.lookup_error("rosmsg").msg_type = self._type'
+    yield 'if raw_strings is None:'
+    yield INDENT+'raw_strings = self._raw_strings'
+    yield 'interner = self._string_interner'
     yield 'try:'
     package = spec.package
     # Instantiate embedded type classes
     for type_, name in spec.fields():
         if msg_context.is_registered(type_):
             yield '  if self.%s is None:' % name
-            yield '    self.%s = %s' % (name, compute_constructor(msg_context, package, type_))
+            yield '    self.%s = %s' % (name, compute_constructor(msg_context, package, type_, naming))
     yield '  end = 0'  # initialize var
 
     # method-var context #########
@@ -774,7 +890,8 @@ def deserialize_fn_generator(msg_context, spec, is_numpy=False):  # noqa: D401
     # NOTE: we flatten the spec for optimal serialization
     # #3741: make sure to have sub-messages python safe
     flattened = make_python_safe(flatten(msg_context, spec))
-    for y in serializer_generator(msg_context, flattened, False, is_numpy):
+    keys = field_keys(msg_context, spec)
+    for y in serializer_generator(msg_context, flattened, False, is_numpy, naming, keys):
         yield '  '+y
     pop_context()
     # done w/ method-var context #
@@ -790,7 +907,7 @@ def deserialize_fn_generator(msg_context, spec, is_numpy=False):  # noqa: D401
     yield '  raise genpy.DeserializationError(e)  # most likely buffer underfill'
 
 
-def msg_generator(msg_context, spec, search_path):
+def msg_generator(msg_context, spec, search_path, naming=None):
     """
     Python code generator for .msg files.
 
@@ -798,7 +915,11 @@ def msg_generator(msg_context, spec, search_path):
 
     :param spec: parsed .msg :class:`genmsg.MsgSpec` instance
     :param search_path: dictionary mapping message namespaces to a directory locations
+    :param naming: naming strategy of the generated class and its
+      references to other message classes, defaults to the classes of
+      ``<pkg>.msg`` packages, ``NameStrategy``
     """
+    naming = naming or _default_naming
     # #2990: have to compute md5sum before any calls to make_python_safe
 
     # generate dependencies dictionary. omit files calculation as we
@@ -826,7 +947,7 @@ def msg_generator(msg_context, spec, search_path):
     yield 'import genpy\nimport struct\n'
     import_strs = []
     for t in spec.types:
-        import_strs.extend(compute_import(msg_context, spec.package, t))
+        import_strs.extend(compute_import(msg_context, spec.package, t, naming))
     import_strs = sorted(set(import_strs))
     for i in import_strs:
         if i:
@@ -835,10 +956,10 @@ def msg_generator(msg_context, spec, search_path):
     yield ''
 
     fulltype = spec.full_name
-    name = spec.short_name
+    name = naming.class_name(spec.package, spec.short_name)
 
     # Yield data class first, e.g. Point2D
-    yield 'class %s(genpy.Message):' % spec.short_name
+    yield 'class %s(%s):' % (name, naming.base_class(spec.package, spec.short_name))
     yield '  _md5sum = "%s"' % (md5sum)
     yield '  _type = "%s"' % (fulltype)
     yield '  _has_header = %s  # flag to mark the presence of a Header object' % spec.has_header()
@@ -898,11 +1019,11 @@ def msg_generator(msg_context, spec, search_path):
         yield '      # message fields cannot be None, assign default values for those that are'
         for (t, s) in zip(spec.types, spec_names):
             yield '      if self.%s is None:' % s
-            yield '        self.%s = %s' % (s, default_value(msg_context, t, spec.package))
+            yield '        self.%s = %s' % (s, default_value(msg_context, t, spec.package, naming))
     if len(spec_names) > 0:
         yield '    else:'
         for (t, s) in zip(spec.types, spec_names):
-            yield '      self.%s = %s' % (s, default_value(msg_context, t, spec.package))
+            yield '      self.%s = %s' % (s, default_value(msg_context, t, spec.package, naming))
 
     yield """
   def _get_types(self):
@@ -919,12 +1040,14 @@ def msg_generator(msg_context, spec, search_path):
     for y in serialize_fn_generator(msg_context, spec):
         yield '    ' + y
     yield """
-  def deserialize(self, str):
+  def deserialize(self, str, raw_strings=None):
     \"\"\"
     unpack serialized message in str into this message instance
     :param str: byte array of serialized message, ``str``
+    :param raw_strings: if True, leave string fields as undecoded ``bytes``.
+      Defaults to the class ``_raw_strings`` setting, ``bool``
     \"\"\""""
-    for y in deserialize_fn_generator(msg_context, spec):
+    for y in deserialize_fn_generator(msg_context, spec, naming=naming):
         yield '    ' + y
     yield ''
 
@@ -938,13 +1061,15 @@ def msg_generator(msg_context, spec, search_path):
     for y in serialize_fn_generator(msg_context, spec, is_numpy=True):
         yield '    ' + y
     yield """
-  def deserialize_numpy(self, str, numpy):
+  def deserialize_numpy(self, str, numpy, raw_strings=None):
     \"\"\"
     unpack serialized message in str into this message instance using numpy for array types
     :param str: byte array of serialized message, ``str``
     :param numpy: numpy python module
+    :param raw_strings: if True, leave string fields as undecoded ``bytes``.
+      Defaults to the class ``_raw_strings`` setting, ``bool``
     \"\"\""""
-    for y in deserialize_fn_generator(msg_context, spec, is_numpy=True):
+    for y in deserialize_fn_generator(msg_context, spec, is_numpy=True, naming=naming):
         yield '    ' + y
     yield ''
 
@@ -1018,6 +1143,132 @@ def compute_outfile_name(outdir, infile_name, ext):  # noqa: D205, D400
     return os.path.join(outdir, _module_name(compute_resource_name(infile_name, ext))+'.py')
 
 
+################################################################################
+# Incremental generation
+
+# cache for generator_fingerprint
+_fingerprint = None
+
+
+def generator_fingerprint():
+    """
+    Compute a digest of the genpy code generator.
+
+    It changes whenever a change of genpy may change generated code.
+
+    NOTE: this function maintains a local cache of results.
+    :returns: hex digest, ``str``
+    """
+    global _fingerprint
+    if _fingerprint is None:
+        h = hashlib.md5()
+        src_dir = os.path.dirname(os.path.abspath(__file__))
+        for name in ['base.py', 'generate_numpy.py', 'generate_struct.py', 'generator.py']:
+            try:
+                with open(os.path.join(src_dir, name), 'rb') as f:
+                    h.update(f.read())
+            except IOError:
+                h.update(name.encode('utf-8'))
+        _fingerprint = h.hexdigest()
+    return _fingerprint
+
+
+def compute_stamp(msg_context, spec, search_path):
+    """
+    Compute the stamp of the generated code of a .msg or .srv spec.
+
+    The stamp is a digest of the full text of the spec, including its
+    dependencies, and of the genpy code generator.
+
+    :param spec: parsed :class:`genmsg.MsgSpec` or :class:`genmsg.SrvSpec` instance
+    :param search_path: dictionary mapping message namespaces to a directory locations
+    :returns: hex digest, ``str``
+    """
+    genmsg.msg_loader.load_depends(msg_context, spec, search_path)
+    h = hashlib.md5(generator_fingerprint().encode('utf-8'))
+    h.update(spec.full_name.encode('utf-8'))
+    for mspec in (spec.request, spec.response) if hasattr(spec, 'request') else (spec,):
+        h.update(b'\n' + genmsg.compute_full_text(msg_context, mspec).encode('utf-8'))
+    return h.hexdigest()
+
+
+def _stamp_path(path):
+    # hidden, and not a .py file that generate_initpy would import
+    dirname, basename = os.path.split(path)
+    return os.path.join(dirname, '.%s.stamp' % basename)
+
+
+def read_stamp(path, stamp_path=None):
+    """
+    Read the stamp of a generated file.
+
+    Stamps are kept in a separate file, so that a new stamp alone does
+    not change the generated file. By default this is a hidden file
+    next to the generated file.
+
+    :param path: path of the generated file, ``str``
+    :param stamp_path: path of the stamp file, ``str``
+    :returns: stamp, or ``None`` if the file or its stamp does not exist, ``str``
+    """
+    if not os.path.isfile(path):
+        return None
+    try:
+        with open(stamp_path or _stamp_path(path)) as f:
+            return f.read().strip() or None
+    except IOError:
+        return None
+
+
+def write_stamp(path, stamp, stamp_path=None):
+    """
+    Record the stamp of a generated file, see :func:`read_stamp`.
+
+    :param path: path of the generated file, ``str``
+    :param stamp: stamp, ``str``
+    :param stamp_path: path of the stamp file, ``str``
+    """
+    stamp_path = stamp_path or _stamp_path(path)
+    try:
+        os.makedirs(os.path.dirname(stamp_path))
+    except OSError as e:
+        if e.errno != errno.EEXIST:
+            raise
+    write_if_changed(stamp_path, stamp + '\n')
+
+
+def write_if_changed(path, text):
+    """
+    Write a file, unless it already has the given contents.
+
+    The file is replaced atomically by renaming a temporary file, so
+    readers never see a partially written file.
+
+    :param path: path of the file, ``str``
+    :param text: contents, ``str``
+    :returns: ``True`` if the file was written, ``bool``
+    """
+    try:
+        with open(path) as f:
+            if f.read() == text:
+                return False
+    except IOError:
+        pass
+    # unique per process, as several processes may generate the same file
+    tmp_path = '%s.%d.tmp' % (path, os.getpid())
+    try:
+        with open(tmp_path, 'w') as f:
+            f.write(text)
+        # os.rename does not replace existing files on Windows
+        getattr(os, 'replace', os.rename)(tmp_path, path)
+    except Exception:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    return True
+
+
 class Generator(object):
 
     def __init__(self, what, ext, spec_loader_fn, generator_fn):
@@ -1026,7 +1277,7 @@ class Generator(object):
         self.spec_loader_fn = spec_loader_fn
         self.generator_fn = generator_fn
 
-    def generate(self, msg_context, full_type, f, outdir, search_path):
+    def generate(self, msg_context, full_type, f, outdir, search_path, spec_cache=None, stamp_dir=None):
         try:
             # you can't just check first... race condition
             os.makedirs(outdir)
@@ -1034,37 +1285,92 @@ class Generator(object):
             if e.errno != errno.EEXIST:
                 raise
         # generate message files for request/response
-        spec = self.spec_loader_fn(msg_context, f, full_type)
+        if spec_cache is not None and self.ext == genmsg.EXT_MSG:
+            spec = spec_cache.load(msg_context, f, full_type)
+        else:
+            spec = self.spec_loader_fn(msg_context, f, full_type)
         outfile = compute_outfile_name(outdir, os.path.basename(f), self.ext)
-        with open(outfile, 'w') as f:
-            for l in self.generator_fn(msg_context, spec, search_path):
-                f.write(l+'\n')
+        if spec_cache is not None:
+            spec_cache.load_depends(msg_context, spec, search_path)
+        stamp = compute_stamp(msg_context, spec, search_path)
+        if spec_cache is not None:
+            spec_cache.record(msg_context, spec)
+        # e.g. <stamp_dir>/std_msgs/Header.msg.stamp
+        stamp_path = os.path.join(stamp_dir, full_type + self.ext + '.stamp') if stamp_dir else None
+        if read_stamp(outfile, stamp_path) == stamp:
+            # neither the spec, its dependencies nor genpy changed
+            return outfile
+        # a new stamp alone, e.g. after a genpy update that does not
+        # change the code of this file, leaves the file untouched
+        write_if_changed(outfile, ''.join(l + '\n' for l in self.generator_fn(msg_context, spec, search_path)))
+        write_stamp(outfile, stamp, stamp_path)
         return outfile
 
-    def generate_messages(self, package, package_files, outdir, search_path):  # noqa: D200, D400, D401
+    def generate_messages(self, package, package_files, outdir, search_path, jobs=1, msg_context=None,
+                          spec_cache=None, stamp_dir=None):
         """
+        Generate the Python code of a package's files.
+
+        With *jobs* > 1 the files are split across a pool of processes.
+        Each process parses the dependencies of its files once.
+
+        :param jobs: number of processes to use, ``int``
+        :param msg_context: context to load the files and their
+          dependencies into, which may already hold dependencies
+          loaded earlier. Only used if *jobs* is 1, ``MsgContext``
+        :param spec_cache: cache of parsed .msg files, ``genpy.spec_cache.SpecCache``
+        :param stamp_dir: directory to keep the stamps of the generated
+          files in, defaults to hidden files next to them, ``str``
         :returns: return code, ``int``
         """
         if not genmsg.is_legal_resource_base_name(package):
             raise MsgGenerationException("\nERROR: package name '%s' is illegal and cannot be used in message generation.\nPlease see http://ros.org/wiki/Names" % (package))
 
+        package_files = list(package_files)
+        jobs = min(jobs, len(package_files))
+        if jobs <= 1:
+            return self._generate_files(package, package_files, outdir, search_path, msg_context, spec_cache,
+                                        stamp_dir)
+        import multiprocessing
+        pool = multiprocessing.Pool(jobs)
+        try:
+            retcodes = pool.map(_generate_files, [
+                (self, package, package_files[i::jobs], outdir, search_path, spec_cache, stamp_dir)
+                for i in range(jobs)])
+        finally:
+            pool.close()
+            pool.join()
+        return max(retcodes)
+
+    def _generate_files(self, package, package_files, outdir, search_path, msg_context=None, spec_cache=None,
+                        stamp_dir=None):
         # package/src/package/msg for messages, packages/src/package/srv for services
-        msg_context = MsgContext.create_default()
+        if msg_context is None:
+            msg_context = MsgContext.create_default()
         retcode = 0
         for f in package_files:
             try:
                 f = os.path.abspath(f)
                 infile_name = os.path.basename(f)
                 full_type = genmsg.gentools.compute_full_type_name(package, infile_name)
-                self.generate(msg_context, full_type, f, outdir, search_path)  # actual generation
+                self.generate(msg_context, full_type, f, outdir, search_path, spec_cache, stamp_dir)  # actual generation
             except Exception as e:
                 if not isinstance(e, MsgGenerationException) and not isinstance(e, genmsg.msgs.InvalidMsgSpec):
                     traceback.print_exc()
                 print("\nERROR: Unable to generate %s for package '%s': while processing '%s': %s\n" % (self.what, package, f, e), file=sys.stderr)
                 retcode = 1  # flag error
+        if spec_cache is not None:
+            spec_cache.save()
         return retcode
 
 
+def _generate_files(args):
+    # entry point of the processes of Generator.generate_messages
+    gen, package, package_files, outdir, search_path, spec_cache, stamp_dir = args
+    return gen._generate_files(package, package_files, outdir, search_path, spec_cache=spec_cache,
+                               stamp_dir=stamp_dir)
+
+
 class SrvGenerator(Generator):
 
     def __init__(self):
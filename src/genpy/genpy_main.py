@@ -43,19 +43,57 @@ import genmsg.command_line
 from genmsg import MsgGenerationException
 
 from . generate_initpy import write_modules
+from . spec_cache import SpecCache
 
 
 def usage(progname):
     print('%(progname)s file(s)' % vars())
 
 
+def expand_files(args, ext):
+    """
+    Expand directories in the file arguments to the files they contain.
+
+    :param args: files and directories, ``[str]``
+    :param ext: extension of the files to generate, e.g. ``.msg``, ``str``
+    :returns: files, ``[str]``
+    """
+    files = []
+    for arg in args:
+        if os.path.isdir(arg):
+            files.extend(sorted(os.path.join(arg, f) for f in os.listdir(arg) if f.endswith(ext)))
+        else:
+            files.append(arg)
+    return files
+
+
 def genmain(argv, progname, gen):
+    sys.exit(generate(argv, progname, gen))
+
+
+def generate(argv, progname, gen, get_msg_context=None):
+    """
+    Generate code as specified by the command line arguments of genmain.
+
+    :param argv: command line arguments, ``[str]``
+    :param progname: name of the program, ``str``
+    :param gen: generator, ``genpy.generator.Generator``
+    :param get_msg_context: function that returns the context to load
+      files into for a search path, defaults to a new context, ``fn(dict) -> MsgContext``
+    :returns: return code, ``int``
+    """
     parser = OptionParser('%s file' % (progname))
     parser.add_option('--initpy', dest='initpy', action='store_true',
                       default=False)
     parser.add_option('-p', dest='package')
     parser.add_option('-o', dest='outdir')
     parser.add_option('-I', dest='includepath', action='append')
+    parser.add_option('-j', '--jobs', dest='jobs', type='int', default=1,
+                      help='number of processes to generate the files in')
+    parser.add_option('--spec-cache', dest='spec_cache', default=os.environ.get('GENPY_SPEC_CACHE_DIR'),
+                      help='directory to cache parsed .msg files in')
+    parser.add_option('--stamp-dir', dest='stamp_dir',
+                      help='directory to keep the stamps of the generated files in')
     options, args = parser.parse_args(argv)
     try:
         if options.initpy:
@@ -76,7 +114,11 @@ def genmain(argv, progname, gen):
                     if not os.path.exists(options.outdir):
                         raise
             search_path = genmsg.command_line.includepath_to_dict(options.includepath)
-            retcode = gen.generate_messages(options.package, args[1:], options.outdir, search_path)
+            msg_context = get_msg_context(search_path) if get_msg_context is not None else None
+            spec_cache = SpecCache(options.spec_cache) if options.spec_cache else None
+            retcode = gen.generate_messages(options.package, expand_files(args[1:], gen.ext), options.outdir,
+                                            search_path, jobs=options.jobs, msg_context=msg_context,
+                                            spec_cache=spec_cache, stamp_dir=options.stamp_dir)
     except genmsg.InvalidMsgSpec as e:
         print('ERROR: ', e, file=sys.stderr)
         retcode = 1
@@ -87,4 +129,4 @@ def genmain(argv, progname, gen):
         traceback.print_exc()
         print('ERROR: ', e)
         retcode = 3
-    sys.exit(retcode or 0)
+    return retcode or 0
@@ -0,0 +1,127 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+Interning of repeated string field values during deserialization.
+
+Messages often carry the same few string values over and over, e.g.
+``header.frame_id``. When a :class:`StringInterner` is assigned to the
+``_string_interner`` attribute of a message class (or of
+:class:`genpy.Message` for all classes), generated deserializers decode
+string fields through it, and repeated values return a shared ``str``
+object instead of a new copy per message.
+"""
+
+import threading
+from collections import OrderedDict
+
+
+class StringInterner(object):
+    """
+    Bounded LRU cache mapping serialized string values to decoded strings.
+
+    Only strings of up to *max_length* bytes are interned, longer
+    values are decoded without being cached. The cache is either global
+    or, with *per_field* set, split by field so that fields with many
+    distinct values cannot evict the values of enum-like fields.
+    Generated deserializers identify fields by the message type that
+    declares them and the field name, e.g. ``std_msgs/Header.frame_id``
+    for the ``frame_id`` of every Header, whether it is embedded in a
+    message or in an array element.
+    """
+
+    def __init__(self, max_entries=1024, max_length=64, per_field=False):
+        """
+        Create an empty interner.
+
+        :param max_entries: maximum number of cached strings, per field
+          if *per_field* is set, ``int``
+        :param max_length: maximum length in bytes of interned strings, ``int``
+        :param per_field: if True, keep a separate cache per field, ``bool``
+        """
+        self.max_entries = max_entries
+        self.max_length = max_length
+        self.per_field = per_field
+        self._lock = threading.Lock()
+        self._caches = {}
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def decode(self, data, field=None):
+        """
+        Decode a serialized UTF-8 string, returning a cached object if possible.
+
+        :param data: serialized string data, ``bytes``
+        :param field: field the string is read from, e.g. ``std_msgs/Header.frame_id``, ``str``
+        :returns: decoded string, ``str``
+        """
+        if len(data) > self.max_length:
+            return data.decode('utf-8', 'rosmsg')
+        key = field if self.per_field else None
+        with self._lock:
+            cache = self._caches.get(key)
+            if cache is None:
+                cache = self._caches[key] = OrderedDict()
+            value = cache.pop(data, None)
+            if value is not None:
+                self._hits += 1
+                cache[data] = value  # mark as most recently used
+                return value
+            self._misses += 1
+            value = data.decode('utf-8', 'rosmsg')
+            cache[data] = value
+            if len(cache) > self.max_entries:
+                cache.popitem(last=False)
+                self._evictions += 1
+        return value
+
+    def clear(self):
+        """Remove all cached strings."""
+        with self._lock:
+            self._caches.clear()
+
+    def stats(self):
+        """
+        Get cache statistics.
+
+        :returns: statistics with keys ``hits``, ``misses``,
+          ``evictions`` and ``entries``, ``dict``
+        """
+        with self._lock:
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'evictions': self._evictions,
+                'entries': sum(len(c) for c in self._caches.values()),
+            }
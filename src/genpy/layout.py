@@ -0,0 +1,526 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+Wire layout of generated message classes.
+
+The functions in this module describe how the fields of a message
+class are laid out in its serialized form. They only rely on the
+``__slots__`` and ``_slot_types`` of the generated classes, so they
+work for statically generated classes as well as for classes created
+by :mod:`genpy.dynamic`.
+
+Fields that follow variable-length fields (strings and
+variable-length arrays) don't have a constant offset. Their location
+in a serialized buffer is found by walking the length prefixes of the
+preceding fields, see :func:`field_offset`. To locate the same field
+in many messages, :func:`compile_field_offset` resolves its path once.
+"""
+
+from io import BytesIO
+import re
+import struct
+
+import genmsg.msgs
+
+from .base import SIMPLE_TYPES_DICT
+from .message import Message
+from .message import MessageException
+from .message import get_message_class
+from .rostime import Duration
+from .rostime import Time
+
+# builtin types that are represented by classes instead of primitives
+_TIME_CLASSES = {'time': Time, 'duration': Duration}
+
+# cache for get_field_class
+_field_class_cache = {}
+# cache for message_size
+_message_size_cache = {}
+# cache for _static_offset
+_static_offset_cache = {}
+
+_length_struct = struct.Struct('<I')
+_time_structs = {'time': struct.Struct('<2I'), 'duration': struct.Struct('<2i')}
+
+_path_segment = re.compile(r'^([A-Za-z_][A-Za-z0-9_]*)(?:\[(\d+)\])?$')
+
+
+def iter_fields(msg_class):
+    """
+    Iterate over the fields of a message class.
+
+    :param msg_class: message class, ``Message class``
+    :returns: iterator of field name, field type, base type, array
+      flag and array length (``None`` for variable-length arrays),
+      ``iter((str, str, str, bool, int))``
+    """
+    for name, type_ in zip(msg_class.__slots__, msg_class._slot_types):
+        base_type, is_array, array_len = genmsg.msgs.parse_type(type_)
+        yield name, type_, base_type, is_array, array_len
+
+
+def _find_in_namespace(msg_class, type_):
+    namespace = getattr(msg_class.__init__, '__globals__', {})
+    package, base_type = genmsg.package_resource_name(type_)
+    module = getattr(namespace.get(package), 'msg', None)
+    candidate = getattr(module, base_type, None)
+    if isinstance(candidate, type) and issubclass(candidate, Message):
+        return candidate
+    for value in list(namespace.values()):
+        if isinstance(value, type) and issubclass(value, Message) and getattr(value, '_type', None) == type_:
+            return value
+    return None
+
+
+def get_field_class(msg_class, type_):
+    """
+    Get the class that represents a non-primitive field type of a message class.
+
+    Classes created by :mod:`genpy.dynamic` resolve types from the
+    classes of the definition they were generated from. Otherwise,
+    types are resolved in the namespace of the module that defines
+    *msg_class* first. That module imports the packages of statically
+    generated dependencies. If that fails, the type is loaded with
+    :func:`genpy.message.get_message_class`.
+
+    NOTE: this function maintains a local cache of results.
+    :param msg_class: message class that has a field of *type_*, ``Message class``
+    :param type_: base type of the field, e.g. ``std_msgs/Header``, ``str``
+    :returns: class for *type_*, ``class``
+    :raises: :exc:`MessageException` If the class cannot be found
+    """
+    if type_ in _TIME_CLASSES:
+        return _TIME_CLASSES[type_]
+    key = (msg_class, type_)
+    if key in _field_class_cache:
+        return _field_class_cache[key]
+
+    # a module of genpy.dynamic.generate_dynamic_batch can contain
+    # several classes of a type with different definitions
+    cls = msg_class.__dict__.get('_dynamic_classes', {}).get(type_)
+    if cls is None:
+        cls = _find_in_namespace(msg_class, type_)
+    if cls is None:
+        cls = get_message_class(type_)
+    if cls is None:
+        raise MessageException('Cannot load message class for [%s] used by [%s]' % (type_, msg_class._type))
+    _field_class_cache[key] = cls
+    return cls
+
+
+def is_primitive(type_):
+    """
+    Check if a base type has a fixed-size struct representation.
+
+    :param type_: base type, ``str``
+    :returns: ``True`` if *type_* is a fixed-size primitive, ``bool``
+    """
+    return type_ in SIMPLE_TYPES_DICT
+
+
+def flatten_fields(msg_class):
+    """
+    Get the flattened fields of a message class.
+
+    Embedded messages that are not in arrays are replaced by their
+    fields with dotted names, and time and duration fields by their
+    ``secs`` and ``nsecs`` fields, as :func:`genpy.generator.flatten`
+    does for message specs.
+
+    :param msg_class: message class, ``Message class``
+    :returns: flattened field paths and types, ``[(str, str)]``
+    """
+    fields = []
+    for name, type_, base_type, is_array, array_len in iter_fields(msg_class):
+        if is_array or is_primitive(base_type) or base_type == 'string':
+            fields.append((name, type_))
+        elif base_type in _time_structs:
+            secs_type = 'uint32' if base_type == 'time' else 'int32'
+            fields.extend([(name + '.secs', secs_type), (name + '.nsecs', secs_type)])
+        else:
+            field_class = get_field_class(msg_class, base_type)
+            fields.extend([(name + '.' + path, t) for path, t in flatten_fields(field_class)])
+    return fields
+
+
+def message_size(msg_class):
+    """
+    Get the serialized size of a fixed-size message class.
+
+    NOTE: this function maintains a local cache of results.
+    :param msg_class: message class, ``Message class``
+    :returns: serialized size, or ``None`` if the size depends on
+      the field values, ``int``
+    """
+    if msg_class in _message_size_cache:
+        return _message_size_cache[msg_class]
+    size = 0
+    for name, type_, base_type, is_array, array_len in iter_fields(msg_class):
+        field_size = type_size(msg_class, type_)
+        if field_size is None:
+            size = None
+            break
+        size += field_size
+    _message_size_cache[msg_class] = size
+    return size
+
+
+def type_size(msg_class, type_):
+    """
+    Get the serialized size of a field type.
+
+    :param msg_class: message class that has a field of *type_*, ``Message class``
+    :param type_: field type, e.g. ``float64[3]``, ``str``
+    :returns: serialized size, or ``None`` if the size depends on
+      the field value, ``int``
+    """
+    base_type, is_array, array_len = genmsg.msgs.parse_type(type_)
+    if is_array and array_len is None:
+        return None
+    if is_primitive(base_type):
+        size = struct.calcsize('<' + SIMPLE_TYPES_DICT[base_type])
+    elif base_type in _time_structs:
+        size = _time_structs[base_type].size
+    elif base_type == 'string':
+        return None
+    else:
+        size = message_size(get_field_class(msg_class, base_type))
+        if size is None:
+            return None
+    return size * array_len if is_array else size
+
+
+def skip_field(msg_class, type_, buff, offset):
+    """
+    Skip a serialized field value.
+
+    :param msg_class: message class that has a field of *type_*, ``Message class``
+    :param type_: field type, ``str``
+    :param buff: serialized message, ``bytes`` or other buffer
+    :param offset: offset of the field value in *buff*, ``int``
+    :returns: offset after the field value, ``int``
+    """
+    size = type_size(msg_class, type_)
+    if size is not None:
+        return offset + size
+    base_type, is_array, array_len = genmsg.msgs.parse_type(type_)
+    if not is_array:
+        if base_type == 'string':
+            return offset + 4 + _length_struct.unpack_from(buff, offset)[0]
+        return skip_message(get_field_class(msg_class, base_type), buff, offset)
+    if array_len is None:
+        (array_len,) = _length_struct.unpack_from(buff, offset)
+        offset += 4
+    element_size = type_size(msg_class, base_type)
+    if element_size is not None:
+        return offset + array_len * element_size
+    if base_type == 'string':
+        for _ in range(array_len):
+            offset = skip_field(msg_class, base_type, buff, offset)
+        return offset
+    field_class = get_field_class(msg_class, base_type)
+    for _ in range(array_len):
+        offset = skip_message(field_class, buff, offset)
+    return offset
+
+
+def skip_message(msg_class, buff, offset):
+    """
+    Skip a serialized message.
+
+    :param msg_class: message class, ``Message class``
+    :param buff: serialized data, ``bytes`` or other buffer
+    :param offset: offset of the message in *buff*, ``int``
+    :returns: offset after the message, ``int``
+    """
+    size = message_size(msg_class)
+    if size is not None:
+        return offset + size
+    for name, type_, base_type, is_array, array_len in iter_fields(msg_class):
+        offset = skip_field(msg_class, type_, buff, offset)
+    return offset
+
+
+def _static_offset(msg_class, field):
+    """
+    Get the constant offset of a field within a message.
+
+    :returns: field type and offset of the field, or ``None`` if a
+      variable-length field precedes it, ``(str, int)``
+    :raises: :exc:`MessageException` If *msg_class* has no field *field*
+    """
+    key = (msg_class, field)
+    if key in _static_offset_cache:
+        return _static_offset_cache[key]
+    offset = 0
+    for name, type_, base_type, is_array, array_len in iter_fields(msg_class):
+        if name == field:
+            _static_offset_cache[key] = type_, offset
+            return type_, offset
+        if offset is not None:
+            size = type_size(msg_class, type_)
+            offset = None if size is None else offset + size
+    raise MessageException('%s has no field [%s]' % (msg_class._type, field))
+
+
+def field_offset(msg_class, buff, path):
+    """
+    Locate a field in a serialized message.
+
+    Offsets of fields that are preceded by variable-length fields are
+    computed by walking the length prefixes in *buff*.
+
+    :param msg_class: message class of the serialized message, ``Message class``
+    :param buff: serialized message, or ``None`` to only compute
+      constant offsets, ``bytes`` or other buffer
+    :param path: dotted field path, with optional array indices,
+      e.g. ``header.stamp`` or ``points[2].x``, ``str``
+    :returns: class that has the field, field type and offset of the
+      field value in *buff*. The offset is ``None`` if *buff* is
+      ``None`` and the offset depends on the message contents,
+      ``(Message class, str, int)``
+    :raises: :exc:`MessageException` If *path* does not refer to a field of *msg_class*
+    """
+    offset = 0
+    cls = msg_class
+    type_ = None
+    for segment in path.split('.'):
+        if type_ is not None:
+            base_type, is_array, array_len = genmsg.msgs.parse_type(type_)
+            if is_array or is_primitive(base_type) or base_type in _time_structs or base_type == 'string':
+                raise MessageException('[%s] in [%s] is not a message field' % (segment, path))
+            cls = get_field_class(cls, base_type)
+        match = _path_segment.match(segment)
+        if match is None:
+            raise MessageException('invalid field path [%s]' % path)
+        name, index = match.groups()
+        type_, static = _static_offset(cls, name)
+        if static is not None:
+            if offset is not None:
+                offset += static
+        elif buff is None:
+            offset = None
+        else:
+            for field_name, field_type, _, _, _ in iter_fields(cls):
+                if field_name == name:
+                    break
+                offset = skip_field(cls, field_type, buff, offset)
+        if index is None:
+            continue
+
+        base_type, is_array, array_len = genmsg.msgs.parse_type(type_)
+        if not is_array:
+            raise MessageException('[%s] in [%s] is not an array' % (name, path))
+        index = int(index)
+        if array_len is None:
+            if buff is None:
+                offset = None
+            else:
+                (array_len,) = _length_struct.unpack_from(buff, offset)
+                offset += 4
+        if array_len is not None and index >= array_len:
+            raise MessageException('index %d of [%s] is out of range' % (index, path))
+        element_size = type_size(cls, base_type)
+        if offset is None:
+            pass
+        elif element_size is not None:
+            offset += index * element_size
+        elif buff is None:
+            offset = None
+        else:
+            for _ in range(index):
+                offset = skip_field(cls, base_type, buff, offset)
+        type_ = base_type
+    return cls, type_, offset
+
+
+def _skip_fields_step(cls, types):
+    def step(buff, offset):
+        for type_ in types:
+            offset = skip_field(cls, type_, buff, offset)
+        return offset
+    return step
+
+
+def _array_length_step(path, index):
+    def step(buff, offset):
+        (array_len,) = _length_struct.unpack_from(buff, offset)
+        if index >= array_len:
+            raise MessageException('index %d of [%s] is out of range' % (index, path))
+        return offset + 4
+    return step
+
+
+def _skip_elements_step(cls, base_type, index):
+    def step(buff, offset):
+        for _ in range(index):
+            offset = skip_field(cls, base_type, buff, offset)
+        return offset
+    return step
+
+
+def _add_step(offset):
+    def step(buff, start):
+        return start + offset
+    return step
+
+
+def compile_field_offset(msg_class, path):
+    """
+    Compile a function that locates a field in serialized messages.
+
+    The path is resolved once, like :func:`field_offset` does, so the
+    function only walks the length prefixes of the variable-length
+    fields that precede the field.
+
+    :param msg_class: message class of the serialized messages, ``Message class``
+    :param path: field path, see :func:`field_offset`, ``str``
+    :returns: class that has the field, field type and function that
+      returns the offset of the field value in a serialized message,
+      ``(Message class, str, fn(buff)->int)``
+    :raises: :exc:`MessageException` If *path* does not refer to a field of *msg_class*
+    """
+    # steps are constant offsets, or functions that advance an offset
+    # in a serialized message
+    steps = [0]
+
+    def add(step):
+        if isinstance(step, int) and isinstance(steps[-1], int):
+            steps[-1] += step
+        else:
+            steps.append(step)
+
+    cls = msg_class
+    type_ = None
+    for segment in path.split('.'):
+        if type_ is not None:
+            base_type, is_array, array_len = genmsg.msgs.parse_type(type_)
+            if is_array or is_primitive(base_type) or base_type in _time_structs or base_type == 'string':
+                raise MessageException('[%s] in [%s] is not a message field' % (segment, path))
+            cls = get_field_class(cls, base_type)
+        match = _path_segment.match(segment)
+        if match is None:
+            raise MessageException('invalid field path [%s]' % path)
+        name, index = match.groups()
+        type_, _ = _static_offset(cls, name)
+        skipped = []
+        for field_name, field_type, _, _, _ in iter_fields(cls):
+            if field_name == name:
+                break
+            size = type_size(cls, field_type)
+            if size is None:
+                skipped.append(field_type)
+                continue
+            if skipped:
+                add(_skip_fields_step(cls, skipped))
+                skipped = []
+            add(size)
+        if skipped:
+            add(_skip_fields_step(cls, skipped))
+        if index is None:
+            continue
+
+        base_type, is_array, array_len = genmsg.msgs.parse_type(type_)
+        if not is_array:
+            raise MessageException('[%s] in [%s] is not an array' % (name, path))
+        index = int(index)
+        if array_len is None:
+            add(_array_length_step(path, index))
+        elif index >= array_len:
+            raise MessageException('index %d of [%s] is out of range' % (index, path))
+        element_size = type_size(cls, base_type)
+        if element_size is not None:
+            add(index * element_size)
+        elif index:
+            add(_skip_elements_step(cls, base_type, index))
+        type_ = base_type
+
+    start = steps[0]
+    steps = [step if not isinstance(step, int) else _add_step(step) for step in steps[1:]]
+    if not steps:
+        def locate(buff):
+            return start
+    elif len(steps) == 1:
+        step = steps[0]
+
+        def locate(buff):
+            return step(buff, start)
+    else:
+        def locate(buff):
+            offset = start
+            for step in steps:
+                offset = step(buff, offset)
+            return offset
+    return cls, type_, locate
+
+
+def patch_field(msg_class, buff, path, value):
+    """
+    Overwrite a fixed-size field in a serialized message.
+
+    :param msg_class: message class of the serialized message, ``Message class``
+    :param buff: serialized message, ``bytearray`` or other writable buffer
+    :param path: field path, see :func:`field_offset`, ``str``
+    :param value: new field value, of the type used in messages
+    :raises: :exc:`MessageException` If the field is not fixed-size
+    """
+    cls, type_, offset = field_offset(msg_class, buff, path)
+    size = type_size(cls, type_)
+    if size is None:
+        raise MessageException('[%s] is not a fixed-size field of %s' % (path, msg_class._type))
+    base_type, is_array, array_len = genmsg.msgs.parse_type(type_)
+    if is_primitive(base_type):
+        pattern = SIMPLE_TYPES_DICT[base_type]
+        if not is_array:
+            struct.pack_into('<' + pattern, buff, offset, value)
+        elif base_type in ['uint8', 'char'] and not isinstance(value, (list, tuple)):
+            if len(value) != array_len:
+                raise MessageException('expected %d bytes for [%s]' % (array_len, path))
+            buff[offset:offset + size] = value
+        else:
+            struct.pack_into('<%d%s' % (array_len, pattern), buff, offset, *value)
+    elif base_type in _time_structs and not is_array:
+        _time_structs[base_type].pack_into(buff, offset, value.secs, value.nsecs)
+    else:
+        values = value if is_array else [value]
+        data = BytesIO()
+        for v in values:
+            if base_type in _time_structs:
+                data.write(_time_structs[base_type].pack(v.secs, v.nsecs))
+            else:
+                v.serialize(data)
+        data = data.getvalue()
+        if len(data) != size:
+            raise MessageException('value for [%s] has the wrong size' % path)
+        buff[offset:offset + size] = data
@@ -42,6 +42,7 @@ import itertools
 import math
 import struct
 import sys
+from io import BytesIO
 
 import genmsg
 
@@ -220,7 +221,7 @@ def _convert_getattr(val, f, t):
     attr = getattr(val, f)
     if isstring(attr) and 'uint8[' in t:
         return [ord(x) for x in attr]
-    elif isinstance(attr, bytes) and 'uint8[' in t:
+    elif isinstance(attr, (bytes, bytearray, memoryview)) and 'uint8[' in t:
         return list(attr)
     else:
         return attr
@@ -298,7 +299,7 @@ def check_type(field_name, field_type, field_val):
         # use index to generate error if '[' not present
         base_type = field_type[:field_type.index('[')]
 
-        if type(field_val) in (bytes, str):
+        if type(field_val) in (bytes, str, bytearray, memoryview):
             if base_type not in ['char', 'uint8']:
                 raise SerializationError('field %s must be a list or tuple type. Only uint8[] can be a string' % field_name)
             else:
@@ -337,6 +338,28 @@ class Message(object):
     # new-style object.
     __slots__ = ['_connection_header']
 
+    # if True, deserialize() leaves string fields as the undecoded
+    # UTF-8 bytes from the wire. serialize() writes bytes values back
+    # without re-encoding them, which lets relays forward strings
+    # without any transcoding. Can be overridden per deserialize() call.
+    _raw_strings = False
+
+    # if not None, deserialize() returns variable-length uint8[] and
+    # char[] fields of at least this many bytes as memoryviews (numpy
+    # arrays for deserialize_numpy()) that reference the input buffer
+    # instead of copying the data. The input buffer is kept alive by
+    # these fields and must not be modified while they are in use.
+    _blob_borrow_threshold = None
+
+    # if not None, a genpy.interning.StringInterner that deserialize()
+    # uses to decode string fields, so that repeated values share a
+    # single str object.
+    _string_interner = None
+
+    # if not None, the genpy.buffer_pool.BufferPool that
+    # serialize_pooled() serializes into instead of the default pool.
+    _buffer_pool = None
+
     def __init__(self, *args, **kwds):
         """
         Create a new Message instance.
@@ -401,14 +424,87 @@ class Message(object):
         """
         pass
 
-    def deserialize(self, str_):
+    def serialize_pooled(self, pool=None):
+        """
+        Serialize data into a reusable buffer of a buffer pool.
+
+        The buffer must be released once the data has been sent, e.g.
+        by using it as a context manager::
+
+          with msg.serialize_pooled() as buff:
+              sock.sendall(buff.view())
+
+        :param pool: pool to take the buffer from. Defaults to the class
+          ``_buffer_pool`` setting or the process-wide pool, ``genpy.buffer_pool.BufferPool``
+        :returns: buffer containing the serialized message, ``genpy.buffer_pool.PooledBuffer``
+        """
+        from .buffer_pool import get_default_pool
+        if pool is None:
+            pool = self._buffer_pool or get_default_pool()
+        return pool.serialize(self)
+
+    def deserialize(self, str_, raw_strings=None):
         """
         Deserialize data in str into this instance.
 
         :param str_: serialized data, ``str``
+        :param raw_strings: if True, leave string fields as undecoded
+          ``bytes``. Defaults to the class ``_raw_strings`` setting, ``bool``
         """
         pass
 
+    @classmethod
+    def patch(cls, buff, field, value):
+        """
+        Overwrite a fixed-size field of a serialized message in place.
+
+        Only the bytes of the field are written, e.g. to re-stamp a
+        message with ``Cls.patch(buff, 'header.stamp', t)``. Fields
+        after variable-length fields are located by walking the length
+        prefixes in *buff*.
+
+        :param buff: serialized message of this type, ``bytearray``
+        :param field: field path, e.g. ``header.stamp`` or ``points[2].x``, ``str``
+        :param value: new field value
+        :raises: :exc:`MessageException` If the field is not fixed-size
+        """
+        from .layout import patch_field
+        patch_field(cls, buff, field, value)
+
+    @classmethod
+    def project(cls, buff, fields):
+        """
+        Deserialize only selected fields of a serialized message.
+
+        Fields that are not requested are skipped without being
+        decoded, e.g. ``Cls.project(buff, ['header.stamp', 'pose.position'])``.
+
+        :param buff: serialized message of this type, ``str``
+        :param fields: field paths to decode, ``[str]``
+        :returns: message with the requested fields set and default
+          values in the other fields, ``Message``
+        :raises: :exc:`MessageException` If a path is not a field of this type
+        """
+        from .projection import get_projection
+        return get_projection(cls, fields).deserialize(buff)
+
+    @classmethod
+    def array_index(cls, buff, field):
+        """
+        Index the elements of an array field of a serialized message.
+
+        The elements are located in one pass over their length
+        prefixes and decoded on demand, e.g.
+        ``Cls.array_index(buff, 'markers')[100:110]``.
+
+        :param buff: serialized message of this type, ``str``
+        :param field: path of the array field, ``str``
+        :returns: lazily decoded view of the array, ``genpy.array_index.ArrayIndex``
+        :raises: :exc:`MessageException` If the field is not an array
+        """
+        from .array_index import ArrayIndex
+        return ArrayIndex(cls, buff, field)
+
     def __repr__(self):
         return strify_message(self)
 
@@ -437,6 +533,172 @@ class Message(object):
         return not self == other
 
 
+class RawMessage(Message):
+    """
+    Serialized message that is passed through without being decoded.
+
+    :meth:`serialize` writes the original serialized bytes verbatim,
+    so bridges and recorders can forward a RawMessage through any
+    transport that carries Messages. The typed message is only decoded
+    when :meth:`message` is called, and the result is cached. Changes
+    made to the decoded message are not written back by
+    :meth:`serialize`.
+
+    Use :func:`get_raw_message_class` to create a RawMessage class for
+    a specific message type.
+    """
+
+    __slots__ = ['_buff', '_message']
+    _type = '*'
+    _md5sum = '*'
+    _full_text = ''
+    _has_header = False
+    _slot_types = []
+    # message class used to decode the buffer. If None, the class is
+    # looked up by _type when the message is first decoded.
+    _message_class = None
+
+    def __init__(self, buff=None, message=None):
+        """
+        Create a new RawMessage instance.
+
+        :param buff: serialized message data, ``bytes``
+        :param message: decoded message. It is only serialized if
+          *buff* is not set, ``Message``
+        """
+        self._buff = buff
+        self._message = message
+
+    def __reduce__(self):
+        """Support for Python pickling."""
+        # classes created by get_raw_message_class() are not module
+        # attributes, so they are recreated when unpickling
+        return (_load_raw_message, (self._message_class, self._type, self._md5sum, self._full_text, self._get_buff()))
+
+    def _get_types(self):
+        return self._slot_types
+
+    def _get_buff(self):
+        if self._buff is None and self._message is not None:
+            buff = BytesIO()
+            self._message.serialize(buff)
+            self._buff = buff.getvalue()
+        return self._buff
+
+    def serialize(self, buff):
+        """
+        Write the serialized message data into buffer.
+
+        :param buff: buffer, ``StringIO``
+        :raises: :exc:`SerializationError` If the instance holds neither
+          data nor a message
+        """
+        data = self._get_buff()
+        if data is None:
+            raise SerializationError('%s instance has no data to serialize' % self.__class__.__name__)
+        buff.write(data)
+
+    def deserialize(self, str_, raw_strings=None):
+        """
+        Store serialized data in this instance without decoding it.
+
+        The buffer is kept by reference and must not be modified
+        while this instance is in use.
+
+        :param str_: serialized data, ``str``
+        :param raw_strings: unused, the data is not decoded
+        """
+        self._buff = str_
+        self._message = None
+        return self
+
+    def message(self):
+        """
+        Decode the serialized data into a typed message.
+
+        The decoded message is cached, so the data is decoded at most
+        once.
+
+        :returns: decoded message, ``Message``
+        :raises: :exc:`MessageException` If the message class cannot be
+          determined or does not match the md5sum of this type
+        """
+        if self._message is None:
+            cls = self._message_class
+            if cls is None:
+                cls = get_message_class(self._type)
+                if cls is None:
+                    raise MessageException('Cannot load message class for [%s]' % self._type)
+            if self._md5sum != '*' and cls._md5sum != self._md5sum:
+                raise MessageException('md5sum of %s [%s] does not match raw data [%s]' % (cls._type, cls._md5sum, self._md5sum))
+            # generated deserializers decode strings from bytes slices
+            self._message = cls().deserialize(bytes(self._buff))
+        return self._message
+
+    def __repr__(self):
+        return '<%s %s: %s bytes>' % (self.__class__.__name__, self._type, len(self._get_buff() or b''))
+
+    __str__ = __repr__
+
+    def __eq__(self, other):
+        if not isinstance(other, RawMessage):
+            return False
+        return self._type == other._type and bytes(self._get_buff() or b'') == bytes(other._get_buff() or b'')
+
+
+def _load_raw_message(message_class, type_, md5sum, full_text, buff):
+    if message_class is None and type_ == RawMessage._type:
+        return RawMessage(buff)
+    return get_raw_message_class(message_class, type_, md5sum, full_text)(buff)
+
+
+# cache for get_raw_message_class
+_raw_message_class_cache = {}
+
+
+def get_raw_message_class(message_class=None, type_=None, md5sum='*', full_text=''):
+    """
+    Get a :class:`RawMessage` class for a message type.
+
+    The returned class carries the ``_type``, ``_md5sum`` and
+    ``_full_text`` of the message type, so it can be used in place of
+    the message class by transports.
+
+    NOTE: this function maintains a local cache of results.
+    :param message_class: message class to wrap, ``Message class``
+    :param type_: message type name, used if *message_class* is not
+      given. The message class is then looked up on first decode, ``str``
+    :param md5sum: md5sum of the message type, used if *message_class* is not given, ``str``
+    :param full_text: full message definition, used if *message_class* is not given, ``str``
+    :returns: RawMessage subclass for the type, ``RawMessage class``
+    :raises: :exc:`ValueError` If neither message_class nor type_ is given
+    """
+    if message_class is not None:
+        key = message_class
+    elif type_ is not None:
+        key = (type_, md5sum)
+    else:
+        raise ValueError('message_class or type_ must be specified')
+    if key in _raw_message_class_cache:
+        return _raw_message_class_cache[key]
+
+    if message_class is not None:
+        attrs = {
+            '_type': message_class._type,
+            '_md5sum': message_class._md5sum,
+            '_full_text': message_class._full_text,
+            '_has_header': message_class._has_header,
+            '_message_class': message_class,
+        }
+    else:
+        attrs = {'_type': type_, '_md5sum': md5sum, '_full_text': full_text}
+    attrs['__slots__'] = []
+    base_type = genmsg.package_resource_name(attrs['_type'])[1]
+    cls = type('Raw%s' % base_type, (RawMessage,), attrs)
+    _raw_message_class_cache[key] = cls
+    return cls
+
+
 def get_printable_message_args(msg, buff=None, prefix=''):
     """
     Get string representation of msg arguments.
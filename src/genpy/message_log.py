@@ -0,0 +1,425 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Memory-mapped message log.
+
+A message log stores messages as they are produced by the generated
+serialize() methods. The file consists of a header, the records, and a
+compact index that is written when the log is closed::
+
+  header:  'GENPYLOG' magic, uint32 version, uint32 reserved
+  records: a type record before the first message of each type, and a
+           message record per message
+  types:   uint32 count, then per type a type entry
+  index:   per message: uint64 offset of its length, uint32 type id,
+           uint32 secs, uint32 nsecs
+  trailer: uint64 types offset, uint64 index offset, uint32 record
+           count, uint32 flags, 'GIDX' magic
+
+Type records are uint32 0xffffffff followed by a type entry: the type
+name, md5sum and full message text as length-prefixed strings and a
+uint32 has_header flag. Message records are uint32 type id, uint32
+secs, uint32 nsecs, then the serialized message prefixed with its
+length as in ROS transports.
+
+:class:`MessageLogReader` memory-maps the file and decodes messages
+lazily, by position or by time range, so that reading a message costs
+the same regardless of the size of the log. The records hold all the
+information of the index, so the reader rebuilds the index of a log
+that was not closed, e.g. because its writer crashed.
+"""
+
+import bisect
+from io import BytesIO
+import mmap
+import struct
+
+from .message import MessageException
+from .message import get_message_class
+from .rostime import Time
+
+MAGIC = b'GENPYLOG'
+VERSION = 2
+
+_header_struct = struct.Struct('<8sII')
+_record_struct = struct.Struct('<III')
+_length_struct = struct.Struct('<I')
+_index_struct = struct.Struct('<QIII')
+_trailer_struct = struct.Struct('<QQII4s')
+_stamp_struct = struct.Struct('<II')
+_TRAILER_MAGIC = b'GIDX'
+
+# trailer flag: index entries are ordered by stamp
+FLAG_SORTED = 1
+
+# type id of type records
+_TYPE_RECORD = 0xffffffff
+
+# offset of header.stamp in messages with a Header (after uint32 seq)
+_HEADER_STAMP_OFFSET = 4
+
+
+def _pack_string(value):
+    if not isinstance(value, bytes):
+        value = value.encode('utf-8')
+    return struct.pack('<I', len(value)) + value
+
+
+def _unpack_string(buff, offset):
+    (length,) = struct.unpack_from('<I', buff, offset)
+    offset += 4
+    if offset + length > len(buff):
+        raise struct.error('string exceeds the buffer')
+    return buff[offset:offset + length].decode('utf-8'), offset + length
+
+
+def _pack_type(type_, md5sum, full_text, has_header):
+    return _pack_string(type_) + _pack_string(md5sum) + _pack_string(full_text) + \
+        struct.pack('<I', 1 if has_header else 0)
+
+
+def _unpack_type(buff, offset):
+    """
+    Unpack a type entry.
+
+    :returns: type name, md5sum, full text and has_header flag, and the
+      offset after the entry, ``((str, str, str, bool), int)``
+    """
+    type_, offset = _unpack_string(buff, offset)
+    md5sum, offset = _unpack_string(buff, offset)
+    full_text, offset = _unpack_string(buff, offset)
+    (has_header,) = struct.unpack_from('<I', buff, offset)
+    return (type_, md5sum, full_text, bool(has_header)), offset + 4
+
+
+class MessageLogWriter(object):
+    """Append messages to a message log file."""
+
+    def __init__(self, path):
+        """
+        Create a new message log, overwriting any existing file.
+
+        :param path: path of the log file, ``str``
+        """
+        self._file = open(path, 'wb')
+        self._file.write(_header_struct.pack(MAGIC, VERSION, 0))
+        self._types = {}
+        self._type_info = []
+        self._index = bytearray()
+        self._count = 0
+        self._sorted = True
+        self._last_stamp = (0, 0)
+
+    def _get_type_id(self, msg):
+        key = (msg._type, msg._md5sum)
+        type_id = self._types.get(key)
+        if type_id is None:
+            type_id = self._types[key] = len(self._type_info)
+            info = (msg._type, msg._md5sum, msg._full_text, msg._has_header)
+            self._type_info.append(info)
+            self._file.write(struct.pack('<I', _TYPE_RECORD) + _pack_type(*info))
+        return type_id
+
+    def write(self, msg, stamp=None):
+        """
+        Append a message to the log.
+
+        :param msg: message to write. A :class:`genpy.RawMessage`
+          is written without being decoded, ``Message``
+        :param stamp: time to index the message by. Defaults to
+          ``header.stamp`` for messages with a Header, ``Time``
+        :returns: position of the message in the log, ``int``
+        """
+        type_id = self._get_type_id(msg)
+        buff = BytesIO()
+        msg.serialize(buff)
+        data = buff.getvalue()
+
+        if stamp is not None:
+            secs, nsecs = stamp.secs, stamp.nsecs
+        elif msg._has_header and len(data) >= _HEADER_STAMP_OFFSET + _stamp_struct.size:
+            # read the stamp from the serialized header
+            secs, nsecs = _stamp_struct.unpack_from(data, _HEADER_STAMP_OFFSET)
+        else:
+            secs, nsecs = 0, 0
+        if (secs, nsecs) < self._last_stamp:
+            self._sorted = False
+        self._last_stamp = (secs, nsecs)
+
+        offset = self._file.tell() + _record_struct.size
+        self._file.write(_record_struct.pack(type_id, secs, nsecs) + _length_struct.pack(len(data)))
+        self._file.write(data)
+        self._index.extend(_index_struct.pack(offset, type_id, secs, nsecs))
+        self._count += 1
+        return self._count - 1
+
+    def close(self):
+        """Write the index and close the log file."""
+        if self._file is None:
+            return
+        f = self._file
+        types_offset = f.tell()
+        f.write(struct.pack('<I', len(self._type_info)))
+        for info in self._type_info:
+            f.write(_pack_type(*info))
+        index_offset = f.tell()
+        f.write(self._index)
+        flags = FLAG_SORTED if self._sorted else 0
+        f.write(_trailer_struct.pack(types_offset, index_offset, self._count, flags, _TRAILER_MAGIC))
+        f.close()
+        self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class MessageLogReader(object):
+    """Random-access reader for message logs."""
+
+    def __init__(self, path, classes=None):
+        """
+        Open a message log.
+
+        Message classes are taken from *classes*, or loaded by type
+        name. If neither provides a class with a matching md5sum, the
+        class is generated dynamically from the message definition
+        stored in the log.
+
+        The index of a log that was not closed is rebuilt from its
+        records. A record that was only partially written is ignored.
+
+        :param path: path of the log file, ``str``
+        :param classes: message classes to decode with, ``[Message class]``
+        :raises: :exc:`MessageException` If the file is not a message log
+        """
+        self._file = open(path, 'rb')
+        try:
+            self._buff = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise MessageException('%s is not a message log' % path)
+        buff = self._buff
+        if len(buff) < _header_struct.size or _header_struct.unpack_from(buff, 0)[0] != MAGIC:
+            self.close()
+            raise MessageException('%s is not a message log' % path)
+        version = _header_struct.unpack_from(buff, 0)[1]
+        magic = None
+        if len(buff) >= _header_struct.size + _trailer_struct.size:
+            types_offset, self._index_offset, self._count, self._flags, magic = \
+                _trailer_struct.unpack_from(buff, len(buff) - _trailer_struct.size)
+        if magic == _TRAILER_MAGIC:
+            self._index = buff
+            self.types = []
+            (count,) = struct.unpack_from('<I', buff, types_offset)
+            offset = types_offset + 4
+            for _ in range(count):
+                info, offset = _unpack_type(buff, offset)
+                self.types.append(info)
+        elif version >= 2:
+            self._rebuild_index()
+        else:
+            self.close()
+            raise MessageException('%s has no index, it was not closed properly' % path)
+
+        self._given_classes = {}
+        for cls in (classes or []):
+            self._given_classes[(cls._type, cls._md5sum)] = cls
+        self._classes = [None] * len(self.types)
+
+    def _rebuild_index(self):
+        """Rebuild the type table and index of a log that was not closed from its records."""
+        buff = self._buff
+        end = len(buff)
+        self.types = []
+        index = bytearray()
+        self._count = 0
+        self._flags = FLAG_SORTED
+        last_stamp = (0, 0)
+        offset = _header_struct.size
+        try:
+            while offset + 4 <= end:
+                (type_id,) = _length_struct.unpack_from(buff, offset)
+                if type_id == _TYPE_RECORD:
+                    info, offset = _unpack_type(buff, offset + 4)
+                    self.types.append(info)
+                    continue
+                type_id, secs, nsecs = _record_struct.unpack_from(buff, offset)
+                offset += _record_struct.size
+                (length,) = _length_struct.unpack_from(buff, offset)
+                if type_id >= len(self.types) or offset + 4 + length > end:
+                    break
+                if (secs, nsecs) < last_stamp:
+                    self._flags = 0
+                last_stamp = (secs, nsecs)
+                index.extend(_index_struct.pack(offset, type_id, secs, nsecs))
+                self._count += 1
+                offset += 4 + length
+        except (struct.error, UnicodeDecodeError):
+            # the last record was only partially written
+            pass
+        self._index = index
+        self._index_offset = 0
+
+    def __len__(self):
+        return self._count
+
+    def entry(self, i):
+        """
+        Get the index entry of a message.
+
+        :param i: position of the message, ``int``
+        :returns: file offset, type id, stamp seconds and nanoseconds, ``(int, int, int, int)``
+        """
+        if not 0 <= i < self._count:
+            raise IndexError('message log index out of range')
+        return _index_struct.unpack_from(self._index, self._index_offset + i * _index_struct.size)
+
+    def get_message_class(self, type_id):
+        """
+        Get the class used to decode messages of a type.
+
+        :param type_id: type id from the index, ``int``
+        :returns: message class, ``Message class``
+        """
+        cls = self._classes[type_id]
+        if cls is None:
+            type_, md5sum, full_text, _ = self.types[type_id]
+            cls = self._given_classes.get((type_, md5sum))
+            if cls is None:
+                cls = get_message_class(type_)
+                if cls is None or cls._md5sum != md5sum:
+                    from .dynamic import generate_dynamic
+                    cls = generate_dynamic(type_, full_text)[type_]
+            self._classes[type_id] = cls
+        return cls
+
+    def read_raw(self, i):
+        """
+        Read the serialized data of a message without decoding it.
+
+        :param i: position of the message, ``int``
+        :returns: type id and serialized message, ``(int, bytes)``
+        """
+        offset, type_id, _, _ = self.entry(i)
+        (length,) = struct.unpack_from('<I', self._buff, offset)
+        offset += 4
+        return type_id, self._buff[offset:offset + length]
+
+    def read(self, i):
+        """
+        Read and decode a message.
+
+        :param i: position of the message, ``int``
+        :returns: message, ``Message``
+        """
+        type_id, data = self.read_raw(i)
+        return self.get_message_class(type_id)().deserialize(data)
+
+    def stamp(self, i):
+        """
+        Get the stamp a message is indexed by.
+
+        :param i: position of the message, ``int``
+        :returns: stamp, ``Time``
+        """
+        _, _, secs, nsecs = self.entry(i)
+        return Time(secs, nsecs)
+
+    def _stamp_key(self, i):
+        _, _, secs, nsecs = self.entry(i)
+        return (secs, nsecs)
+
+    def range(self, start=None, end=None):
+        """
+        Get the positions of the messages with stamps in a time range.
+
+        :param start: first stamp to include, or ``None`` for no lower bound, ``Time``
+        :param end: first stamp to exclude, or ``None`` for no upper bound, ``Time``
+        :returns: positions of matching messages in log order, ``[int]``
+        """
+        lo = (start.secs, start.nsecs) if start is not None else None
+        hi = (end.secs, end.nsecs) if end is not None else None
+        if self._flags & FLAG_SORTED:
+            keys = _StampKeys(self)
+            first = bisect.bisect_left(keys, lo) if lo is not None else 0
+            last = bisect.bisect_left(keys, hi) if hi is not None else self._count
+            return list(range(first, last))
+        return [
+            i for i in range(self._count)
+            if (lo is None or self._stamp_key(i) >= lo) and (hi is None or self._stamp_key(i) < hi)]
+
+    def read_range(self, start=None, end=None):
+        """
+        Decode the messages with stamps in a time range.
+
+        :param start: first stamp to include, or ``None`` for no lower bound, ``Time``
+        :param end: first stamp to exclude, or ``None`` for no upper bound, ``Time``
+        :returns: iterator of messages, ``iter(Message)``
+        """
+        for i in self.range(start, end):
+            yield self.read(i)
+
+    def __iter__(self):
+        for i in range(self._count):
+            yield self.read(i)
+
+    def close(self):
+        self._index = None
+        if self._buff is not None:
+            self._buff.close()
+            self._buff = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class _StampKeys(object):
+    """Sequence view of the index stamps for use with bisect."""
+
+    def __init__(self, reader):
+        self._reader = reader
+
+    def __len__(self):
+        return len(self._reader)
+
+    def __getitem__(self, i):
+        return self._reader._stamp_key(i)
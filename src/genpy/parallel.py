@@ -0,0 +1,215 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Parallel deserialization of large numbers of messages.
+
+Decoding is bound by the interpreter, so threads do not speed it up.
+The functions in this module split the messages across the worker
+processes of a ``concurrent.futures.ProcessPoolExecutor``. The
+serialized messages are copied once into shared memory as a stream of
+length-framed messages, and each worker decodes a contiguous range of
+it. Results are returned in the order of the input, either as message
+objects (:func:`deserialize`) or as NumPy columns produced by
+:mod:`genpy.batch` (:func:`decode_columns`).
+
+Message classes are sent to the workers by pickling them. Classes
+created by :mod:`genpy.dynamic` pickle as a reference to their message
+definition and are generated at most once per worker.
+
+Python 3.8 or newer is required to use this module.
+"""
+
+import mmap
+import os
+import struct
+
+from .message import MessageException
+
+_length_struct = struct.Struct('<I')
+
+
+def _frame(messages):
+    """
+    Get the messages as a length-framed stream.
+
+    :param messages: serialized messages, or a length-framed stream of
+      serialized messages, ``[bytes]`` or ``bytes``
+    :returns: stream and offset of each message frame, ``(bytes, [int])``
+    """
+    if isinstance(messages, (bytes, bytearray, memoryview, mmap.mmap)):
+        stream = messages
+    else:
+        stream = b''.join(_length_struct.pack(len(m)) + bytes(m) for m in messages)
+    offsets = []
+    offset = 0
+    end = len(stream)
+    while offset + 4 <= end:
+        offsets.append(offset)
+        offset += 4 + _length_struct.unpack_from(stream, offset)[0]
+    if offset != end:
+        raise MessageException('stream does not end with a complete message')
+    return stream, offsets
+
+
+def _split(offsets, end, chunks):
+    """
+    Split message frames into contiguous ranges.
+
+    :returns: start and end offset of each range, ``[(int, int)]``
+    """
+    count = len(offsets)
+    bounds = [offsets[count * i // chunks] for i in range(chunks) if count * i // chunks < count]
+    ranges = []
+    for i, start in enumerate(bounds):
+        stop = bounds[i + 1] if i + 1 < len(bounds) else end
+        if stop > start:
+            ranges.append((start, stop))
+    return ranges
+
+
+def _deserialize_chunk(shm_name, start, end, msg_class):
+    from multiprocessing import shared_memory
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        buff = shm.buf
+        msgs = []
+        offset = start
+        while offset < end:
+            (length,) = _length_struct.unpack_from(buff, offset)
+            offset += 4
+            msgs.append(msg_class().deserialize(bytes(buff[offset:offset + length])))
+            offset += length
+        del buff
+        return msgs
+    finally:
+        shm.close()
+
+
+def _decode_columns_chunk(shm_name, start, end, msg_class):
+    from multiprocessing import shared_memory
+    from .batch import get_batch_decoder
+    decoder = get_batch_decoder(msg_class)
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        view = shm.buf[start:end]
+        try:
+            # the columns are copies, so no reference to the shared memory remains
+            return decoder.decode(view, framed=True)
+        finally:
+            view.release()
+    finally:
+        shm.close()
+
+
+def _run(worker, msg_class, messages, workers, chunks, executor):
+    """
+    Run a worker function on ranges of the messages in shared memory.
+
+    :returns: results of the worker for each range, in order
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    from multiprocessing import shared_memory
+    stream, offsets = _frame(messages)
+    if not offsets:
+        return []
+    workers = workers or os.cpu_count() or 1
+    if chunks is None:
+        chunks = 4 * workers
+    ranges = _split(offsets, len(stream), chunks)
+
+    shm = shared_memory.SharedMemory(create=True, size=len(stream))
+    try:
+        shm.buf[:len(stream)] = stream
+        args = ([shm.name] * len(ranges), [r[0] for r in ranges], [r[1] for r in ranges], [msg_class] * len(ranges))
+        if executor is not None:
+            return list(executor.map(worker, *args))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(worker, *args))
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def deserialize(msg_class, messages, workers=None, chunks=None, executor=None):
+    """
+    Deserialize messages in worker processes.
+
+    :param msg_class: message class, ``Message class``
+    :param messages: serialized messages, or a length-framed stream of
+      serialized messages, ``[bytes]`` or ``bytes``
+    :param workers: number of worker processes, or of the workers of
+      ``executor`` if one is given, defaults to the number of CPUs, ``int``
+    :param chunks: number of ranges the messages are split into,
+      defaults to four per worker, ``int``
+    :param executor: executor to use instead of creating one, ``ProcessPoolExecutor``
+    :returns: messages in input order, ``[Message]``
+    """
+    msgs = []
+    for batch in _run(_deserialize_chunk, msg_class, messages, workers, chunks, executor):
+        msgs.extend(batch)
+    return msgs
+
+
+def decode_columns(msg_class, messages, workers=None, chunks=None, executor=None):
+    """
+    Decode messages into NumPy columns in worker processes.
+
+    :param msg_class: message class, ``Message class``
+    :param messages: serialized messages, or a length-framed stream of
+      serialized messages, ``[bytes]`` or ``bytes``
+    :param workers: number of worker processes, or of the workers of
+      ``executor`` if one is given, defaults to the number of CPUs, ``int``
+    :param chunks: number of ranges the messages are split into,
+      defaults to four per worker, ``int``
+    :param executor: executor to use instead of creating one, ``ProcessPoolExecutor``
+    :returns: columns as returned by :meth:`genpy.batch.BatchDecoder.decode`, ``dict``
+    """
+    import numpy
+    from .batch import get_batch_decoder
+    from .batch import RaggedColumn
+    results = _run(_decode_columns_chunk, msg_class, messages, workers, chunks, executor)
+    if not results:
+        return get_batch_decoder(msg_class).decode(b'', framed=True)
+    columns = {}
+    for path, column in results[0].items():
+        if isinstance(column, RaggedColumn):
+            offsets = [column.offsets]
+            total = column.offsets[-1]
+            for result in results[1:]:
+                offsets.append(result[path].offsets[1:] + total)
+                total += result[path].offsets[-1]
+            columns[path] = RaggedColumn(
+                numpy.concatenate(offsets), numpy.concatenate([result[path].values for result in results]))
+        else:
+            columns[path] = numpy.concatenate([result[path] for result in results])
+    return columns
@@ -0,0 +1,277 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Field projection of serialized messages.
+
+A projection decodes only selected fields of a serialized message.
+The field list of the message is compiled once into a sequence of
+steps: consecutive fixed-size fields that are not needed are skipped
+with a single constant advance, consecutive primitive fields that are
+needed are unpacked with a single ``struct`` call (the same chunking
+the generated deserialize() methods use), and strings and
+variable-length arrays that are not needed are skipped by reading
+their length prefix only. Decoding stops after the last requested
+field.
+
+Fields that are not requested keep the default values of the message
+class, so projected messages can be printed, compared and serialized
+like any other message.
+"""
+
+import struct
+import sys
+
+from .base import SIMPLE_TYPES_DICT
+from .layout import get_field_class
+from .layout import is_primitive
+from .layout import iter_fields
+from .layout import skip_field
+from .layout import skip_message
+from .layout import type_size
+from .message import DeserializationError
+from .message import MessageException
+from .rostime import Duration
+from .rostime import Time
+
+python3 = sys.hexversion > 0x03000000
+
+_length_struct = struct.Struct('<I')
+_time_structs = {'time': (struct.Struct('<2I'), Time), 'duration': (struct.Struct('<2i'), Duration)}
+
+# cache for get_projection
+_projection_cache = {}
+
+# projection steps
+_ADVANCE = 0
+_SKIP = 1
+_UNPACK = 2
+_DECODE = 3
+_DESCEND = 4
+
+
+def _bytes(buff, start, end):
+    data = buff[start:end]
+    return data if isinstance(data, bytes) else bytes(data)
+
+
+def _decode_string(data):
+    if python3:
+        return data.decode('utf-8', 'rosmsg')
+    return data
+
+
+def decode_value(msg_class, base_type, buff, offset):
+    """
+    Decode a single serialized value of a non-array type.
+
+    :param msg_class: message class that has a field of *base_type*, ``Message class``
+    :param base_type: type of the value, ``str``
+    :param buff: serialized data, ``bytes`` or other buffer
+    :param offset: offset of the value in *buff*, ``int``
+    :returns: value and offset after the value, ``(object, int)``
+    """
+    if is_primitive(base_type):
+        s = struct.Struct('<' + SIMPLE_TYPES_DICT[base_type])
+        (value,) = s.unpack_from(buff, offset)
+        if base_type == 'bool':
+            value = bool(value)
+        return value, offset + s.size
+    if base_type in _time_structs:
+        s, cls = _time_structs[base_type]
+        return cls(*s.unpack_from(buff, offset)), offset + s.size
+    if base_type == 'string':
+        (length,) = _length_struct.unpack_from(buff, offset)
+        offset += 4
+        return _decode_string(_bytes(buff, offset, offset + length)), offset + length
+    field_class = get_field_class(msg_class, base_type)
+    end = skip_message(field_class, buff, offset)
+    return field_class().deserialize(_bytes(buff, offset, end)), end
+
+
+def _decode_field(msg_class, base_type, is_array, array_len, buff, offset):
+    """
+    Decode a field value as the generated deserialize() methods do.
+
+    :returns: value and offset after the value
+    """
+    if not is_array:
+        return decode_value(msg_class, base_type, buff, offset)
+    if array_len is None:
+        (array_len,) = _length_struct.unpack_from(buff, offset)
+        offset += 4
+    if base_type in ['uint8', 'char']:
+        end = offset + array_len
+        return _bytes(buff, offset, end), end
+    if is_primitive(base_type):
+        s = struct.Struct('<%d%s' % (array_len, SIMPLE_TYPES_DICT[base_type]))
+        value = s.unpack_from(buff, offset)
+        if base_type == 'bool':
+            value = [bool(v) for v in value]
+        return value, offset + s.size
+    values = []
+    for _ in range(array_len):
+        value, offset = decode_value(msg_class, base_type, buff, offset)
+        values.append(value)
+    return values, offset
+
+
+class Projection(object):
+    """Decoder for a subset of the fields of a message class."""
+
+    def __init__(self, msg_class, fields):
+        """
+        Compile a projection.
+
+        :param msg_class: message class, ``Message class``
+        :param fields: field paths to decode, e.g. ``header.stamp``.
+          Paths may only descend into non-array message fields, ``[str]``
+        :raises: :exc:`MessageException` If a path is not a field of *msg_class*
+        """
+        self.msg_class = msg_class
+        self.fields = list(fields)
+        tree = {}
+        for path in self.fields:
+            node = tree
+            names = path.split('.')
+            for name in names[:-1]:
+                child = node.setdefault(name, {})
+                if child is None:
+                    # the whole parent field is decoded
+                    break
+                node = child
+            else:
+                node[names[-1]] = None
+        self._steps = self._compile(msg_class, tree, False)
+
+    def _compile(self, msg_class, tree, to_end):
+        """
+        Compile the steps that decode the fields in *tree*.
+
+        :param to_end: if True, the steps advance to the end of the
+          message, which is needed for embedded messages that are
+          followed by requested fields, ``bool``
+        """
+        steps = []
+        remaining = set(tree)
+        for name, type_, base_type, is_array, array_len in iter_fields(msg_class):
+            if not remaining and not to_end:
+                # nothing is needed from the rest of the message
+                break
+            if name not in tree:
+                size = type_size(msg_class, type_)
+                if size is None:
+                    steps.append((_SKIP, type_))
+                elif steps and steps[-1][0] == _ADVANCE:
+                    steps[-1] = (_ADVANCE, steps[-1][1] + size)
+                else:
+                    steps.append((_ADVANCE, size))
+                continue
+            remaining.discard(name)
+            subtree = tree[name]
+            if subtree is not None:
+                if is_array or is_primitive(base_type) or base_type in _time_structs or base_type == 'string':
+                    raise MessageException('cannot project into field [%s] of %s' % (name, msg_class._type))
+                field_class = get_field_class(msg_class, base_type)
+                steps.append((_DESCEND, name, field_class, self._compile(field_class, subtree, to_end or bool(remaining))))
+            elif is_primitive(base_type) and not is_array:
+                if steps and steps[-1][0] == _UNPACK:
+                    steps[-1] = (_UNPACK, steps[-1][1] + [name], steps[-1][2] + SIMPLE_TYPES_DICT[base_type],
+                                 steps[-1][3] + ([name] if base_type == 'bool' else []))
+                else:
+                    steps.append((_UNPACK, [name], SIMPLE_TYPES_DICT[base_type], [name] if base_type == 'bool' else []))
+            else:
+                steps.append((_DECODE, name, base_type, is_array, array_len))
+        if remaining:
+            raise MessageException('%s has no field [%s]' % (msg_class._type, sorted(remaining)[0]))
+        # replace patterns with compiled structs
+        return [(_UNPACK, step[1], struct.Struct('<' + step[2]), step[3]) if step[0] == _UNPACK else step
+                for step in steps]
+
+    def _run(self, msg_class, steps, buff, offset, msg=None):
+        if msg is None:
+            msg = msg_class()
+        for step in steps:
+            kind = step[0]
+            if kind == _ADVANCE:
+                offset += step[1]
+            elif kind == _UNPACK:
+                _, names, s, bools = step
+                for name, value in zip(names, s.unpack_from(buff, offset)):
+                    setattr(msg, name, value)
+                for name in bools:
+                    setattr(msg, name, bool(getattr(msg, name)))
+                offset += s.size
+            elif kind == _SKIP:
+                offset = skip_field(msg_class, step[1], buff, offset)
+            elif kind == _DECODE:
+                _, name, base_type, is_array, array_len = step
+                value, offset = _decode_field(msg_class, base_type, is_array, array_len, buff, offset)
+                setattr(msg, name, value)
+            else:
+                _, name, field_class, field_steps = step
+                # decode into the default value of the field
+                value = getattr(msg, name)
+                value, offset = self._run(field_class, field_steps, buff, offset,
+                                          value if type(value) is field_class else None)
+                setattr(msg, name, value)
+        return msg, offset
+
+    def deserialize(self, buff, offset=0):
+        """
+        Decode the projected fields of a serialized message.
+
+        :param buff: serialized message, ``bytes`` or other buffer
+        :param offset: offset of the message in *buff*, ``int``
+        :returns: message with the projected fields set and default
+          values in the other fields, ``Message``
+        """
+        try:
+            return self._run(self.msg_class, self._steps, buff, offset)[0]
+        except struct.error as e:
+            raise DeserializationError(e)
+
+
+def get_projection(msg_class, fields):
+    """
+    Get a projection of a message class.
+
+    NOTE: this function maintains a local cache of results.
+    :param msg_class: message class, ``Message class``
+    :param fields: field paths to decode, ``[str]``
+    :returns: projection, ``Projection``
+    """
+    key = (msg_class, tuple(fields))
+    projection = _projection_cache.get(key)
+    if projection is None:
+        projection = _projection_cache[key] = Projection(msg_class, fields)
+    return projection
@@ -0,0 +1,330 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+Long-running server for Python message code generation.
+
+Most of the time to generate a single .msg or .srv file is spent
+starting the interpreter, importing genmsg and parsing dependencies.
+A server started with ``python -m genpy.server --socket PATH`` keeps
+genmsg imported and parsed dependencies loaded, and generates files on
+behalf of ``genmsg_py.py`` and ``gensrv_py.py``. The scripts use the
+server if the ``GENPY_SERVER_SOCKET`` environment variable names its
+socket, and generate in-process as before if no server is listening or
+the server does not answer within ``GENPY_SERVER_TIMEOUT`` seconds.
+
+The client side of this module only uses the standard library, and
+importing the :mod:`genpy` package does not import genmsg on Python
+3.7 or newer.
+"""
+
+from __future__ import print_function
+
+try:
+    from cStringIO import StringIO  # Python 2.x
+except ImportError:
+    from io import StringIO  # Python 3.x
+
+try:
+    import socketserver  # Python 3.x
+except ImportError:
+    import SocketServer as socketserver  # Python 2.x
+
+import json
+import os
+import socket
+import sys
+from optparse import OptionParser
+
+# environment variable with the path of the server socket
+SOCKET_ENV = 'GENPY_SERVER_SOCKET'
+
+# environment variable with the time in seconds to wait for the server
+TIMEOUT_ENV = 'GENPY_SERVER_TIMEOUT'
+
+# requests wait while the server handles the requests of other
+# clients, so the default is generous
+DEFAULT_TIMEOUT = 120.
+
+# clients send their request right after connecting, the server stops
+# waiting for clients that do not after this time in seconds
+REQUEST_TIMEOUT = 10.
+
+PROTOCOL_VERSION = 1
+
+
+def client_main(argv, progname, kind):
+    """
+    Generate code for a command line of ``genmsg_py.py`` or ``gensrv_py.py``.
+
+    Exits with the return code of the generation.
+
+    :param argv: command line arguments, ``[str]``
+    :param progname: name of the program, ``str``
+    :param kind: ``msg`` or ``srv``, ``str``
+    """
+    path = os.environ.get(SOCKET_ENV)
+    if path:
+        retcode = request(path, argv, progname, kind)
+        if retcode is not None:
+            sys.exit(retcode)
+    # no server, generate in-process
+    import genpy.generator
+    import genpy.genpy_main
+    genpy.genpy_main.genmain(argv, progname, _get_generator(kind))
+
+
+def request(path, argv, progname, kind, timeout=None):
+    """
+    Ask the server to generate code for a command line.
+
+    The output of the generation is written to stdout and stderr.
+
+    :param path: path of the server socket, ``str``
+    :param argv: command line arguments, ``[str]``
+    :param progname: name of the program, ``str``
+    :param kind: ``msg`` or ``srv``, ``str``
+    :param timeout: time in seconds to wait for the server, defaults to
+      ``$GENPY_SERVER_TIMEOUT`` or :data:`DEFAULT_TIMEOUT`, ``float``
+    :returns: return code, or ``None`` if no server handled the request
+      in time, ``int``
+    """
+    if timeout is None:
+        timeout = float(os.environ.get(TIMEOUT_ENV) or DEFAULT_TIMEOUT)
+    data = json.dumps({
+        'version': PROTOCOL_VERSION,
+        'argv': list(argv),
+        'progname': progname,
+        'kind': kind,
+        'cwd': os.getcwd(),
+    })
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    # the timeout applies to each operation, including the wait for
+    # the response
+    sock.settimeout(timeout)
+    try:
+        try:
+            sock.connect(path)
+        except socket.error:
+            return None
+        sock.sendall(data.encode('utf-8') + b'\n')
+        f = sock.makefile('rb')
+        try:
+            line = f.readline()
+        finally:
+            f.close()
+    except socket.timeout:
+        # the server hangs or is busy, generate in-process
+        return None
+    except socket.error:
+        return None
+    finally:
+        sock.close()
+    if not line:
+        # the server went away
+        return None
+    try:
+        response = json.loads(line.decode('utf-8'))
+        retcode, out, err = response['retcode'], response['stdout'], response['stderr']
+    except (ValueError, KeyError, TypeError):
+        # not a response of a compatible server
+        return None
+    sys.stdout.write(out)
+    sys.stderr.write(err)
+    return retcode
+
+
+def _get_generator(kind):
+    import genpy.generator
+    if kind == 'msg':
+        return genpy.generator.MsgGenerator()
+    elif kind == 'srv':
+        return genpy.generator.SrvGenerator()
+    raise ValueError('unknown kind of generator [%s]' % kind)
+
+
+def _snapshot(search_path):
+    """
+    Get the state of the message files in a search path.
+
+    :returns: path, modification time and size of the files, ``[(str, float, int)]``
+    """
+    state = []
+    for dirs in search_path.values():
+        for d in dirs:
+            try:
+                names = sorted(os.listdir(d))
+            except OSError:
+                continue
+            for name in names:
+                if name.endswith('.msg') or name.endswith('.srv'):
+                    path = os.path.join(d, name)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    state.append((path, st.st_mtime, st.st_size))
+    return state
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+
+    # requests are handled one at a time, a client that does not send
+    # its request must not block the others
+    timeout = REQUEST_TIMEOUT
+
+    def handle(self):
+        try:
+            line = self.rfile.readline()
+        except socket.timeout:
+            return
+        if not line:
+            return
+        try:
+            req = json.loads(line.decode('utf-8'))
+        except ValueError:
+            # not a request of a client of this module
+            return
+        if not isinstance(req, dict):
+            return
+        response = self.server.generate(req)
+        try:
+            self.wfile.write(json.dumps(response).encode('utf-8') + b'\n')
+        except socket.error:
+            # the client timed out and generated in-process
+            pass
+
+
+class GenerationServer(socketserver.UnixStreamServer):
+    """
+    Server that generates code for the requests of :func:`request`.
+
+    Requests are handled one at a time, since code generation uses
+    global state. Parsed dependencies are kept for each search path
+    and reused while the message files in the search path are
+    unchanged.
+    """
+
+    def __init__(self, path):
+        """
+        :param path: path of the socket to listen on, ``str``
+        """  # noqa: D205, D400
+        # only the user may connect. The socket is created with these
+        # permissions, so that it is never accessible to others.
+        umask = os.umask(0o177)
+        try:
+            socketserver.UnixStreamServer.__init__(self, path, _RequestHandler)
+        finally:
+            os.umask(umask)
+        self._contexts = {}
+
+    def get_msg_context(self, search_path):
+        """
+        Get the context to load message files into for a search path.
+
+        :param search_path: dictionary mapping message namespaces to a directory locations
+        :returns: context, ``MsgContext``
+        """
+        from genmsg import MsgContext
+        key = tuple(sorted((ns, tuple(dirs)) for ns, dirs in search_path.items()))
+        state = _snapshot(search_path)
+        entry = self._contexts.get(key)
+        if entry is None or entry[0] != state:
+            entry = self._contexts[key] = (state, MsgContext.create_default())
+        return entry[1]
+
+    def generate(self, req):
+        """
+        Generate code for a request.
+
+        :param req: request, ``dict``
+        :returns: response with the return code and output of the generation, ``dict``
+        """
+        if req.get('version') != PROTOCOL_VERSION:
+            # let the client generate in-process
+            return {'retcode': None, 'stdout': '', 'stderr': ''}
+        from .genpy_main import generate
+        stdout, stderr = sys.stdout, sys.stderr
+        cwd = os.getcwd()
+        sys.stdout, sys.stderr = StringIO(), StringIO()
+        try:
+            try:
+                os.chdir(req['cwd'])
+                retcode = generate(req['argv'], req['progname'], _get_generator(req['kind']), self.get_msg_context)
+            except SystemExit as e:
+                # from argument errors
+                if e.code is None or isinstance(e.code, int):
+                    retcode = e.code or 0
+                else:
+                    print(e.code, file=sys.stderr)
+                    retcode = 1
+            except Exception as e:
+                print('ERROR: ', e, file=sys.stderr)
+                retcode = 3
+            out, err = sys.stdout.getvalue(), sys.stderr.getvalue()
+        finally:
+            os.chdir(cwd)
+            sys.stdout, sys.stderr = stdout, stderr
+        return {'retcode': retcode, 'stdout': out, 'stderr': err}
+
+
+def main(argv=None):
+    parser = OptionParser('%prog [--socket PATH]')
+    parser.add_option('--socket', dest='socket', default=os.environ.get(SOCKET_ENV),
+                      help='path of the socket to listen on, defaults to $%s' % SOCKET_ENV)
+    options, _ = parser.parse_args(argv)
+    if not options.socket:
+        parser.error('please specify --socket or set %s' % SOCKET_ENV)
+    if os.path.exists(options.socket):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(options.socket)
+        except socket.error:
+            # left over from a server that did not shut down
+            os.remove(options.socket)
+        else:
+            parser.error('a server is already listening on %s' % options.socket)
+        finally:
+            sock.close()
+    server = GenerationServer(options.socket)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.remove(options.socket)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,257 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+On-disk cache of parsed .msg files.
+
+Every generator invocation loads the dependencies of the files it
+generates, and genmsg parses each dependency from its .msg file again,
+e.g. std_msgs/Header once per generated message of a workspace. A
+:class:`SpecCache` stores the parsed :class:`genmsg.MsgSpec` of each
+.msg file in a directory shared by all generator processes. Before
+dependencies are loaded, :meth:`SpecCache.load_depends` registers the
+cached specs of the dependencies with the message context, so genmsg
+only parses files that are new or changed.
+
+Entries are keyed by the path of the .msg file and validated against
+its modification time and size, or, if those changed, the digest of
+its contents.
+"""
+
+import collections
+import hashlib
+import os
+import pickle
+import sys
+
+# version of the cache format, entries of other versions are ignored
+FORMAT_VERSION = 1
+
+_Entry = collections.namedtuple('_Entry', ['full_type', 'mtime', 'size', 'digest', 'spec'])
+
+
+def _file_digest(path):
+    with open(path, 'rb') as f:
+        return hashlib.md5(f.read()).hexdigest()
+
+
+def _all_specs(spec):
+    # the message specs of a .msg or .srv spec
+    if hasattr(spec, 'request'):
+        return [spec.request, spec.response]
+    return [spec]
+
+
+class SpecCache(object):
+    """Cache of parsed .msg files shared by generator processes."""
+
+    def __init__(self, path):
+        """
+        :param path: cache directory, ``str``
+        """  # noqa: D205, D400
+        self.path = path
+        # cached entries of each directory of .msg files, by file name
+        self._indexes = {}
+        self._dirty = set()
+        # files that are known to match their entries
+        self._valid = set()
+
+    def _index_path(self, msg_dir):
+        name = hashlib.md5(msg_dir.encode('utf-8')).hexdigest()
+        return os.path.join(self.path, name + '.pickle')
+
+    def _read_index(self, msg_dir):
+        try:
+            with open(self._index_path(msg_dir), 'rb') as f:
+                version, index = pickle.load(f)
+        except Exception:
+            # missing, corrupt or written by another Python version
+            return {}
+        if version != (FORMAT_VERSION, sys.version_info[0]):
+            return {}
+        return index
+
+    def _index(self, msg_dir):
+        index = self._indexes.get(msg_dir)
+        if index is None:
+            index = self._indexes[msg_dir] = self._read_index(msg_dir)
+        return index
+
+    def lookup(self, path, full_type):
+        """
+        Get the cached spec of a .msg file.
+
+        :param path: path of the .msg file, ``str``
+        :param full_type: message type, ``str``
+        :returns: spec, or ``None`` if the file is not cached or changed, ``MsgSpec``
+        """
+        path = os.path.abspath(path)
+        msg_dir, name = os.path.split(path)
+        index = self._index(msg_dir)
+        entry = index.get(name)
+        if entry is None or entry.full_type != full_type:
+            return None
+        if path not in self._valid:
+            try:
+                st = os.stat(path)
+                if (st.st_mtime, st.st_size) != (entry.mtime, entry.size):
+                    # the file was touched, compare its contents
+                    if _file_digest(path) != entry.digest:
+                        return None
+                    index[name] = entry._replace(mtime=st.st_mtime, size=st.st_size)
+                    self._dirty.add(msg_dir)
+            except (IOError, OSError):
+                return None
+            self._valid.add(path)
+        return entry.spec
+
+    def add(self, path, full_type, spec):
+        """
+        Add the spec of a .msg file to the cache.
+
+        :param path: path of the .msg file, ``str``
+        :param full_type: message type, ``str``
+        :param spec: spec parsed from the file, ``MsgSpec``
+        """
+        path = os.path.abspath(path)
+        if path in self._valid:
+            return
+        try:
+            st = os.stat(path)
+            digest = _file_digest(path)
+        except (IOError, OSError):
+            return
+        msg_dir, name = os.path.split(path)
+        self._index(msg_dir)[name] = _Entry(full_type, st.st_mtime, st.st_size, digest, spec)
+        self._dirty.add(msg_dir)
+        self._valid.add(path)
+
+    def load(self, msg_context, path, full_type):
+        """
+        Load a .msg file into a context, using the cache if possible.
+
+        :param msg_context: context to register the spec with, ``MsgContext``
+        :param path: path of the .msg file, ``str``
+        :param full_type: message type, ``str``
+        :returns: spec, ``MsgSpec``
+        """
+        spec = self.lookup(path, full_type)
+        if spec is None:
+            import genmsg.msg_loader
+            spec = genmsg.msg_loader.load_msg_from_file(msg_context, path, full_type)
+            self.add(path, full_type, spec)
+        else:
+            msg_context.register(full_type, spec)
+            msg_context.set_file(full_type, path)
+        return spec
+
+    def load_depends(self, msg_context, spec, search_path):
+        """
+        Register the cached specs of the dependencies of a spec.
+
+        Dependencies are resolved as in genmsg, and only the cache
+        entries of the packages they are in are read. Types that are
+        already registered are not changed. Dependencies that are not
+        cached are left to genmsg to parse.
+
+        :param msg_context: context to register the specs with, ``MsgContext``
+        :param spec: .msg or .srv spec, ``MsgSpec`` or ``SrvSpec``
+        :param search_path: dictionary mapping message namespaces to a directory locations
+        """
+        from genmsg.msgs import bare_msg_type, is_builtin, resolve_type
+        pending = _all_specs(spec)
+        while pending:
+            mspec = pending.pop()
+            for field_type in mspec.types:
+                full_type = resolve_type(bare_msg_type(field_type), mspec.package)
+                if is_builtin(full_type) or msg_context.is_registered(full_type):
+                    continue
+                package, name = full_type.split('/')
+                for msg_dir in search_path.get(package, []):
+                    # the first file hides the files of the same name
+                    # in later directories, as in genmsg
+                    path = os.path.join(msg_dir, name + '.msg')
+                    if os.path.isfile(path):
+                        dep_spec = self.lookup(path, full_type)
+                        if dep_spec is not None:
+                            msg_context.register(full_type, dep_spec)
+                            msg_context.set_file(full_type, os.path.abspath(path))
+                            pending.append(dep_spec)
+                        break
+
+    def record(self, msg_context, spec):
+        """
+        Add the dependencies of a loaded spec that were parsed from files to the cache.
+
+        :param msg_context: context the dependencies were loaded into, ``MsgContext``
+        :param spec: .msg or .srv spec, ``MsgSpec`` or ``SrvSpec``
+        """
+        for mspec in _all_specs(spec):
+            for full_type in msg_context.get_all_depends(mspec.full_name):
+                path = msg_context.get_file(full_type)
+                if path is not None and path.endswith('.msg'):
+                    self.add(path, full_type, msg_context.get_registered(full_type))
+
+    def save(self):
+        """Write the changed entries to the cache directory."""
+        if not self._dirty:
+            return
+        try:
+            os.makedirs(self.path)
+        except OSError:
+            if not os.path.isdir(self.path):
+                return
+        for msg_dir in self._dirty:
+            # merge with the entries other processes wrote meanwhile
+            index = self._read_index(msg_dir)
+            index.update(self._indexes[msg_dir])
+            path = self._index_path(msg_dir)
+            tmp_path = '%s.%d.tmp' % (path, os.getpid())
+            try:
+                with open(tmp_path, 'wb') as f:
+                    pickle.dump(((FORMAT_VERSION, sys.version_info[0]), index), f, pickle.HIGHEST_PROTOCOL)
+                # os.rename does not replace existing files on Windows
+                getattr(os, 'replace', os.rename)(tmp_path, path)
+            except (IOError, OSError):
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+        self._dirty.clear()
+
+    def __getstate__(self):
+        # only the location is sent to other processes
+        return {'path': self.path}
+
+    def __setstate__(self, state):
+        self.__init__(state['path'])
@@ -0,0 +1,253 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Timestamp index and merging of serialized stamped messages.
+
+Messages whose first field is a Header (``_has_header``) carry
+``header.stamp`` at a fixed offset, right after the uint32 ``seq``.
+The functions in this module read the stamps of a stream of
+length-framed messages, as sent by ROS transports, without decoding
+the message bodies, and :class:`StampIndex` provides time-window and
+nearest-stamp lookups on the result. :func:`merge_stamped` merges
+several streams into one stream ordered by stamp.
+
+NumPy is required for :func:`scan_stamps`, :func:`scan_stamps_file`
+and :class:`StampIndex`.
+"""
+
+import heapq
+import mmap
+import numbers
+import struct
+
+from .message import DeserializationError
+from .message import get_raw_message_class
+
+_length_struct = struct.Struct('<I')
+_stamp_struct = struct.Struct('<II')
+
+# offset of header.stamp in the serialized message (after uint32 seq)
+STAMP_OFFSET = 4
+
+
+def scan_stamps(buff, offset=0, end=None):
+    """
+    Read the header stamps of a stream of length-framed messages.
+
+    Each message in the stream is preceded by its uint32 length. A
+    truncated message at the end of the stream, e.g. one that is
+    still being written, is ignored.
+
+    :param buff: serialized messages, ``bytes`` or other buffer
+    :param offset: offset of the first length prefix in *buff*, ``int``
+    :param end: offset of the end of the stream, defaults to the end of *buff*, ``int``
+    :returns: offsets of the length prefixes of the messages, stamp
+      seconds and stamp nanoseconds, ``(numpy.ndarray, numpy.ndarray, numpy.ndarray)``
+    :raises: :exc:`DeserializationError` If a message is too short to contain a Header
+    """
+    import numpy
+    if end is None:
+        end = len(buff)
+    offsets = []
+    stamps = []
+    unpack_length = _length_struct.unpack_from
+    unpack_stamp = _stamp_struct.unpack_from
+    min_length = STAMP_OFFSET + _stamp_struct.size
+    while offset + 4 <= end:
+        (length,) = unpack_length(buff, offset)
+        if offset + 4 + length > end:
+            break
+        if length < min_length:
+            raise DeserializationError('message at offset %d is too short to contain a Header' % offset)
+        offsets.append(offset)
+        stamps.extend(unpack_stamp(buff, offset + 4 + STAMP_OFFSET))
+        offset += 4 + length
+    stamps = numpy.array(stamps, dtype=numpy.uint32).reshape(-1, 2)
+    return numpy.array(offsets, dtype=numpy.uint64), stamps[:, 0].copy(), stamps[:, 1].copy()
+
+
+def scan_stamps_file(path, offset=0, end=None):
+    """
+    Read the header stamps of a file of length-framed messages.
+
+    The file is memory-mapped, so only the pages containing length
+    prefixes and stamps are read.
+
+    :param path: path of the file, ``str``
+    :param offset: offset of the first length prefix in the file, ``int``
+    :param end: offset of the end of the stream, defaults to the end of the file, ``int``
+    :returns: see :func:`scan_stamps`
+    """
+    import numpy
+    with open(path, 'rb') as f:
+        try:
+            buff = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # empty file
+            return scan_stamps(b'')
+        try:
+            return scan_stamps(buff, offset, end)
+        finally:
+            buff.close()
+
+
+def _to_nsec(t):
+    return t if isinstance(t, numbers.Integral) else t.to_nsec()
+
+
+class StampIndex(object):
+    """
+    Stamps of a stream of messages, sorted for time lookups.
+
+    Lookups return positions of messages in the stream, which can be
+    mapped to buffer offsets with :attr:`offsets`. Stamps may be
+    given as ``Time`` or as integer nanoseconds.
+    """
+
+    def __init__(self, offsets, secs, nsecs):
+        """
+        Create an index from the result of :func:`scan_stamps`.
+
+        :param offsets: offsets of the messages, ``numpy.ndarray``
+        :param secs: stamp seconds, ``numpy.ndarray``
+        :param nsecs: stamp nanoseconds, ``numpy.ndarray``
+        """
+        import numpy
+        self.offsets = offsets
+        self.stamps = secs.astype(numpy.int64) * 1000000000 + nsecs
+        # stable sort keeps messages with equal stamps in stream order
+        self._order = numpy.argsort(self.stamps, kind='mergesort')
+        self._sorted = self.stamps[self._order]
+
+    @classmethod
+    def from_buffer(cls, buff, offset=0, end=None):
+        """Create an index of a buffer of length-framed messages, see :func:`scan_stamps`."""
+        return cls(*scan_stamps(buff, offset, end))
+
+    @classmethod
+    def from_file(cls, path, offset=0, end=None):
+        """Create an index of a file of length-framed messages, see :func:`scan_stamps_file`."""
+        return cls(*scan_stamps_file(path, offset, end))
+
+    def __len__(self):
+        return len(self.stamps)
+
+    def window(self, start=None, end=None):
+        """
+        Get the messages with stamps in a time window.
+
+        :param start: first stamp to include, or ``None`` for no lower bound, ``Time``
+        :param end: first stamp to exclude, or ``None`` for no upper bound, ``Time``
+        :returns: positions of the messages in stream order, ``numpy.ndarray``
+        """
+        import numpy
+        lo = 0 if start is None else numpy.searchsorted(self._sorted, _to_nsec(start), 'left')
+        hi = len(self._sorted) if end is None else numpy.searchsorted(self._sorted, _to_nsec(end), 'left')
+        return numpy.sort(self._order[lo:hi])
+
+    def nearest(self, stamp):
+        """
+        Get the message with the stamp closest to *stamp*.
+
+        :param stamp: stamp to look up, ``Time``
+        :returns: position of the message in the stream, or ``None`` if the index is empty, ``int``
+        """
+        import numpy
+        if not len(self._sorted):
+            return None
+        t = _to_nsec(stamp)
+        i = int(numpy.searchsorted(self._sorted, t, 'left'))
+        if i == len(self._sorted) or (i > 0 and t - self._sorted[i - 1] <= self._sorted[i] - t):
+            i -= 1
+        return int(self._order[i])
+
+
+def iter_frames(buff, offset=0, end=None):
+    """
+    Iterate over the messages of a stream of length-framed messages.
+
+    A truncated message at the end of the stream is ignored.
+
+    :param buff: serialized messages, ``bytes`` or other buffer
+    :param offset: offset of the first length prefix in *buff*, ``int``
+    :param end: offset of the end of the stream, defaults to the end of *buff*, ``int``
+    :returns: iterator of serialized messages, ``iter(bytes)``
+    """
+    if end is None:
+        end = len(buff)
+    unpack_length = _length_struct.unpack_from
+    while offset + 4 <= end:
+        (length,) = unpack_length(buff, offset)
+        start = offset + 4
+        offset = start + length
+        if offset > end:
+            break
+        yield buff[start:offset]
+
+
+def _keyed(index, source):
+    unpack_stamp = _stamp_struct.unpack_from
+    # the per-source counter keeps equal stamps in source order and
+    # prevents heapq.merge from ever comparing the data
+    for n, data in enumerate(source):
+        try:
+            secs, nsecs = unpack_stamp(data, STAMP_OFFSET)
+        except struct.error:
+            raise DeserializationError('message %d of source %d is too short to contain a Header' % (n, index))
+        yield secs, nsecs, index, n, data
+
+
+def merge_stamped(sources, classes=None):
+    """
+    Merge streams of serialized stamped messages in stamp order.
+
+    Each source must be ordered by stamp. The stamps are read from the
+    serialized headers, so no message is decoded. If *classes* are
+    given, messages are returned as :class:`genpy.RawMessage` instances
+    that are only decoded when their ``message()`` method is called.
+
+    :param sources: serialized messages with a Header of each source,
+      ordered by stamp, ``[iter(bytes)]``
+    :param classes: message class of each source, ``[Message class]``
+    :returns: iterator of stamp seconds, stamp nanoseconds, index of
+      the source and serialized message (or ``RawMessage`` if *classes*
+      are given), ``iter((int, int, int, bytes))``
+    """
+    merged = heapq.merge(*[_keyed(i, source) for i, source in enumerate(sources)])
+    if classes is None:
+        for secs, nsecs, index, _, data in merged:
+            yield secs, nsecs, index, data
+    else:
+        raw_classes = [get_raw_message_class(cls) for cls in classes]
+        for secs, nsecs, index, _, data in merged:
+            yield secs, nsecs, index, raw_classes[index](data)
@@ -0,0 +1,234 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+Dynamic message definitions shared by the tests.
+
+The test messages in test/msg cannot embed std_msgs/Header, so tests
+of features that work on serialized layouts generate the classes from
+the full definitions below. Every type name is defined exactly once.
+"""
+
+try:
+    from cStringIO import StringIO
+except ImportError:
+    from io import BytesIO as StringIO
+
+_SEPARATOR = '=' * 80 + '\n'
+
+_HEADER = """MSG: std_msgs/Header
+uint32 seq
+time stamp
+string frame_id
+"""
+
+_VEC3 = """MSG: gd_msgs/Vec3
+float64 x
+float64 y
+float64 z
+"""
+
+_POINT = """MSG: gd_msgs/Point
+string label
+float32 x
+float32 y
+"""
+
+_POSE = """MSG: gd_msgs/Pose
+gd_msgs/Vec3 position
+gd_msgs/Vec3 orientation
+"""
+
+_MARKER = """MSG: gd_msgs/Marker
+string text
+float32[] points
+"""
+
+
+def _definition(text, *dependencies):
+    return text + ''.join(_SEPARATOR + d for d in dependencies)
+
+
+DEFINITIONS = {
+    # only fixed-size fields
+    'gd_msgs/Sample': _definition("""time stamp
+gd_msgs/Vec3 position
+gd_msgs/Vec3[2] corners
+bool valid
+uint8[4] tag
+float32[3] weights
+""", _VEC3),
+    # variable-length fields before and between fixed-size fields
+    'gd_msgs/Track': _definition("""Header header
+string name
+gd_msgs/Point[] points
+float64[2] scale
+uint8[3] color
+duration age
+""", _HEADER, _POINT),
+    # scalar fields after a Header
+    'gd_msgs/Detection': _definition("""Header header
+string name
+bool valid
+int16 count
+duration age
+""", _HEADER),
+    # nested messages, a fixed and a variable-length array
+    'gd_msgs/Odometry': _definition("""Header header
+string child_frame_id
+gd_msgs/Pose pose
+float64[36] covariance
+uint8[] data
+bool valid
+int16 count
+""", _HEADER, _POSE, _VEC3),
+    # arrays of messages and strings
+    'gd_msgs/Markers': _definition("""string name
+gd_msgs/Marker[] markers
+string[] labels
+float64[2] scale
+""", _MARKER),
+    # one field of each column kind
+    'gd_msgs/Odom': _definition("""Header header
+gd_msgs/Vec3 position
+float64[3] scale
+int32[] ids
+string label
+bool valid
+""", _HEADER, _VEC3),
+    # array columns of primitives, messages and strings
+    'gd_msgs/Path': _definition("""Header header
+gd_msgs/Vec3 position
+float32[2] scale
+int32[] ids
+gd_msgs/Vec3[] points
+string[] labels
+bool valid
+""", _HEADER, _VEC3),
+    'gd_msgs/Stamped': _definition("""Header header
+int32 value
+""", _HEADER),
+}
+
+
+def get_classes(type_):
+    """
+    Generate the classes of a type in :data:`DEFINITIONS`.
+
+    :returns: classes of *type_* and its dependencies by type, ``dict``
+    """
+    from genpy.dynamic import generate_dynamic
+    return generate_dynamic(type_, DEFINITIONS[type_])
+
+
+def serialize(msg):
+    buff = StringIO()
+    msg.serialize(buff)
+    return buff.getvalue()
+
+
+def get_sample():
+    import genpy
+    msgs = get_classes('gd_msgs/Sample')
+    vec3 = msgs['gd_msgs/Vec3']
+    msg = msgs['gd_msgs/Sample'](
+        stamp=genpy.Time(10, 20), position=vec3(1., 2., 3.),
+        corners=[vec3(4., 5., 6.), vec3(7., 8., 9.)], valid=True,
+        tag=b'abcd', weights=[.5, 1.5, 2.])
+    return msgs, msg
+
+
+def get_track():
+    import genpy
+    msgs = get_classes('gd_msgs/Track')
+    point = msgs['gd_msgs/Point']
+    msg = msgs['gd_msgs/Track'](
+        name='track', points=[point('a', 1., 2.), point('bcd', 3., 4.)],
+        scale=[1., 2.], color=b'rgb', age=genpy.Duration(-1, 5))
+    msg.header.seq = 7
+    msg.header.stamp = genpy.Time(10, 20)
+    msg.header.frame_id = 'map'
+    return msgs, msg
+
+
+def get_odometry():
+    import genpy
+    msgs = get_classes('gd_msgs/Odometry')
+    vec3 = msgs['gd_msgs/Vec3']
+    msg = msgs['gd_msgs/Odometry'](
+        child_frame_id='base', covariance=[float(i) for i in range(36)],
+        data=b'\x01\x02\x03', valid=True, count=-3)
+    msg.header.stamp = genpy.Time(10, 20)
+    msg.header.frame_id = 'map'
+    msg.pose.position = vec3(1., 2., 3.)
+    msg.pose.orientation = vec3(4., 5., 6.)
+    return msgs, msg
+
+
+def get_markers():
+    msgs = get_classes('gd_msgs/Markers')
+    marker = msgs['gd_msgs/Marker']
+    msg = msgs['gd_msgs/Markers'](
+        name='markers', markers=[marker('m%d' % i, [float(j) for j in range(i)]) for i in range(10)],
+        labels=['a', 'bb', 'ccc'], scale=[1., 2.])
+    return msgs, msg
+
+
+def get_odoms(count=4):
+    import genpy
+    msgs = get_classes('gd_msgs/Odom')
+    vec3 = msgs['gd_msgs/Vec3']
+    messages = []
+    for i in range(count):
+        msg = msgs['gd_msgs/Odom'](
+            position=vec3(i, 2. * i, 3. * i), scale=[1., 2., float(i)], ids=list(range(i)),
+            label='m%d' % i, valid=bool(i % 2))
+        msg.header.stamp = genpy.Time(i, 5)
+        messages.append(msg)
+    return msgs, messages
+
+
+def get_paths(count=4):
+    import genpy
+    msgs = get_classes('gd_msgs/Path')
+    vec3 = msgs['gd_msgs/Vec3']
+    messages = []
+    for i in range(count):
+        msg = msgs['gd_msgs/Path'](
+            position=vec3(i, 2. * i, 3. * i), scale=[1., float(i)], ids=list(range(i)),
+            points=[vec3(j, j, j) for j in range(i % 3)], labels=['a'] * i, valid=bool(i % 2))
+        msg.header.seq = i
+        msg.header.stamp = genpy.Time(100 + i, 5)
+        msg.header.frame_id = 'frame%d' % i
+        messages.append(msg)
+    return msgs, messages
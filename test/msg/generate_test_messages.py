@@ -23,19 +23,17 @@ def generate_test_messages(msg_files):
         for msg_file in msg_files:
             h.write('from ._%s import *\n' % msg_file[:-4])
 
-    for msg_file in msg_files:
-        argv = [
-            'genmsg_py.py',
-            '-p', 'genpy',
-            '-Igenpy:%s/test/msg' % pkg_path,
-            '-o', '%s/src/genpy/msg' % pkg_path,
-            '%s/test/msg/%s' % (pkg_path, msg_file),
-        ]
-        try:
-            genmain(argv, 'genmsg_py.py', MsgGenerator())
-        except SystemExit as e:
-            if e.code:
-                raise
+    argv = [
+        'genmsg_py.py',
+        '-p', 'genpy',
+        '-Igenpy:%s/test/msg' % pkg_path,
+        '-o', '%s/src/genpy/msg' % pkg_path,
+    ] + ['%s/test/msg/%s' % (pkg_path, msg_file) for msg_file in msg_files]
+    try:
+        genmain(argv, 'genmsg_py.py', MsgGenerator())
+    except SystemExit as e:
+        if e.code:
+            raise
 
 
 if __name__ == '__main__':
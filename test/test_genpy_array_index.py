@@ -0,0 +1,81 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+from .dynamic_msgs import get_markers
+from .dynamic_msgs import serialize
+
+
+def test_array_index():
+    msgs, msg = get_markers()
+    data = serialize(msg)
+    markers = msgs['gd_msgs/Markers']
+    index = markers.array_index(data, 'markers')
+    assert 10 == len(index)
+    assert msgs['gd_msgs/Marker'] is index.element_class()
+    assert msg.markers[3] == index[3]
+    assert msg.markers[-1] == index[-1]
+    assert msg.markers[2:8:2] == index[2:8:2]
+    assert msg.markers == list(index)
+
+    assert serialize(msg.markers[5]) == index.raw(5)
+    start, end = index.offset(5)
+    assert serialize(msg.markers[5]) == data[start:end]
+
+    assert msg.labels == list(markers.array_index(data, 'labels'))
+    scale = markers.array_index(data, 'scale')
+    assert index.element_class() is not None
+    assert scale.element_class() is None
+    assert 2. == scale[1]
+
+
+def test_array_index_invalid():
+    import genpy
+    msgs, msg = get_markers()
+    data = serialize(msg)
+    markers = msgs['gd_msgs/Markers']
+    for path in ['name', 'missing']:
+        try:
+            markers.array_index(data, path)
+            assert False, 'should have raised for %s' % path
+        except genpy.MessageException:
+            pass
+    try:
+        markers.array_index(data[:40], 'markers')
+        assert False, 'should have raised'
+    except genpy.DeserializationError:
+        pass
+    index = markers.array_index(data, 'markers')
+    try:
+        index[10]
+        assert False, 'should have raised'
+    except IndexError:
+        pass
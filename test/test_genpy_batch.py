@@ -0,0 +1,103 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import struct
+
+from .dynamic_msgs import get_paths
+from .dynamic_msgs import serialize
+
+
+def _serialize(messages, framed=False):
+    data = b''
+    for msg in messages:
+        if framed:
+            data += struct.pack('<I', len(serialize(msg)))
+        data += serialize(msg)
+    return data
+
+
+def test_batch_decoder():
+    from genpy.batch import get_batch_decoder
+    msgs, messages = get_paths()
+    decoder = get_batch_decoder(msgs['gd_msgs/Path'])
+    assert decoder is get_batch_decoder(msgs['gd_msgs/Path'])
+    assert ['labels'] == decoder.skipped
+
+    columns = decoder.decode(_serialize(messages))
+    assert [0, 1, 2, 3] == columns['header.seq'].tolist()
+    assert [100, 101, 102, 103] == columns['header.stamp.secs'].tolist()
+    assert [0., 2., 4., 6.] == columns['position.y'].tolist()
+    assert [[1., 0.], [1., 1.], [1., 2.], [1., 3.]] == columns['scale'].tolist()
+    assert [False, True, False, True] == columns['valid'].tolist()
+    assert 'labels' not in columns
+
+    frame_id = columns['header.frame_id']
+    assert b'frame2' == frame_id.values[frame_id.offsets[2]:frame_id.offsets[3]].tobytes()
+    ids = columns['ids']
+    assert [0, 0, 1, 3, 6] == ids.offsets.tolist()
+    assert [0, 1, 2] == ids.values[ids.offsets[3]:ids.offsets[4]].tolist()
+    points = columns['points']
+    assert [0, 0, 1, 3, 3] == points.offsets.tolist()
+    assert [0., 0., 1.] == points.values['x'].tolist()
+
+    framed = decoder.decode(_serialize(messages, framed=True), framed=True)
+    assert sorted(columns) == sorted(framed)
+    assert columns['position.z'].tolist() == framed['position.z'].tolist()
+    assert columns['ids'].values.tolist() == framed['ids'].values.tolist()
+    assert [0, 1] == decoder.decode(_serialize(messages), count=2)['header.seq'].tolist()
+
+
+def test_batch_decoder_fixed():
+    from genpy.batch import get_batch_decoder
+    msgs, messages = get_paths()
+    vec3 = msgs['gd_msgs/Vec3']
+    decoder = get_batch_decoder(vec3)
+    points = [vec3(i, -i, 2 * i) for i in range(10)]
+    columns = decoder.decode(_serialize(points))
+    assert [float(-i) for i in range(10)] == columns['y'].tolist()
+    columns = decoder.decode(_serialize(points, framed=True), framed=True)
+    assert [float(2 * i) for i in range(10)] == columns['z'].tolist()
+    assert 0 == len(decoder.decode(b'')['x'])
+
+
+def test_batch_decoder_invalid():
+    import genpy
+    from genpy.batch import get_batch_decoder
+    msgs, messages = get_paths()
+    decoder = get_batch_decoder(msgs['gd_msgs/Path'])
+    data = _serialize(messages)
+    for buff, framed in [(data[:-3], False), (b'\x01\x00\x00\x00' + data, True)]:
+        try:
+            decoder.decode(buff, framed=framed)
+            assert False, 'should have raised'
+        except genpy.DeserializationError:
+            pass
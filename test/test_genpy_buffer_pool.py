@@ -0,0 +1,119 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+try:
+    from cStringIO import StringIO
+except ImportError:
+    from io import BytesIO as StringIO
+
+
+def _serialize(msg):
+    buff = StringIO()
+    msg.serialize(buff)
+    return buff.getvalue()
+
+
+def test_buffer_pool_serialize():
+    from genpy.buffer_pool import BufferPool
+    from genpy.msg import TestString
+    pool = BufferPool()
+    for data in ['foo', 'x' * 1000, 'bar', 'x' * 1000]:
+        msg = TestString(data)
+        with pool.serialize(msg) as buff:
+            assert _serialize(msg) == buff.getvalue()
+            assert _serialize(msg) == buff.view().tobytes()
+        assert pool.size_hint(TestString._type) >= len(_serialize(msg))
+
+    stats = pool.stats()
+    assert 1 == stats['misses'], stats
+    assert 3 == stats['hits'], stats
+    # the first buffer had to grow for the long string
+    assert 1 == stats['resizes'], stats
+    assert 1 == stats['free'], stats
+
+
+def test_buffer_pool_acquire():
+    from genpy.buffer_pool import BufferPool
+    pool = BufferPool(max_buffers=2)
+    buffs = [pool.acquire(size) for size in (10, 5000, 100000)]
+    assert buffs[2].capacity() >= 100000
+    for buff in buffs:
+        buff.write(b'abc')
+        assert 3 == len(buff)
+        buff.release()
+    stats = pool.stats()
+    assert 3 == stats['misses'], stats
+    # only the largest buffers are kept
+    assert 2 == stats['free'], stats
+    buff = pool.acquire(10)
+    assert 0 == len(buff)
+    assert 5000 <= buff.capacity() < 100000
+    assert 1 == pool.stats()['hits']
+
+
+def test_buffer_pool_reuse():
+    from genpy.buffer_pool import BufferPool
+    from genpy.msg import TestString
+    pool = BufferPool()
+    msg = TestString('foo')
+    with pool.serialize(msg) as buff:
+        first = buff
+    # steady state: the same buffer object is handed out again
+    for _ in range(3):
+        with pool.serialize(msg) as buff:
+            assert first is buff
+            assert _serialize(msg) == buff.getvalue()
+    assert 3 == pool.stats()['hits']
+
+
+def test_serialize_pooled():
+    from genpy.buffer_pool import BufferPool
+    from genpy.buffer_pool import get_default_pool
+    from genpy.msg import TestString
+    msg = TestString('foo')
+    with msg.serialize_pooled() as buff:
+        assert _serialize(msg) == buff.getvalue()
+    assert get_default_pool().size_hint(TestString._type) > 0
+
+    pool = BufferPool()
+    with msg.serialize_pooled(pool) as buff:
+        assert _serialize(msg) == buff.getvalue()
+    assert 1 == pool.stats()['misses']
+
+    TestString._buffer_pool = pool
+    try:
+        with msg.serialize_pooled() as buff:
+            assert _serialize(msg) == buff.getvalue()
+        assert 1 == pool.stats()['hits']
+    finally:
+        TestString._buffer_pool = None
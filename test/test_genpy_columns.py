@@ -0,0 +1,88 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+from .dynamic_msgs import get_odoms
+
+
+def test_get_column_paths():
+    import genpy
+    from genpy.columns import get_column_paths
+    msgs, messages = get_odoms()
+    odom = msgs['gd_msgs/Odom']
+    paths = [p for p, _ in get_column_paths(odom)]
+    assert ['header.seq', 'header.stamp.secs', 'header.stamp.nsecs', 'header.frame_id',
+            'position.x', 'position.y', 'position.z', 'scale', 'ids', 'label', 'valid'] == paths
+    assert [('position.x', 'float64'), ('position.y', 'float64'), ('position.z', 'float64'), ('label', 'string')] == \
+        get_column_paths(odom, ['position', 'label'])
+    try:
+        get_column_paths(odom, ['position.w'])
+        assert False, 'should have raised'
+    except genpy.MessageException:
+        pass
+
+
+def test_to_columns():
+    import numpy
+    from genpy.columns import to_columns
+    msgs, messages = get_odoms()
+    odom = msgs['gd_msgs/Odom']
+    columns = to_columns(odom, messages)
+    assert numpy.float64 == columns['position.y'].dtype
+    assert [0., 2., 4., 6.] == columns['position.y'].tolist()
+    assert numpy.uint32 == columns['header.stamp.secs'].dtype
+    assert (4, 3) == columns['scale'].shape
+    assert [False, True, False, True] == columns['valid'].tolist()
+    assert object == columns['ids'].dtype
+    assert list(range(3)) == list(columns['ids'][3])
+    assert ['m0', 'm1', 'm2', 'm3'] == list(columns['label'])
+
+    columns = to_columns(odom, messages, ['header.stamp'])
+    assert ['header.stamp.nsecs', 'header.stamp.secs'] == sorted(columns)
+    assert 0 == len(to_columns(odom, [], ['position.x'])['position.x'])
+
+
+def test_from_columns():
+    import genpy
+    from genpy.columns import from_columns, to_columns
+    msgs, messages = get_odoms()
+    odom = msgs['gd_msgs/Odom']
+    assert messages == from_columns(odom, to_columns(odom, messages))
+
+    partial = from_columns(odom, to_columns(odom, messages, ['position']))
+    assert [m.position for m in messages] == [m.position for m in partial]
+    assert '' == partial[0].label
+    assert [] == from_columns(odom, {})
+    try:
+        from_columns(odom, {'position.w': [1.]})
+        assert False, 'should have raised'
+    except genpy.MessageException:
+        pass
@@ -0,0 +1,82 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+import ctypes
+
+from .dynamic_msgs import get_sample
+from .dynamic_msgs import serialize
+
+
+def test_get_ctypes_struct():
+    from genpy.cstruct import get_ctypes_struct
+    msgs, msg = get_sample()
+    data = serialize(msg)
+    struct_cls = get_ctypes_struct(msgs['gd_msgs/Sample'])
+    assert struct_cls is get_ctypes_struct(msgs['gd_msgs/Sample'])
+    assert len(data) == ctypes.sizeof(struct_cls)
+
+    struct = struct_cls.from_buffer_copy(data)
+    assert 10 == struct.stamp.secs
+    assert 2. == struct.position.y
+    assert 9. == struct.corners[1].z
+    assert msg == struct.to_message()
+    assert data == bytes(bytearray(struct_cls.from_message(msg)))
+
+
+def test_ctypes_struct_in_place():
+    from genpy.cstruct import get_ctypes_struct
+    msgs, msg = get_sample()
+    data = serialize(msg)
+    buff = bytearray(data)
+    struct = get_ctypes_struct(msgs['gd_msgs/Sample']).from_buffer(buff)
+    struct.position.x = 42.
+    msg2 = msgs['gd_msgs/Sample']().deserialize(bytes(buff))
+    assert 42. == msg2.position.x
+    assert msg.corners == msg2.corners
+
+
+def test_ctypes_struct_not_fixed():
+    import genpy
+    from genpy.cstruct import get_ctypes_struct, is_fixed_layout
+    from genpy.dynamic import generate_dynamic
+    msgs, msg = get_sample()
+    data = serialize(msg)
+    assert is_fixed_layout(msgs['gd_msgs/Sample'])
+    for text in ['string data\n', 'int32[] data\n']:
+        m_cls = generate_dynamic('gd_msgs/Variable', text)['gd_msgs/Variable']
+        assert not is_fixed_layout(m_cls)
+        try:
+            get_ctypes_struct(m_cls)
+            assert False, 'should have raised'
+        except genpy.MessageException:
+            pass
@@ -171,3 +171,206 @@ def test_serialize_exception():
         pass
     except Exception:
         assert False, 'This should have raised a genpy.SerializationError instead'
+
+
+def test_deserialize_raw_strings():
+    from genpy.dynamic import generate_dynamic
+    msgs = generate_dynamic('gd_msgs/RawString', 'string data\nstring[] names\n')
+    m_cls = msgs['gd_msgs/RawString']
+    buff = StringIO()
+    m_cls(data='foo', names=['a', 'bc']).serialize(buff)
+    serialized = buff.getvalue()
+
+    m_instance = m_cls().deserialize(serialized, raw_strings=True)
+    assert m_instance.data == b'foo'
+    assert m_instance.names == [b'a', b'bc']
+    # bytes values are written back without being re-encoded
+    buff = StringIO()
+    m_instance.serialize(buff)
+    assert serialized == buff.getvalue()
+
+    # the class-level default applies when no per-call value is given
+    m_cls._raw_strings = True
+    try:
+        assert m_cls().deserialize(serialized).data == b'foo'
+        assert m_cls().deserialize(serialized, raw_strings=False).data == 'foo'
+    finally:
+        m_cls._raw_strings = False
+
+
+def test_deserialize_borrowed_blob():
+    from genpy.dynamic import generate_dynamic
+    msgs = generate_dynamic('gd_msgs/Blob', 'uint8[] small\nuint8[] large\n')
+    m_cls = msgs['gd_msgs/Blob']
+    buff = StringIO()
+    m_cls(small=b'ab', large=b'x' * 100).serialize(buff)
+    serialized = buff.getvalue()
+
+    m_cls._blob_borrow_threshold = 10
+    try:
+        m_instance = m_cls().deserialize(serialized)
+    finally:
+        m_cls._blob_borrow_threshold = None
+    assert m_instance.small == b'ab'
+    assert isinstance(m_instance.large, memoryview)
+    assert m_instance.large.tobytes() == b'x' * 100
+    # borrowed views are written without conversion
+    buff = StringIO()
+    m_instance.serialize(buff)
+    assert serialized == buff.getvalue()
+
+    assert isinstance(m_cls().deserialize(serialized).large, bytes)
+
+
+def test_pickle_dynamic():
+    import pickle
+    from genpy.dynamic import generate_dynamic
+    msgs = generate_dynamic('gd_msgs/Stamped', """Header header
+int32 value
+================================================================================
+MSG: std_msgs/Header
+uint32 seq
+time stamp
+string frame_id
+""")
+    m_cls = msgs['gd_msgs/Stamped']
+    assert pickle.loads(pickle.dumps(m_cls)) is m_cls
+    assert pickle.loads(pickle.dumps(msgs['std_msgs/Header'])) is msgs['std_msgs/Header']
+
+    m_instances = [m_cls(value=i) for i in range(10)]
+    m_instances[3].header.frame_id = 'base'
+    data = pickle.dumps(m_instances)
+    # the message definition is only stored once
+    assert data.count(b'frame_id') == 1
+    assert m_instances == pickle.loads(data)
+
+
+def test_generate_dynamic_in_memory():
+    from genpy.dynamic import generate_dynamic
+    sys_path = list(sys.path)
+    modules = set(sys.modules)
+    msgs1 = generate_dynamic('gd_msgs/EasyString', 'string data\n')
+    msgs2 = generate_dynamic('gd_msgs/EasyString', 'string other\n')
+    assert sys_path == sys.path
+    assert modules == set(sys.modules)
+    # each definition gets its own module
+    assert msgs1['gd_msgs/EasyString'].__module__ != msgs2['gd_msgs/EasyString'].__module__
+
+
+def test_generate_dynamic_cache():
+    from genpy.dynamic import clear_cache, generate_dynamic
+    m_cls = generate_dynamic('gd_msgs/Cached', 'int32 value\n')['gd_msgs/Cached']
+    assert m_cls is generate_dynamic('gd_msgs/Cached', 'int32 value\n')['gd_msgs/Cached']
+    assert m_cls is not generate_dynamic('gd_msgs/Cached', 'int64 value\n')['gd_msgs/Cached']
+    assert m_cls is not generate_dynamic('gd_msgs/Other', 'int32 value\n')['gd_msgs/Other']
+    clear_cache()
+    assert m_cls is not generate_dynamic('gd_msgs/Cached', 'int32 value\n')['gd_msgs/Cached']
+
+
+def test_generate_dynamic_cache_size():
+    import pickle
+    from genpy import dynamic
+    definitions = [('gd_msgs/Sized%d' % i, 'int32 value\n') for i in range(3)]
+    try:
+        dynamic.set_cache_size(2)
+        classes = [dynamic.generate_dynamic(t, text)[t] for t, text in definitions]
+        # the first definition was evicted, but its class is still in use
+        assert classes[0] is dynamic.generate_dynamic(*definitions[0])['gd_msgs/Sized0']
+        msg = classes[0](1)
+        assert msg == pickle.loads(pickle.dumps(msg))
+        dynamic.set_cache_size(None)
+        for i in range(300):
+            dynamic.generate_dynamic('gd_msgs/Sized%d' % i, 'int32 value\n')
+        assert len(dynamic._class_cache) >= 300
+    finally:
+        dynamic.set_cache_size()
+
+
+def test_generate_dynamic_disk_cache():
+    import os
+    import shutil
+    import tempfile
+    from genpy import dynamic
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        dynamic.enable_disk_cache(tmp_dir)
+        dynamic.clear_cache()
+        m_cls = dynamic.generate_dynamic('gd_msgs/OnDisk', 'int32 value\nstring name\n')['gd_msgs/OnDisk']
+        assert len(os.listdir(tmp_dir)) == 1
+        dynamic.clear_cache()
+        m_cls2 = dynamic.generate_dynamic('gd_msgs/OnDisk', 'int32 value\nstring name\n')['gd_msgs/OnDisk']
+        assert m_cls is not m_cls2
+        assert m_cls._md5sum == m_cls2._md5sum
+        buff = StringIO()
+        m_cls(3, 'x').serialize(buff)
+        assert m_cls2(3, 'x') == m_cls2().deserialize(buff.getvalue())
+
+        # the cache directory is not scanned again while it is below its maximum size
+        evict = dynamic._evict
+        scans = []
+        dynamic._evict = lambda: scans.append(evict())
+        try:
+            dynamic.generate_dynamic('gd_msgs/OnDisk', 'int32 value\nstring other\n')
+            dynamic.generate_dynamic('gd_msgs/OnDisk', 'int32 value\nstring third\n')
+        finally:
+            dynamic._evict = evict
+        assert len(os.listdir(tmp_dir)) == 3
+        assert scans == []
+
+        # entries beyond the maximum size are evicted
+        dynamic.enable_disk_cache(tmp_dir, max_size=0)
+        dynamic.generate_dynamic('gd_msgs/OnDisk', 'int32 value\n')
+        assert os.listdir(tmp_dir) == []
+    finally:
+        dynamic.disable_disk_cache()
+        shutil.rmtree(tmp_dir)
+
+
+def test_generate_dynamic_batch():
+    from genpy.dynamic import generate_dynamic, generate_dynamic_batch
+    header = """
+================================================================================
+MSG: std_msgs/Header
+uint32 seq
+time stamp
+string frame_id
+"""
+    point_cat = 'Header header\ngd_msgs/Point p\n' + header + """
+================================================================================
+MSG: gd_msgs/Point
+int32 x
+"""
+    point3_cat = 'Header header\ngd_msgs/Point p\n' + header + """
+================================================================================
+MSG: gd_msgs/Point
+int32 x
+int32 y
+int32 z
+"""
+    results = generate_dynamic_batch([
+        ('gd_msgs/Batch1', point_cat), ('gd_msgs/Batch2', point3_cat), ('gd_msgs/Batch1', point_cat)])
+    assert 3 == len(results)
+    assert results[0] == results[2]
+    # dependencies with the same definition are shared
+    assert results[0]['std_msgs/Header'] is results[1]['std_msgs/Header']
+    # dependencies with different definitions are not
+    assert results[0]['gd_msgs/Point'] is not results[1]['gd_msgs/Point']
+    assert ['x'] == results[0]['gd_msgs/Point'].__slots__
+    assert ['x', 'y', 'z'] == results[1]['gd_msgs/Point'].__slots__
+
+    m_cls = results[1]['gd_msgs/Batch2']
+    m_instance = m_cls(p=results[1]['gd_msgs/Point'](1, 2, 3))
+    m_instance.header.frame_id = 'base'
+    buff = StringIO()
+    m_instance.serialize(buff)
+    assert m_instance == m_cls().deserialize(buff.getvalue())
+
+    # field types resolve to the classes of the same definition
+    from genpy.layout import get_field_class, message_size
+    assert results[1]['gd_msgs/Point'] is get_field_class(m_cls, 'gd_msgs/Point')
+    assert 12 == message_size(get_field_class(m_cls, 'gd_msgs/Point'))
+    assert 4 == message_size(get_field_class(results[0]['gd_msgs/Batch1'], 'gd_msgs/Point'))
+    assert m_instance.p == m_cls.project(buff.getvalue(), ['p']).p
+
+    # results are cached
+    assert m_cls is generate_dynamic('gd_msgs/Batch2', point3_cat)['gd_msgs/Batch2']
@@ -0,0 +1,103 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+from .dynamic_msgs import get_classes
+from .dynamic_msgs import serialize
+
+
+def _get_buffers():
+    import genpy
+    msg_cls = get_classes('gd_msgs/Detection')['gd_msgs/Detection']
+    msgs = []
+    buffers = []
+    for secs, frame_id, name, valid, count in [
+            (15, 'map', 'a', True, 3),
+            (5, 'map', 'a', True, 3),
+            (15, 'odom', 'a', True, 3),
+            (15, 'map', 'a', False, 3),
+            (15, 'map', 'a', True, -3),
+            (15, 'map', 'x', True, 3),
+            (15, 'mapx', 'a', True, 3)]:
+        msg = msg_cls(name=name, valid=valid, count=count, age=genpy.Duration(secs))
+        msg.header.stamp = genpy.Time(secs)
+        msg.header.frame_id = frame_id
+        msgs.append(msg)
+        buffers.append(serialize(msg))
+    return msg_cls, msgs, buffers
+
+
+def test_compile_filter():
+    import genpy
+    from genpy.filters import compile_filter
+    msg_cls, msgs, buffers = _get_buffers()
+    accept = compile_filter(msg_cls, [
+        ('header.stamp', '>=', genpy.Time(10)),
+        ('header.stamp', '<', genpy.Time(20)),
+        ('header.frame_id', '==', 'map'),
+        ('count', '>', 0),
+        ('valid', '==', True),
+        ('name', '!=', 'x'),
+    ])
+    assert [True, False, False, False, False, False, False] == [accept(b) for b in buffers]
+
+    accept = compile_filter(msg_cls, [('age', '<', genpy.Duration(10))])
+    assert [False, True, False, False, False, False, False] == [accept(b) for b in buffers]
+    assert all(compile_filter(msg_cls, [])(b) for b in buffers)
+
+
+def test_compile_filter_invalid():
+    import genpy
+    from genpy.filters import compile_filter
+    msg_cls, msgs, buffers = _get_buffers()
+    for conditions in [
+            [('name', '<', 'a')],
+            [('header', '==', 1)],
+            [('header.stamp', '<', 3)],
+            [('missing', '==', 1)],
+            [('count', '~', 1)]]:
+        try:
+            compile_filter(msg_cls, conditions)
+            assert False, 'should have raised for %s' % conditions
+        except genpy.MessageException:
+            pass
+    accept = compile_filter(msg_cls, [('count', '>', 0)])
+    try:
+        accept(buffers[0][:20])
+        assert False, 'should have raised'
+    except genpy.DeserializationError:
+        pass
+
+
+def test_filter_messages():
+    from genpy.filters import filter_messages
+    msg_cls, msgs, buffers = _get_buffers()
+    assert [msgs[2], msgs[6]] == list(filter_messages(msg_cls, buffers, [('header.frame_id', '!=', 'map')]))
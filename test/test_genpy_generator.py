@@ -281,6 +281,33 @@ def test_compute_constructor():
     assert 'fake_msgs.msg.ThreeNums()' == compute_constructor(msg_context, 'fake_msgs', 'ThreeNums')
 
 
+def test_name_strategy():
+    from genpy.generator import compute_constructor, compute_import, NameStrategy
+
+    class LocalNames(NameStrategy):
+
+        def reference(self, package, base_type):
+            return '_%s__%s' % (package, base_type)
+
+        def header_reference(self):
+            return '_std_msgs__Header'
+
+        def import_str(self, package):
+            return None
+
+    naming = LocalNames()
+    msg_context = MsgContext.create_default()
+    msg_context.register('fake_msgs/String', MsgSpec(['string'], ['data'], [], 'string data\n', 'fake_msgs/String'))
+    msg_context.register('fake_msgs/Stamped', MsgSpec(['Header', 'time'], ['header', 't'], [], 'Header header\ntime t\n', 'fake_msgs/Stamped'))
+
+    assert '_fake_msgs__String()' == compute_constructor(msg_context, 'fake_msgs', 'String', naming)
+    assert '_std_msgs__Header()' == compute_constructor(msg_context, 'fake_msgs', 'Header', naming)
+    assert 'genpy.Time()' == compute_constructor(msg_context, 'fake_msgs', 'time', naming)
+    assert [] == compute_import(msg_context, 'foo', 'fake_msgs/String', naming)
+    assert ['import genpy'] == compute_import(msg_context, 'foo', 'fake_msgs/Stamped', naming)
+    assert {'import fake_msgs.msg', 'import std_msgs.msg', 'import genpy'} == set(compute_import(msg_context, 'foo', 'fake_msgs/Stamped'))
+
+
 def test_len_serializer_generator():
     import genpy.generator
     # generator tests are mainly tripwires/coverage tests
@@ -310,7 +337,7 @@ def test_string_serializer_generator():
     g = genpy.generator.string_serializer_generator('foo', 'string', 'var_name', True)
     val = '\n'.join(g)
     assert """length = len(var_name)
-if python3 or type(var_name) == unicode:
+if type(var_name) != bytes and (python3 or type(var_name) == unicode):
   var_name = var_name.encode('utf-8')
   length = len(var_name)
 buff.write(struct.Struct('<I%ss'%length).pack(length, var_name))""" == val, val
@@ -322,7 +349,8 @@ buff.write(struct.Struct('<I%ss'%length).pack(length, var_name))""" == val, val
 if type(b_name) in [list, tuple]:
   buff.write(struct.Struct('<I%sB'%length).pack(length, *b_name))
 else:
-  buff.write(struct.Struct('<I%ss'%length).pack(length, b_name))""" == '\n'.join(g)
+  buff.write(_struct_I.pack(length))
+  buff.write(b_name)""" == '\n'.join(g)
 
     # Test Deserializers
     val = """start = end
@@ -330,8 +358,11 @@ end += 4
 (length,) = _struct_I.unpack(str[start:end])
 start = end
 end += length
-if python3:
-  var_name = str[start:end].decode('utf-8', 'rosmsg')
+if python3 and not raw_strings:
+  if interner is None:
+    var_name = str[start:end].decode('utf-8', 'rosmsg')
+  else:
+    var_name = interner.decode(str[start:end], 'var_name')
 else:
   var_name = str[start:end]"""
     # string serializer and array serializer are identical
@@ -528,3 +559,123 @@ def test_serialize_fn_generator():
     result = serialize_fn_generator(msg_context, object_array_spec, is_numpy)
     compare_file(array_d, 'object_varlen_ser_full.txt', result)
     reset_var()
+
+
+def test_generate_messages_jobs():
+    import shutil
+    import tempfile
+    from genpy.generator import MsgGenerator
+    from genpy.genpy_main import expand_files
+    msg_d = os.path.abspath(os.path.join(os.path.dirname(__file__), 'msg'))
+    msg_files = expand_files([msg_d], '.msg')
+    assert msg_files
+    assert all(f.endswith('.msg') for f in msg_files)
+
+    search_path = {'genpy': [msg_d]}
+    outdirs = [tempfile.mkdtemp(), tempfile.mkdtemp()]
+    try:
+        assert 0 == MsgGenerator().generate_messages('genpy', msg_files, outdirs[0], search_path)
+        assert 0 == MsgGenerator().generate_messages('genpy', msg_files, outdirs[1], search_path, jobs=3)
+        assert sorted(os.listdir(outdirs[0])) == sorted(os.listdir(outdirs[1]))
+        for name in os.listdir(outdirs[0]):
+            with open(os.path.join(outdirs[0], name)) as f1:
+                with open(os.path.join(outdirs[1], name)) as f2:
+                    assert f1.read() == f2.read()
+    finally:
+        for outdir in outdirs:
+            shutil.rmtree(outdir)
+
+
+def test_write_if_changed():
+    import shutil
+    import tempfile
+    from genpy.generator import write_if_changed
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(tmp_dir, 'out.py')
+        assert write_if_changed(path, 'a = 1\n')
+        assert not write_if_changed(path, 'a = 1\n')
+        assert write_if_changed(path, 'a = 2\n')
+        with open(path) as f:
+            assert 'a = 2\n' == f.read()
+        assert ['out.py'] == os.listdir(tmp_dir)
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+def test_generate_incremental():
+    import shutil
+    import tempfile
+    import genpy.generator
+    from genpy.generator import MsgGenerator, read_stamp
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        msg_d = os.path.join(tmp_dir, 'msg')
+        outdir = os.path.join(tmp_dir, 'out')
+        os.mkdir(msg_d)
+        with open(os.path.join(msg_d, 'Inner.msg'), 'w') as f:
+            f.write('int32 x\n')
+        with open(os.path.join(msg_d, 'Outer.msg'), 'w') as f:
+            f.write('Inner inner\n')
+        msg_files = [os.path.join(msg_d, 'Inner.msg'), os.path.join(msg_d, 'Outer.msg')]
+        search_path = {'inc_msgs': [msg_d]}
+        outfile = os.path.join(outdir, '_Outer.py')
+
+        assert 0 == MsgGenerator().generate_messages('inc_msgs', msg_files, outdir, search_path)
+        stamp = read_stamp(outfile)
+        assert stamp
+        os.utime(outfile, (1, 1))
+        # nothing changed, the file is not written
+        assert 0 == MsgGenerator().generate_messages('inc_msgs', msg_files, outdir, search_path)
+        assert 1 == os.stat(outfile).st_mtime
+        # a changed dependency changes the stamp
+        with open(os.path.join(msg_d, 'Inner.msg'), 'w') as f:
+            f.write('int64 x\n')
+        assert 0 == MsgGenerator().generate_messages('inc_msgs', msg_files, outdir, search_path)
+        assert stamp != read_stamp(outfile)
+        assert 1 != os.stat(outfile).st_mtime
+
+        # a new generator that produces the same code only updates the stamp
+        stamp = read_stamp(outfile)
+        os.utime(outfile, (1, 1))
+        fingerprint = genpy.generator._fingerprint
+        genpy.generator._fingerprint = 'other'
+        try:
+            assert 0 == MsgGenerator().generate_messages('inc_msgs', msg_files, outdir, search_path)
+        finally:
+            genpy.generator._fingerprint = fingerprint
+        assert stamp != read_stamp(outfile)
+        assert 1 == os.stat(outfile).st_mtime
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+def test_generate_stamp_dir():
+    import shutil
+    import tempfile
+    from genpy.generator import MsgGenerator, read_stamp
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        msg_d = os.path.join(tmp_dir, 'msg')
+        outdir = os.path.join(tmp_dir, 'out')
+        stamp_dir = os.path.join(tmp_dir, 'stamps')
+        os.mkdir(msg_d)
+        with open(os.path.join(msg_d, 'Inner.msg'), 'w') as f:
+            f.write('int32 x\n')
+        msg_files = [os.path.join(msg_d, 'Inner.msg')]
+        search_path = {'inc_msgs': [msg_d]}
+        outfile = os.path.join(outdir, '_Inner.py')
+
+        assert 0 == MsgGenerator().generate_messages('inc_msgs', msg_files, outdir, search_path,
+                                                     stamp_dir=stamp_dir)
+        # only the generated file is in the output directory
+        assert ['_Inner.py'] == os.listdir(outdir)
+        stamp_path = os.path.join(stamp_dir, 'inc_msgs', 'Inner.msg.stamp')
+        assert read_stamp(outfile, stamp_path)
+        assert read_stamp(outfile) is None
+        os.utime(outfile, (1, 1))
+        assert 0 == MsgGenerator().generate_messages('inc_msgs', msg_files, outdir, search_path,
+                                                     stamp_dir=stamp_dir)
+        assert 1 == os.stat(outfile).st_mtime
+    finally:
+        shutil.rmtree(tmp_dir)
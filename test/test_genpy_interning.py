@@ -0,0 +1,119 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+import sys
+import unittest
+
+try:
+    from cStringIO import StringIO
+except ImportError:
+    from io import BytesIO as StringIO
+
+
+@unittest.skipIf(sys.hexversion < 0x03000000, 'Python 3 only test')
+class StringInternerTest(unittest.TestCase):
+
+    def test_decode(self):
+        from genpy.interning import StringInterner
+        interner = StringInterner(max_entries=2, max_length=8)
+        a = interner.decode(b'frame_a')
+        self.assertEqual('frame_a', a)
+        self.assertTrue(a is interner.decode(b'frame_a'))
+        # long strings are not interned
+        self.assertEqual('long_frame_name', interner.decode(b'long_frame_name'))
+        self.assertEqual({'hits': 1, 'misses': 1, 'evictions': 0, 'entries': 1}, interner.stats())
+
+        interner.decode(b'frame_b')
+        interner.decode(b'frame_a')
+        # frame_b is the least recently used value
+        interner.decode(b'frame_c')
+        self.assertEqual(1, interner.stats()['evictions'])
+        self.assertTrue(a is interner.decode(b'frame_a'))
+
+        interner.clear()
+        self.assertEqual(0, interner.stats()['entries'])
+
+    def test_per_field(self):
+        from genpy.interning import StringInterner
+        interner = StringInterner(max_entries=1, per_field=True)
+        a = interner.decode(b'a', 'f1')
+        interner.decode(b'b', 'f2')
+        self.assertTrue(a is interner.decode(b'a', 'f1'))
+        self.assertEqual(0, interner.stats()['evictions'])
+        self.assertEqual(2, interner.stats()['entries'])
+
+    def test_deserialize(self):
+        from genpy.interning import StringInterner
+        from genpy.msg import TestMsgArray, TestString
+        buff = StringIO()
+        TestMsgArray(strings=[TestString('frame')] * 3, fixed_strings=[TestString('frame')]).serialize(buff)
+
+        TestMsgArray._string_interner = StringInterner()
+        try:
+            m = TestMsgArray().deserialize(buff.getvalue())
+        finally:
+            TestMsgArray._string_interner = None
+        self.assertEqual('frame', m.strings[0].data)
+        self.assertTrue(m.strings[0].data is m.strings[2].data)
+        self.assertTrue(m.strings[0].data is m.fixed_strings[0].data)
+
+    def test_deserialize_per_field(self):
+        from genpy.interning import StringInterner
+        from genpy.msg import TestString, TestStringFloat
+        interner = StringInterner(max_entries=1, per_field=True)
+        TestString._string_interner = TestStringFloat._string_interner = interner
+        try:
+            for msg in [TestString('a'), TestStringFloat('b', 1.0), TestString('a')]:
+                buff = StringIO()
+                msg.serialize(buff)
+                type(msg)().deserialize(buff.getvalue())
+        finally:
+            TestString._string_interner = TestStringFloat._string_interner = None
+        # the data fields of both types are cached separately
+        self.assertEqual({'hits': 1, 'misses': 2, 'evictions': 0, 'entries': 2}, interner.stats())
+
+    def test_deserialize_per_field_keys(self):
+        from genpy.interning import StringInterner
+        from genpy.msg import TestFillEmbedTime, TestString
+        interner = StringInterner(max_entries=1, per_field=True)
+        buff = StringIO()
+        TestFillEmbedTime(str_msg=TestString('a'), str_msg_array=[TestString('a')]).serialize(buff)
+        TestFillEmbedTime._string_interner = interner
+        try:
+            m = TestFillEmbedTime().deserialize(buff.getvalue())
+        finally:
+            TestFillEmbedTime._string_interner = None
+        # the embedded message and the array element share the key
+        # genpy/TestString.data
+        self.assertTrue(m.str_msg.data is m.str_msg_array[0].data)
+        self.assertEqual({'hits': 1, 'misses': 1, 'evictions': 0, 'entries': 1}, interner.stats())
@@ -0,0 +1,121 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+from .dynamic_msgs import get_track
+from .dynamic_msgs import serialize
+
+
+def _serialize(msg):
+    return bytearray(serialize(msg))
+
+
+def test_message_size():
+    from genpy.dynamic import generate_dynamic
+    from genpy.layout import message_size
+    msgs, msg = get_track()
+    vec3 = generate_dynamic('gd_msgs/Vec3', 'float64 x\nfloat64 y\nfloat64 z\n')['gd_msgs/Vec3']
+    assert 24 == message_size(vec3)
+    assert message_size(msgs['gd_msgs/Track']) is None
+    assert message_size(msgs['gd_msgs/Point']) is None
+
+
+def test_field_offset():
+    from genpy.layout import field_offset
+    msgs, msg = get_track()
+    buff = _serialize(msg)
+    track = msgs['gd_msgs/Track']
+    assert (msgs['std_msgs/Header'], 'uint32', 0) == field_offset(track, buff, 'header.seq')
+    assert 4 == field_offset(track, buff, 'header.stamp')[2]
+    # after header (4 + 8 + 4 + 3) and name (4 + 5)
+    assert 28 == field_offset(track, buff, 'points')[2]
+    # after the points array length and the first point (4 + 1 + 8)
+    assert 'float32' == field_offset(track, buff, 'points[1].x')[1]
+    assert 28 + 4 + 13 + 4 + 3 == field_offset(track, buff, 'points[1].x')[2]
+    # without a buffer, only constant offsets are known
+    assert 4 == field_offset(track, None, 'header.stamp')[2]
+    assert field_offset(track, None, 'points[1].x')[2] is None
+
+
+def test_compile_field_offset():
+    from genpy.layout import compile_field_offset
+    from genpy.layout import field_offset
+    msgs, msg = get_track()
+    buff = _serialize(msg)
+    track = msgs['gd_msgs/Track']
+    for path in ['header.seq', 'header.frame_id', 'name', 'points', 'points[0].x', 'points[1].x',
+                 'scale', 'color', 'age']:
+        cls, type_, locate = compile_field_offset(track, path)
+        assert field_offset(track, buff, path) == (cls, type_, locate(buff))
+
+
+def test_patch():
+    import genpy
+    msgs, msg = get_track()
+    track = msgs['gd_msgs/Track']
+    buff = _serialize(msg)
+
+    track.patch(buff, 'header.stamp', genpy.Time(11, 22))
+    track.patch(buff, 'header.seq', 8)
+    track.patch(buff, 'points[1].y', 5.)
+    track.patch(buff, 'scale', [3., 4.])
+    track.patch(buff, 'color', b'xyz')
+    track.patch(buff, 'age', genpy.Duration(2, 3))
+
+    msg.header.stamp = genpy.Time(11, 22)
+    msg.header.seq = 8
+    msg.points[1].y = 5.
+    msg.scale = [3., 4.]
+    msg.color = b'xyz'
+    msg.age = genpy.Duration(2, 3)
+    msg2 = track().deserialize(bytes(buff))
+    assert msg == msg2
+
+
+def test_patch_invalid():
+    import genpy
+    msgs, msg = get_track()
+    track = msgs['gd_msgs/Track']
+    buff = _serialize(msg)
+    for path, value in [
+        ('name', 'other'),
+        ('header.frame_id', 'other'),
+        ('missing', 1),
+        ('points[2].x', 1.),
+        ('header[0]', 1),
+        ('scale.x', 1.),
+        ('color', b'too long'),
+    ]:
+        try:
+            track.patch(buff, path, value)
+            assert False, 'should have raised for %s' % path
+        except genpy.MessageException:
+            pass
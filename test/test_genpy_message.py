@@ -780,3 +780,45 @@ foo " bar
             self.assertEqual(m.deserialize(buff).fixed_strings[0].data, 'A\ufffd\ufffdB')
             self.assertEqual(len(cm.output), 1)
             self.assertIn("Characters replaced when decoding message genpy/TestMsgArray (will print only once)", cm.output[0])
+
+    def test_RawMessage(self):
+        import pickle
+        from genpy.message import get_raw_message_class
+        from genpy.msg import TestString
+        try:
+            from cStringIO import StringIO
+        except ImportError:
+            from io import BytesIO as StringIO
+
+        buff = StringIO()
+        TestString('foo').serialize(buff)
+        data = buff.getvalue()
+
+        raw_cls = get_raw_message_class(TestString)
+        self.assertTrue(raw_cls is get_raw_message_class(TestString))
+        for attr in ['_type', '_md5sum', '_full_text', '_has_header']:
+            self.assertEqual(getattr(TestString, attr), getattr(raw_cls, attr))
+
+        m = raw_cls().deserialize(data)
+        self.assertTrue(isinstance(m, genpy.RawMessage))
+        buff = StringIO()
+        m.serialize(buff)
+        self.assertEqual(data, buff.getvalue())
+        # decoded lazily and cached
+        self.assertEqual(TestString('foo'), m.message())
+        self.assertTrue(m.message() is m.message())
+        self.assertEqual(m, pickle.loads(pickle.dumps(m)))
+
+        # a raw message can also wrap an already decoded message
+        m = raw_cls(message=TestString('foo'))
+        buff = StringIO()
+        m.serialize(buff)
+        self.assertEqual(data, buff.getvalue())
+
+        # class resolved by type name on first decode
+        raw_cls = get_raw_message_class(type_=TestString._type, md5sum=TestString._md5sum)
+        self.assertEqual('foo', raw_cls(data).message().data)
+        raw_cls = get_raw_message_class(type_=TestString._type, md5sum='0' * 32)
+        self.assertRaises(genpy.MessageException, raw_cls(data).message)
+        self.assertRaises(genpy.SerializationError, raw_cls().serialize, StringIO())
+        self.assertRaises(ValueError, get_raw_message_class)
@@ -0,0 +1,151 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import os
+import shutil
+import tempfile
+
+from .dynamic_msgs import get_classes
+
+
+def _write_log(path, stamps):
+    import genpy
+    from genpy.message_log import MessageLogWriter
+    msg_cls = get_classes('gd_msgs/Stamped')['gd_msgs/Stamped']
+    msgs = []
+    with MessageLogWriter(path) as writer:
+        for i, secs in enumerate(stamps):
+            msg = msg_cls(value=i)
+            msg.header.stamp = genpy.Time(secs, 5)
+            msg.header.frame_id = 'frame'
+            assert i == writer.write(msg)
+            msgs.append(msg)
+    return msg_cls, msgs
+
+
+def test_message_log():
+    import genpy
+    from genpy.message_log import MessageLogReader
+    d = tempfile.mkdtemp()
+    try:
+        path = os.path.join(d, 'test.log')
+        msg_cls, msgs = _write_log(path, [1, 2, 2, 3, 5])
+        with MessageLogReader(path, classes=[msg_cls]) as reader:
+            assert 5 == len(reader)
+            assert msg_cls is reader.get_message_class(0)
+            assert msgs[3] == reader.read(3)
+            assert genpy.Time(5, 5) == reader.stamp(4)
+            assert msgs == list(reader)
+            assert [1, 2] == reader.range(genpy.Time(2), genpy.Time(3))
+            assert [3, 4] == reader.range(genpy.Time(2, 6))
+            assert msgs[:2] == list(reader.read_range(end=genpy.Time(2, 6)))
+
+        # without classes, the type is generated from the stored definition
+        with MessageLogReader(path) as reader:
+            msg = reader.read(2)
+            assert msg_cls._md5sum == msg._md5sum
+            assert 2 == msg.value
+            assert 'frame' == msg.header.frame_id
+    finally:
+        shutil.rmtree(d)
+
+
+def test_message_log_unsorted():
+    import genpy
+    from genpy.message_log import MessageLogReader
+    d = tempfile.mkdtemp()
+    try:
+        path = os.path.join(d, 'test.log')
+        msg_cls, msgs = _write_log(path, [4, 1, 3, 2])
+        with MessageLogReader(path, classes=[msg_cls]) as reader:
+            assert [0, 2] == reader.range(genpy.Time(3))
+            assert [msgs[1], msgs[3]] == list(reader.read_range(end=genpy.Time(3)))
+    finally:
+        shutil.rmtree(d)
+
+
+def test_message_log_not_closed():
+    import genpy
+    from genpy.message_log import MessageLogReader
+    from genpy.message_log import MessageLogWriter
+    d = tempfile.mkdtemp()
+    try:
+        path = os.path.join(d, 'test.log')
+        msg_cls, msgs = _write_log(path, [1, 3, 2])
+        with open(path, 'rb') as f:
+            data = f.read()
+
+        # a writer that crashed after writing part of the fourth message
+        writer = MessageLogWriter(path)
+        for msg in msgs:
+            writer.write(msg)
+        writer.write(msgs[0])
+        writer._file.flush()
+        size = writer._file.tell()
+        writer._file.close()
+        with open(path, 'r+b') as f:
+            f.truncate(size - 3)
+        with MessageLogReader(path, classes=[msg_cls]) as reader:
+            assert 3 == len(reader)
+            assert msgs == list(reader)
+            assert [2] == reader.range(genpy.Time(2), genpy.Time(3))
+            with MessageLogReader(path) as reader2:
+                assert msg_cls._md5sum == reader2.read(0)._md5sum
+
+        # the rebuilt index matches the one written by close()
+        with open(path, 'wb') as f:
+            f.write(data)
+        with MessageLogReader(path, classes=[msg_cls]) as reader:
+            entries = [reader.entry(i) for i in range(3)]
+        with open(path, 'wb') as f:
+            f.write(data[:-27])
+        with MessageLogReader(path, classes=[msg_cls]) as reader:
+            assert entries == [reader.entry(i) for i in range(3)]
+    finally:
+        shutil.rmtree(d)
+
+
+def test_message_log_invalid():
+    import genpy
+    from genpy.message_log import MessageLogReader
+    d = tempfile.mkdtemp()
+    try:
+        path = os.path.join(d, 'test.log')
+        with open(path, 'wb') as f:
+            f.write(b'not a message log' * 4)
+        try:
+            MessageLogReader(path)
+            assert False, 'should have raised'
+        except genpy.MessageException:
+            pass
+    finally:
+        shutil.rmtree(d)
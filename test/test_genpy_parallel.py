@@ -0,0 +1,99 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import struct
+import sys
+import unittest
+
+try:
+    from cStringIO import StringIO
+except ImportError:
+    from io import BytesIO as StringIO
+
+
+def _serialize(msg):
+    buff = StringIO()
+    msg.serialize(buff)
+    return buff.getvalue()
+
+
+@unittest.skipIf(sys.version_info < (3, 8), 'requires shared memory support')
+class ParallelTest(unittest.TestCase):
+
+    def test_deserialize(self):
+        from genpy.msg import TestStringFloat
+        from genpy.parallel import deserialize
+        msgs = [TestStringFloat('data%d' % i, float(i)) for i in range(100)]
+        data = [_serialize(m) for m in msgs]
+        self.assertEqual(msgs, deserialize(TestStringFloat, data, workers=2, chunks=7))
+
+        stream = b''.join(struct.pack('<I', len(d)) + d for d in data[:3])
+        self.assertEqual(msgs[:3], deserialize(TestStringFloat, stream, workers=2))
+        self.assertEqual([], deserialize(TestStringFloat, [], workers=2))
+
+    def test_executor(self):
+        from concurrent.futures import ProcessPoolExecutor
+        from genpy.msg import TestStringFloat
+        from genpy.parallel import deserialize
+        msgs = [TestStringFloat('data%d' % i, float(i)) for i in range(10)]
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            self.assertEqual(msgs, deserialize(TestStringFloat, [_serialize(m) for m in msgs],
+                                               workers=2, executor=executor))
+
+    def test_deserialize_dynamic(self):
+        from genpy.dynamic import generate_dynamic
+        from genpy.parallel import deserialize
+        msg_class = generate_dynamic('gd_msgs/Value', 'int32 value\n')['gd_msgs/Value']
+        msgs = [msg_class(i) for i in range(20)]
+        self.assertEqual(msgs, deserialize(msg_class, [_serialize(m) for m in msgs], workers=2))
+
+    def test_decode_columns(self):
+        from genpy.dynamic import generate_dynamic
+        from genpy.parallel import decode_columns
+        msg_class = generate_dynamic('gd_msgs/Sample', 'string name\nfloat64 value\nint32[] ids\n')['gd_msgs/Sample']
+        data = [_serialize(msg_class('n%d' % i, float(i), list(range(i % 3)))) for i in range(50)]
+        columns = decode_columns(msg_class, data, workers=2, chunks=5)
+        self.assertEqual([float(i) for i in range(50)], columns['value'].tolist())
+        name = columns['name']
+        self.assertEqual(b'n49', name.values[name.offsets[49]:name.offsets[50]].tobytes())
+        ids = columns['ids']
+        self.assertEqual(51, len(ids.offsets))
+        self.assertEqual([0, 1], ids.values[ids.offsets[5]:ids.offsets[6]].tolist())
+        self.assertEqual(0, len(decode_columns(msg_class, [], workers=2)['value']))
+
+    def test_invalid_stream(self):
+        import genpy
+        from genpy.msg import TestStringFloat
+        from genpy.parallel import deserialize
+        data = _serialize(TestStringFloat('data', 1.))
+        self.assertRaises(genpy.MessageException, deserialize, TestStringFloat,
+                          struct.pack('<I', len(data) + 1) + data, workers=2)
@@ -0,0 +1,98 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+from .dynamic_msgs import get_odometry
+from .dynamic_msgs import serialize
+
+
+def test_project():
+    import genpy
+    msgs, msg = get_odometry()
+    data = serialize(msg)
+    odom = msgs['gd_msgs/Odometry']
+    m = odom.project(data, ['header.stamp', 'pose.position', 'count'])
+    assert isinstance(m, odom)
+    assert genpy.Time(10, 20) == m.header.stamp
+    assert msg.pose.position == m.pose.position
+    assert -3 == m.count
+    # fields that were not requested have default values
+    assert '' == m.child_frame_id
+    assert '' == m.header.frame_id
+    assert msgs['gd_msgs/Vec3']() == m.pose.orientation
+
+    m = odom.project(data, ['header', 'child_frame_id', 'covariance', 'data', 'valid'])
+    assert msg.header == m.header
+    assert 'base' == m.child_frame_id
+    assert msg.covariance == list(m.covariance)
+    assert b'\x01\x02\x03' == m.data
+    assert m.valid is True
+
+
+def test_project_message_methods():
+    msgs, msg = get_odometry()
+    odom = msgs['gd_msgs/Odometry']
+    m = odom.project(serialize(msg), ['header.stamp', 'pose.position', 'count'])
+    expected = odom(count=-3)
+    expected.header.stamp = msg.header.stamp
+    expected.pose.position = msg.pose.position
+    assert expected == m
+    assert repr(expected) == repr(m)
+    assert serialize(expected) == serialize(m)
+
+
+def test_project_invalid():
+    import genpy
+    msgs, msg = get_odometry()
+    data = serialize(msg)
+    odom = msgs['gd_msgs/Odometry']
+    for fields in [['missing'], ['pose.missing'], ['child_frame_id.x'], ['covariance.x']]:
+        try:
+            odom.project(data, fields)
+            assert False, 'should have raised for %s' % fields
+        except genpy.MessageException:
+            pass
+    try:
+        odom.project(data[:30], ['count'])
+        assert False, 'should have raised'
+    except genpy.DeserializationError:
+        pass
+
+
+def test_get_projection():
+    from genpy.projection import get_projection
+    msgs, msg = get_odometry()
+    data = serialize(msg)
+    odom = msgs['gd_msgs/Odometry']
+    projection = get_projection(odom, ['pose.orientation.z'])
+    assert projection is get_projection(odom, ['pose.orientation.z'])
+    assert 6. == projection.deserialize(data).pose.orientation.z
+    assert 6. == projection.deserialize(b'xx' + data, 2).pose.orientation.z
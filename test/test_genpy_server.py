@@ -0,0 +1,144 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import unittest
+
+import genpy.server
+from genpy.server import GenerationServer
+from genpy.server import request
+
+
+@unittest.skipIf(not hasattr(socket, 'AF_UNIX'), 'Unix sockets are not available')
+class TestGenerationServer(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'genpy.sock')
+        self.server = GenerationServer(self.path)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_request(self):
+        from genpy.generator import MsgGenerator
+        from genpy.genpy_main import generate
+        msg_d = os.path.abspath(os.path.join(os.path.dirname(__file__), 'msg'))
+        outdirs = [os.path.join(self.tmp_dir, 'server'), os.path.join(self.tmp_dir, 'local')]
+        argvs = [['genmsg_py.py', '-p', 'genpy', '-Igenpy:%s' % msg_d, '-o', outdir, msg_d] for outdir in outdirs]
+        # twice, the second request reuses the loaded dependencies
+        self.assertEqual(0, request(self.path, argvs[0], 'genmsg_py.py', 'msg'))
+        self.assertEqual(0, request(self.path, argvs[0], 'genmsg_py.py', 'msg'))
+        self.assertEqual(0, generate(argvs[1], 'genmsg_py.py', MsgGenerator()))
+        self.assertEqual(sorted(os.listdir(outdirs[1])), sorted(os.listdir(outdirs[0])))
+        for name in os.listdir(outdirs[1]):
+            with open(os.path.join(outdirs[0], name)) as f1:
+                with open(os.path.join(outdirs[1], name)) as f2:
+                    self.assertEqual(f2.read(), f1.read())
+
+        # argument errors are reported with their return code
+        self.assertEqual(2, request(self.path, ['genmsg_py.py', '-p', 'genpy'], 'genmsg_py.py', 'msg'))
+
+    def test_get_msg_context(self):
+        msg_d = os.path.join(self.tmp_dir, 'msg')
+        os.mkdir(msg_d)
+        with open(os.path.join(msg_d, 'A.msg'), 'w') as f:
+            f.write('int32 a\n')
+        search_path = {'pkg': [msg_d]}
+        msg_context = self.server.get_msg_context(search_path)
+        self.assertTrue(msg_context is self.server.get_msg_context(search_path))
+        with open(os.path.join(msg_d, 'B.msg'), 'w') as f:
+            f.write('int32 b\n')
+        self.assertFalse(msg_context is self.server.get_msg_context(search_path))
+
+    def test_no_server(self):
+        self.assertEqual(None, request(os.path.join(self.tmp_dir, 'missing.sock'), ['genmsg_py.py'], 'genmsg_py.py', 'msg'))
+
+    def test_permissions(self):
+        import stat
+        self.assertEqual(0o600, stat.S_IMODE(os.stat(self.path).st_mode))
+
+    def test_timeout(self):
+        # a server that accepts connections but never answers
+        path = os.path.join(self.tmp_dir, 'hanging.sock')
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.bind(path)
+            sock.listen(1)
+            self.assertEqual(None, request(path, ['genmsg_py.py'], 'genmsg_py.py', 'msg', timeout=0.1))
+        finally:
+            sock.close()
+
+    def test_silent_client(self):
+        timeout = genpy.server._RequestHandler.timeout
+        genpy.server._RequestHandler.timeout = 0.1
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            # a client that never sends its request does not block the others
+            sock.connect(self.path)
+            self.assertEqual(2, request(self.path, ['genmsg_py.py', '-p', 'genpy'], 'genmsg_py.py', 'msg', timeout=5))
+        finally:
+            sock.close()
+            genpy.server._RequestHandler.timeout = timeout
+
+    def test_invalid_response(self):
+        # a server that answers with something else than a response
+        path = os.path.join(self.tmp_dir, 'other.sock')
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(path)
+        sock.listen(1)
+
+        def answer():
+            conn, _ = sock.accept()
+            try:
+                conn.recv(4096)
+                conn.sendall(b'{"retcode": 0}\n')
+            finally:
+                conn.close()
+        thread = threading.Thread(target=answer)
+        thread.start()
+        try:
+            self.assertEqual(None, request(path, ['genmsg_py.py'], 'genmsg_py.py', 'msg', timeout=5))
+        finally:
+            thread.join()
+            sock.close()
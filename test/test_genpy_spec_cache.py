@@ -0,0 +1,115 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+import os
+import shutil
+import tempfile
+
+import genmsg.msg_loader
+from genmsg.msg_loader import MsgContext
+
+from genpy.spec_cache import SpecCache
+
+
+def _write(path, text):
+    with open(path, 'w') as f:
+        f.write(text)
+
+
+def test_spec_cache():
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        msg_d = os.path.join(tmp_dir, 'msg')
+        os.mkdir(msg_d)
+        _write(os.path.join(msg_d, 'Inner.msg'), 'int32 x\n')
+        _write(os.path.join(msg_d, 'Outer.msg'), 'Inner inner\n')
+        cache_d = os.path.join(tmp_dir, 'cache')
+        search_path = {'sc_msgs': [msg_d]}
+
+        cache = SpecCache(cache_d)
+        msg_context = MsgContext.create_default()
+        spec = cache.load(msg_context, os.path.join(msg_d, 'Outer.msg'), 'sc_msgs/Outer')
+        cache.load_depends(msg_context, spec, search_path)
+        assert not msg_context.is_registered('sc_msgs/Inner')
+        genmsg.msg_loader.load_depends(msg_context, spec, search_path)
+        cache.record(msg_context, spec)
+        cache.save()
+
+        # another process finds both files in the cache
+        cache = SpecCache(cache_d)
+        msg_context = MsgContext.create_default()
+        spec = cache.load(msg_context, os.path.join(msg_d, 'Outer.msg'), 'sc_msgs/Outer')
+        # only the dependencies are registered, unrelated files are not read
+        other_d = os.path.join(tmp_dir, 'other')
+        os.mkdir(other_d)
+        _write(os.path.join(other_d, 'Other.msg'), 'int32 y\n')
+        cache.load_depends(msg_context, spec, {'sc_msgs': [msg_d], 'other_msgs': [other_d]})
+        assert msg_context.is_registered('sc_msgs/Inner')
+        assert msg_context.is_registered('sc_msgs/Outer')
+        assert [msg_d] == list(cache._indexes)
+        assert ['int32'] == msg_context.get_registered('sc_msgs/Inner').types
+        assert os.path.join(msg_d, 'Inner.msg') == msg_context.get_file('sc_msgs/Inner')
+
+        # touched files are still valid, changed files are not
+        os.utime(os.path.join(msg_d, 'Outer.msg'), (1, 1))
+        _write(os.path.join(msg_d, 'Inner.msg'), 'int64 x\n')
+        cache = SpecCache(cache_d)
+        assert cache.lookup(os.path.join(msg_d, 'Outer.msg'), 'sc_msgs/Outer') is not None
+        assert cache.lookup(os.path.join(msg_d, 'Inner.msg'), 'sc_msgs/Inner') is None
+        assert cache.lookup(os.path.join(msg_d, 'Outer.msg'), 'other_msgs/Outer') is None
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+def test_generate_messages_spec_cache():
+    from genpy.generator import MsgGenerator
+    from genpy.genpy_main import expand_files
+    msg_d = os.path.abspath(os.path.join(os.path.dirname(__file__), 'msg'))
+    msg_files = expand_files([msg_d], '.msg')
+    search_path = {'genpy': [msg_d]}
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        outdirs = [os.path.join(tmp_dir, name) for name in ['plain', 'cold', 'warm']]
+        cache = os.path.join(tmp_dir, 'cache')
+        assert 0 == MsgGenerator().generate_messages('genpy', msg_files, outdirs[0], search_path)
+        assert 0 == MsgGenerator().generate_messages('genpy', msg_files, outdirs[1], search_path, spec_cache=SpecCache(cache))
+        assert os.listdir(cache)
+        assert 0 == MsgGenerator().generate_messages('genpy', msg_files, outdirs[2], search_path, spec_cache=SpecCache(cache))
+        for outdir in outdirs[1:]:
+            assert sorted(os.listdir(outdirs[0])) == sorted(os.listdir(outdir))
+            for name in os.listdir(outdir):
+                with open(os.path.join(outdirs[0], name)) as f1:
+                    with open(os.path.join(outdir, name)) as f2:
+                        assert f1.read() == f2.read()
+    finally:
+        shutil.rmtree(tmp_dir)
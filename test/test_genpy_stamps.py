@@ -0,0 +1,131 @@
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2008, Willow Garage, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+#  * Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#  * Redistributions in binary form must reproduce the above
+#    copyright notice, this list of conditions and the following
+#    disclaimer in the documentation and/or other materials provided
+#    with the distribution.
+#  * Neither the name of Willow Garage, Inc. nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+import struct
+
+from .dynamic_msgs import get_classes
+from .dynamic_msgs import serialize
+
+
+def _stream(stamps, seqs=None):
+    # length-framed messages with a Header and an int32 field
+    data = b''
+    for i, (secs, nsecs) in enumerate(stamps):
+        body = struct.pack('<3I', i, secs, nsecs) + struct.pack('<I', 5) + b'frame' + struct.pack('<i', i)
+        data += struct.pack('<I', len(body)) + body
+    return data
+
+
+def test_scan_stamps():
+    from genpy.stamps import scan_stamps
+    data = _stream([(1, 2), (3, 4), (5, 6)])
+    offsets, secs, nsecs = scan_stamps(data)
+    assert [0, 29, 58] == list(offsets)
+    assert [1, 3, 5] == list(secs)
+    assert [2, 4, 6] == list(nsecs)
+
+    # a truncated message at the end is ignored
+    offsets, secs, nsecs = scan_stamps(data[:-3])
+    assert [0, 29] == list(offsets)
+
+    offsets, secs, nsecs = scan_stamps(b'')
+    assert 0 == len(offsets) == len(secs) == len(nsecs)
+
+
+def test_scan_stamps_too_short():
+    import genpy
+    from genpy.stamps import scan_stamps
+    try:
+        scan_stamps(struct.pack('<I', 4) + b'abcd')
+        assert False, 'should have raised'
+    except genpy.DeserializationError:
+        pass
+
+
+def test_stamp_index():
+    import genpy
+    from genpy.stamps import StampIndex
+    index = StampIndex.from_buffer(_stream([(3, 0), (1, 0), (2, 0), (2, 0), (4, 500000000)]))
+    assert 5 == len(index)
+    assert [1, 2, 3] == list(index.window(genpy.Time(1), genpy.Time(3)))
+    assert [0, 4] == list(index.window(genpy.Time(3)))
+    assert [1] == list(index.window(end=2000000000))
+    assert 0 == index.nearest(genpy.Time(3, 400000000))
+    assert 4 == index.nearest(genpy.Time(4))
+    assert 2 == index.nearest(genpy.Time(2))
+    assert 1 == index.nearest(genpy.Time(0))
+    assert 4 == index.nearest(genpy.Time(100))
+    assert 29 == index.offsets[1]
+
+
+def _messages(stamps, tag):
+    return [struct.pack('<3I', 0, secs, nsecs) + tag for secs, nsecs in stamps]
+
+
+def test_iter_frames():
+    from genpy.stamps import iter_frames
+    messages = _messages([(1, 0), (2, 0), (3, 0)], b'data')
+    data = b''.join(struct.pack('<I', len(m)) + m for m in messages)
+    assert messages == list(iter_frames(data))
+    assert messages[:2] == list(iter_frames(data[:-1]))
+    assert messages[1:] == list(iter_frames(data, offset=20))
+
+
+def test_merge_stamped():
+    import genpy
+    from genpy.stamps import merge_stamped
+    a = _messages([(1, 0), (3, 0), (3, 0)], b'a')
+    b = _messages([(2, 0), (3, 0), (3, 1)], b'b')
+    merged = list(merge_stamped([iter(a), iter(b)]))
+    assert [(1, 0, 0, a[0]), (2, 0, 1, b[0]), (3, 0, 0, a[1]), (3, 0, 0, a[2]), (3, 0, 1, b[1]), (3, 1, 1, b[2])] == merged
+    assert [] == list(merge_stamped([]))
+
+    try:
+        list(merge_stamped([[b'short']]))
+        assert False, 'should have raised'
+    except genpy.DeserializationError:
+        pass
+
+
+def test_merge_stamped_classes():
+    import genpy
+    from genpy.stamps import merge_stamped
+    msg_cls = get_classes('gd_msgs/Stamped')['gd_msgs/Stamped']
+    sources = [[], []]
+    for i in range(6):
+        msg = msg_cls(value=i)
+        msg.header.stamp = genpy.Time(i)
+        sources[i % 2].append(serialize(msg))
+    merged = list(merge_stamped(sources, classes=[msg_cls, msg_cls]))
+    assert list(range(6)) == [secs for secs, _, _, _ in merged]
+    assert isinstance(merged[3][3], genpy.RawMessage)
+    assert 3 == merged[3][3].message().value